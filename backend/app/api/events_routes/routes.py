@@ -0,0 +1,77 @@
+from fastapi import APIRouter, HTTPException, Request
+from typing import Optional
+from starlette.concurrency import run_in_threadpool
+from ...services.event_indexer import event_indexer, normalize_topic
+from ...services.event_store import event_store
+
+router = APIRouter()
+
+# Query parameters that are not event argument filters
+RESERVED_PARAMS = {"wallet", "from_block", "to_block", "limit", "offset"}
+
+
+@router.get("")
+async def list_indexed_contracts():
+    """Indexed contracts, their events and the arguments each event can be filtered by"""
+    contracts = await run_in_threadpool(event_indexer.contracts)
+    checkpoints = await run_in_threadpool(event_store.stats)
+    return {
+        name: {
+            "address": contract.address,
+            "indexed_to_block": checkpoints.get(name),
+            "events": {event: list(columns) for event, columns in contract.topic_columns.items()},
+        }
+        for name, contract in contracts.items()
+    }
+
+
+@router.get("/{contract_name}/{event_name}")
+async def query_events(
+    contract_name: str,
+    event_name: str,
+    request: Request,
+    wallet: Optional[str] = None,
+    from_block: Optional[int] = None,
+    to_block: Optional[int] = None,
+    limit: int = 100,
+    offset: int = 0,
+):
+    """
+    Events from the local index, newest first.
+
+    Any indexed argument can be used as a filter (e.g. ?to=0x... for
+    Transfer, ?contentId=3 for AccessGranted); wallet matches any indexed
+    address argument.
+    """
+    contracts = await run_in_threadpool(event_indexer.contracts)
+    contract = contracts.get(contract_name)
+    if contract is None:
+        raise HTTPException(status_code=404, detail=f"Contract {contract_name} is not indexed")
+    columns = contract.topic_columns.get(event_name)
+    if columns is None:
+        raise HTTPException(status_code=404, detail=f"Unknown event {event_name} for {contract_name}")
+    if not 1 <= limit <= 1000:
+        raise HTTPException(status_code=400, detail="limit must be between 1 and 1000")
+
+    types = contract.topic_types[event_name]
+    topics = {}
+    for name, value in request.query_params.items():
+        if name in RESERVED_PARAMS:
+            continue
+        if name not in columns:
+            raise HTTPException(status_code=400, detail=f"{name} is not an indexed argument of {event_name}")
+        try:
+            topics[columns[name]] = normalize_topic(types[name], value)
+        except ValueError:
+            raise HTTPException(status_code=400, detail=f"Invalid value for {name}")
+
+    any_topics = None
+    if wallet is not None:
+        any_topics = {columns[name]: wallet.lower() for name, abi_type in types.items() if abi_type == "address"}
+        if not any_topics:
+            raise HTTPException(status_code=400, detail=f"{event_name} has no indexed address argument")
+
+    events = await run_in_threadpool(
+        event_store.query, contract_name, event_name, topics, any_topics, from_block, to_block, limit, offset
+    )
+    return {"events": events, "count": len(events)}
@@ -1,10 +1,20 @@
 from fastapi import APIRouter, HTTPException, Depends
+from fastapi.responses import Response, StreamingResponse
 from pydantic import BaseModel
-from typing import List, Dict, Optional
+from typing import Any, List, Dict, Optional, Literal
 # from ...web_3_agents.state import agent_state
 from ...web_3_agents.main import Web3AgentManager
-import json  # Import json module
-import os  # Import os module for file path handling
+from ...services.agent_executor import agent_executor, ExecutorSaturatedError, UserConcurrencyError
+from ...services.agent_store import agent_store
+from ...services.job_runner import job_runner
+from ...services.job_store import job_store, TERMINAL_STATES
+from ...services.balance_service import fetch_balances
+from ...web_3_agents.wallet_store import wallet_store
+from starlette.concurrency import run_in_threadpool
+import asyncio
+import json
+import time
+import os
 
 router = APIRouter(prefix="/web3_manager/{user_id}", tags=["web3"])
 
@@ -27,16 +37,88 @@ class AgentResponse(BaseModel):
     wallet_id: Optional[str] = None
     user_id: str
 
+class AgentFailure(BaseModel):
+    name: str
+    functions: List[str]
+    error: str
+
 class CreateAgentsResponse(BaseModel):
     success: bool
     message: str
     agent_count: int
     agents: List[AgentResponse]
+    failed: List[AgentFailure] = []
 
 class RunAgentResponse(BaseModel):
     success: bool
     result: str
 
+class WalletBalances(BaseModel):
+    name: str
+    wallet_id: str
+    wallet_address: str
+    balances: Dict[str, Dict[str, str]]
+
+class BalancesResponse(BaseModel):
+    user_id: str
+    assets: List[str]
+    wallets: List[WalletBalances]
+
+class JobRequest(BaseModel):
+    kind: Literal["agent_run", "tool"]
+    wallet_id: str
+    functions: List[str] = []
+    prompt: Optional[str] = None
+    tool: Optional[str] = None
+    arguments: Dict[str, Any] = {}
+
+class JobResponse(BaseModel):
+    job_id: str
+    kind: str
+    state: str
+    result: Optional[Any] = None
+    error: Optional[str] = None
+    events: List[Dict[str, Any]] = []
+    created_at: float
+    updated_at: float
+    finished_at: Optional[float] = None
+
+def _create_agents(prompt: str, user_id: str) -> CreateAgentsResponse:
+    """Blocking part of create-agents, runs on the agent executor"""
+    results = agent_manager.create_agents(prompt)
+    
+    # Names follow plan order so a failed task keeps its slot
+    agent_responses = [
+        AgentResponse(
+            name=f"agent{i+1}",
+            functions=result.agent.function_names,
+            wallet_address=result.agent._get_wallet_address(),
+            wallet_id=result.agent.wallet_id,  # Always send the wallet_id back to the frontend
+            user_id=f"{user_id}"  # Include user_id in the response
+        )
+        for i, result in enumerate(results) if result.agent is not None
+    ]
+    failures = [
+        AgentFailure(name=f"agent{i+1}", functions=result.functions, error=result.error)
+        for i, result in enumerate(results) if result.agent is None
+    ]
+    print(f"Created {len(agent_responses)} agents with manager {id(agent_manager)}, {len(failures)} failed")
+    agent_store.replace_agents(user_id, [response.dict() for response in agent_responses])
+
+    return CreateAgentsResponse(
+        success=not failures,
+        message=f"Created {len(agent_responses)} of {len(results)} agents",
+        agent_count=len(agent_responses),
+        agents=agent_responses,
+        failed=failures
+    )
+
+def _executor_http_error(e: Exception) -> HTTPException:
+    """Map executor admission errors to 429/503"""
+    if isinstance(e, UserConcurrencyError):
+        return HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "1"})
+    return HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+
 # Routes
 @router.post("/create-agents", response_model=CreateAgentsResponse)
 async def create_agents(
@@ -44,37 +126,9 @@ async def create_agents(
     user_id: str
 ):
     try:
-        agents = agent_manager.create_agents(request.prompt)
-        print(f"Created {len(agents)} agents with manager {id(agent_manager)}")
-        
-        agent_responses = [
-            AgentResponse(
-                name=f"agent{i+1}",
-                functions=agent.function_names,
-                wallet_address=agent._get_wallet_address(),
-                wallet_id=agent.wallet_id,  # Always send the wallet_id back to the frontend
-                user_id=f"{user_id}"  # Include user_id in the response
-            )
-            for i, agent in enumerate(agents)
-        ]
-        
-        # Define the directory and file path
-        dir_path = f"user_data"
-        file_path = os.path.join(dir_path, f"{user_id}.json")
-
-        # Create the directory if it doesn't exist
-        os.makedirs(dir_path, exist_ok=True)
-
-        # Save agent_responses to a JSON file
-        with open(file_path, "w") as json_file:
-            json.dump([response.dict() for response in agent_responses], json_file)
-
-        return CreateAgentsResponse(
-            success=True,
-            message=f"Created {len(agents)} agents",
-            agent_count=len(agents),
-            agents=agent_responses
-        )
+        return await agent_executor.run(user_id, _create_agents, request.prompt, user_id)
+    except (UserConcurrencyError, ExecutorSaturatedError) as e:
+        raise _executor_http_error(e)
     except Exception as e:
         print(f"Error in create_agents route: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -82,32 +136,16 @@ async def create_agents(
 @router.get("/agents", response_model=List[AgentResponse])
 async def get_agents(user_id: str):
     try:
-        # Define the directory and file path
-        dir_path = f"user_data"
-        file_path = os.path.join(dir_path, f"{user_id}.json")
-
-        # Check if the file exists
-        if not os.path.exists(file_path):
+        # Served straight from memory on a hit; the body is already serialized
+        body = agent_store.cached(user_id)
+        if body is None:
+            body = await run_in_threadpool(agent_store.load, user_id)
+        if body is None:
             raise HTTPException(status_code=404, detail="No agents found for this user.")
-
-        with open(file_path, "r") as json_file:
-            agents_data = json.load(json_file)
-
-        print(f"Getting agents from JSON file for user {user_id}: {len(agents_data)} agents")
-        
-        responses = [
-            AgentResponse(
-                name=agent['name'],
-                functions=agent['functions'],
-                wallet_address=agent['wallet_address'],
-                wallet_id=agent['wallet_id'],
-                user_id=agent['user_id']
-            )
-            for agent in agents_data
-        ]
-        print(f"Returning {len(responses)} agent responses")
-        return responses
+        return Response(content=body, media_type="application/json")
         
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Error in get_agents: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -118,13 +156,169 @@ async def run_agent(
     user_id: str
 ):
     try:
-        result = agent_manager.run_agent(request.functions, request.wallet_id, request.agent_index, request.prompt)
+        result = await agent_executor.run(
+            user_id, agent_manager.run_agent,
+            request.functions, request.wallet_id, request.agent_index, request.prompt
+        )
         return RunAgentResponse(
             success=True,
             result=result
         )
+    except (UserConcurrencyError, ExecutorSaturatedError) as e:
+        raise _executor_http_error(e)
     except IndexError as e:
         raise HTTPException(status_code=404, detail=f"Agent {request.agent_index} not found")
     except Exception as e:
         print(f"Error running agent: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
+
+def _ndjson(event: dict) -> bytes:
+    return (json.dumps(event, default=str) + "\n").encode()
+
+@router.post("/run-agent/stream")
+async def run_agent_stream(
+    request: AgentRunRequest,
+    user_id: str
+):
+    """Stream a run as NDJSON: model tokens, tool start/finish events, then the final result"""
+    loop = asyncio.get_running_loop()
+    events: asyncio.Queue = asyncio.Queue()
+    done = object()
+
+    def emit(event: dict):
+        # Called from the executor thread
+        loop.call_soon_threadsafe(events.put_nowait, event)
+
+    try:
+        future = agent_executor.submit(
+            user_id, agent_manager.run_agent_stream,
+            request.functions, request.wallet_id, request.prompt, emit
+        )
+    except (UserConcurrencyError, ExecutorSaturatedError) as e:
+        raise _executor_http_error(e)
+    future.add_done_callback(lambda _: events.put_nowait(done))
+    started = time.monotonic()
+
+    async def body():
+        yield _ndjson({"event": "accepted", "wallet_id": request.wallet_id})
+        while True:
+            event = await events.get()
+            if event is done:
+                break
+            yield _ndjson(event)
+        elapsed_ms = round((time.monotonic() - started) * 1000, 2)
+        if future.exception() is not None:
+            print(f"Error running agent: {str(future.exception())}")
+            yield _ndjson({"event": "error", "detail": str(future.exception()), "duration_ms": elapsed_ms})
+        else:
+            yield _ndjson({"event": "done", "result": future.result(), "duration_ms": elapsed_ms})
+
+    return StreamingResponse(body(), media_type="application/x-ndjson")
+
+# Jobs run on the job runner's own pool and persist their state
+job_runner.register(
+    "agent_run",
+    lambda payload, emit: agent_manager.run_agent_stream(
+        payload["functions"], payload["wallet_id"], payload["prompt"], emit
+    )
+)
+job_runner.register(
+    "tool",
+    lambda payload, emit: agent_manager.invoke_tool(
+        payload["wallet_id"], payload["tool"], payload["arguments"], emit
+    )
+)
+
+def _get_job(user_id: str, job_id: str) -> dict:
+    job = job_store.get(job_id)
+    if job is None or job["user_id"] != user_id:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@router.post("/jobs", response_model=JobResponse, status_code=202)
+async def submit_job(request: JobRequest, user_id: str):
+    """Queue an agent run or a single tool call and return its job id immediately"""
+    if request.kind == "agent_run" and not (request.prompt and request.functions):
+        raise HTTPException(status_code=422, detail="agent_run jobs need a prompt and functions")
+    if request.kind == "tool" and not request.tool:
+        raise HTTPException(status_code=422, detail="tool jobs need a tool name")
+    try:
+        job_id = await run_in_threadpool(job_runner.submit, user_id, request.kind, request.dict())
+        return await run_in_threadpool(_get_job, user_id, job_id)
+    except ExecutorSaturatedError as e:
+        raise _executor_http_error(e)
+
+@router.get("/jobs", response_model=List[JobResponse])
+async def list_jobs(user_id: str, limit: int = 50):
+    return await run_in_threadpool(job_store.list_for_user, user_id, min(limit, 500))
+
+@router.get("/jobs/{job_id}", response_model=JobResponse)
+async def get_job(user_id: str, job_id: str):
+    return await run_in_threadpool(_get_job, user_id, job_id)
+
+@router.get("/jobs/{job_id}/events")
+async def job_events(user_id: str, job_id: str, poll_interval: float = 0.5):
+    """Stream the job as NDJSON each time its state changes, until it finishes"""
+    job = await run_in_threadpool(_get_job, user_id, job_id)
+
+    async def body():
+        current = job
+        last_update = None
+        while True:
+            if current["updated_at"] != last_update:
+                last_update = current["updated_at"]
+                yield _ndjson(JobResponse(**current).dict())
+            if current["state"] in TERMINAL_STATES:
+                break
+            await asyncio.sleep(max(poll_interval, 0.1))
+            current = await run_in_threadpool(job_store.get, job_id)
+            if current is None:
+                break
+
+    return StreamingResponse(body(), media_type="application/x-ndjson")
+
+@router.get("/balances", response_model=BalancesResponse)
+async def get_balances(user_id: str, assets: Optional[str] = None):
+    """
+    Balances of every agent wallet the user owns, fetched concurrently in
+    batched JSON-RPC calls. assets is a comma-separated list of "eth",
+    "usdc" or token addresses; by default ETH, USDC and every token the
+    user's agents deployed.
+    """
+    rpc_url = os.getenv("ALCHEMY_URL")
+    if not rpc_url:
+        raise HTTPException(status_code=503, detail="ALCHEMY_URL is not configured")
+
+    agents = await run_in_threadpool(agent_store.list_agents, user_id)
+    if not agents:
+        raise HTTPException(status_code=404, detail="No agents found for this user.")
+
+    if assets:
+        asset_list = [asset.strip() for asset in assets.split(",") if asset.strip()]
+    else:
+        tokens = await run_in_threadpool(
+            wallet_store.tokens_for_wallets, [agent["wallet_id"] for agent in agents]
+        )
+        asset_list = ["eth", "usdc"] + list(dict.fromkeys(token["contract_address"] for token in tokens))
+
+    try:
+        balances = await fetch_balances(rpc_url, [agent["wallet_address"] for agent in agents], asset_list)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        print(f"Error fetching balances: {str(e)}")
+        raise HTTPException(status_code=502, detail=str(e))
+
+    return BalancesResponse(
+        user_id=user_id,
+        assets=asset_list,
+        wallets=[
+            WalletBalances(
+                name=agent["name"],
+                wallet_id=agent["wallet_id"],
+                wallet_address=agent["wallet_address"],
+                balances=balances[agent["wallet_address"]]
+            )
+            for agent in agents
+        ]
+    )
@@ -1,57 +1,320 @@
-from fastapi import APIRouter, HTTPException
-from fastapi.responses import FileResponse, JSONResponse
-from ...services.file_service import CircuitFileService
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import FileResponse, JSONResponse, Response
+from pydantic import BaseModel
+from starlette.concurrency import run_in_threadpool
+from starlette.types import Receive, Scope, Send
+from typing import Any, Dict, List, Optional, Tuple, Union
+import anyio
+import math
+import os
+import tarfile
+from ...services.file_service import Artifact, CircuitFileService, is_current, stat_or_none
+from ...services.groth16_verifier import Groth16Verifier
+from ...services.witness_engine import WitnessEngine, WitnessPoolBusyError
 
 router = APIRouter()
 file_service = CircuitFileService("./app/zk_circuits/build")
+verifier = Groth16Verifier(file_service)
+witness_engine = WitnessEngine(
+    file_service,
+    pool_size=int(os.getenv("WITNESS_POOL_SIZE", "4")),
+    acquire_timeout=float(os.getenv("WITNESS_ACQUIRE_TIMEOUT", "10")),
+)
 
-@router.get("/circuit/{circuit_name}/wasm")
-async def get_wasm(circuit_name: str):
+MAX_VERIFY_BATCH = int(os.getenv("GROTH16_MAX_BATCH", "1024"))
+
+MEDIA_TYPES = {
+    "wasm": "application/wasm",
+    "zkey": "application/octet-stream",
+    "vkey": "application/json",
+}
+NOT_FOUND = {
+    "wasm": "Circuit files not found",
+    "zkey": "ZKEY file not found",
+    "vkey": "Verification key not found",
+}
+# Versioned URLs never change content; plain ones are revalidated with the ETag
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+TAR_BLOCK = 512
+# The manifest picks up a finished rebuild within one poll after the files settle
+REBUILDING = {"Retry-After": str(math.ceil(file_service.manifest.poll_interval + file_service.manifest.settle))}
+
+def _rebuilding() -> HTTPException:
+    # Serving the new bytes under the old digest would let browsers cache them for good
+    return HTTPException(status_code=503, detail="Circuit is being rebuilt", headers=REBUILDING)
+
+def _filename(circuit_name: str, kind: str) -> str:
+    if kind == "vkey":
+        return f"verification_key_{circuit_name}.json"
+    return f"{circuit_name}.{kind}"
+
+def _etag(artifact: Artifact, encoding: Optional[str] = None) -> str:
+    # Each representation gets its own strong tag so caches never mix them up
+    return f'"{artifact.digest}-{encoding}"' if encoding else f'"{artifact.digest}"'
+
+def _not_modified(request: Request, artifact: Artifact) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    tags = {tag.strip().removeprefix("W/") for tag in header.split(",")}
+    current = {_etag(artifact)} | {_etag(artifact, encoding) for encoding in artifact.encodings}
+    return "*" in tags or bool(tags & current)
+
+def _pick_encoding(request: Request, artifact: Artifact) -> Optional[str]:
+    # Byte ranges always refer to the uncompressed file
+    if not artifact.encodings or "range" in request.headers:
+        return None
+    accepted = set()
+    for item in request.headers.get("accept-encoding", "").split(","):
+        coding, _, params = item.partition(";")
+        name, _, q = params.partition("=")
+        try:
+            if name.strip().lower() == "q" and float(q) == 0:
+                continue
+        except ValueError:
+            continue
+        accepted.add(coding.strip().lower())
+    for encoding in artifact.encodings:
+        if encoding in accepted:
+            return encoding
+    return None
+
+async def _serve_artifact(request: Request, circuit_name: str, kind: str, version: Optional[str] = None):
     try:
-        if not file_service.verify_circuit_files(circuit_name):
-            raise HTTPException(status_code=404, detail="Circuit files not found")
-        
-        wasm_path = file_service.get_circuit_paths(circuit_name)["wasm"]
+        artifact = file_service.get_artifact(circuit_name, kind)
+        if artifact is None:
+            raise HTTPException(status_code=404, detail=NOT_FOUND[kind])
+        if version is not None and version != artifact.version:
+            raise HTTPException(status_code=404, detail="Artifact version not found")
+
+        encoding = _pick_encoding(request, artifact)
+        headers = {
+            "ETag": _etag(artifact, encoding),
+            "Cache-Control": IMMUTABLE if version is not None else REVALIDATE,
+            "Vary": "Accept-Encoding",
+        }
+        if _not_modified(request, artifact):
+            return Response(status_code=304, headers=headers)
+
+        path, stat = artifact.path, artifact.stat
+        if encoding is not None:
+            path, stat = artifact.encodings[encoding]
+            headers["Content-Encoding"] = encoding
+        if not is_current(stat, await anyio.to_thread.run_sync(stat_or_none, path)):
+            raise _rebuilding()
+        # FileResponse answers Range/If-Range requests itself
         return FileResponse(
-            path=wasm_path,
-            media_type="application/wasm",
-            filename=f"{circuit_name}.wasm"
+            path=path,
+            media_type=MEDIA_TYPES[kind],
+            filename=_filename(circuit_name, kind),
+            headers=headers,
+            stat_result=stat,
         )
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.get("/circuit/{circuit_name}/zkey")
-async def get_zkey(circuit_name: str):
+class TarBundleResponse(Response):
+    """
+    Uncompressed tar of files streamed straight from disk.
+
+    The archive size is known up front, so it is sent with a Content-Length.
+    File bodies go out through the ASGI zero-copy send extension (sendfile)
+    when the server offers it, and in chunks otherwise.
+    """
+
+    chunk_size = 256 * 1024
+
+    def __init__(self, members: List[Tuple[str, Artifact]], filename: str, headers: dict):
+        self.status_code = 200
+        self.media_type = "application/x-tar"
+        self.background = None
+        self.members = []
+        length = 0
+        for name, artifact in members:
+            info = tarfile.TarInfo(name)
+            info.size = artifact.stat.st_size
+            info.mtime = int(artifact.stat.st_mtime)
+            info.mode = 0o644
+            header = info.tobuf()
+            padding = -info.size % TAR_BLOCK
+            self.members.append((header, artifact, padding))
+            length += len(header) + info.size + padding
+        # End-of-archive marker
+        length += 2 * TAR_BLOCK
+        self.init_headers({
+            **headers,
+            "Content-Length": str(length),
+            "Content-Disposition": f'attachment; filename="{filename}"',
+        })
+
+    async def _send_file(self, send: Send, artifact: Artifact, zerocopy: bool):
+        size = artifact.stat.st_size
+        if zerocopy:
+            with open(artifact.path, "rb") as f:
+                if not is_current(artifact.stat, os.fstat(f.fileno())):
+                    raise RuntimeError(f"{artifact.path} was rebuilt while streaming")
+                await send({"type": "http.response.zerocopysend", "file": f, "count": size, "more_body": True})
+            return
+        remaining = size
+        async with await anyio.open_file(artifact.path, mode="rb") as f:
+            # Headers already went out, so a rebuilt file can only end the response early
+            if not is_current(artifact.stat, os.fstat(f.wrapped.fileno())):
+                raise RuntimeError(f"{artifact.path} was rebuilt while streaming")
+            while remaining:
+                chunk = await f.read(min(self.chunk_size, remaining))
+                if not chunk:
+                    # Truncated by a rebuild mid-download; the client sees a short body
+                    raise RuntimeError(f"{artifact.path} shrank while streaming")
+                remaining -= len(chunk)
+                await send({"type": "http.response.body", "body": chunk, "more_body": True})
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        if scope["method"].upper() == "HEAD":
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+        zerocopy = "http.response.zerocopysend" in scope.get("extensions", {})
+        for header, artifact, padding in self.members:
+            await send({"type": "http.response.body", "body": header, "more_body": True})
+            await self._send_file(send, artifact, zerocopy)
+            if padding:
+                await send({"type": "http.response.body", "body": b"\0" * padding, "more_body": True})
+        await send({"type": "http.response.body", "body": b"\0" * (2 * TAR_BLOCK), "more_body": False})
+
+async def _serve_bundle(request: Request, circuit_name: str, version: Optional[str] = None):
+    circuit = file_service.manifest.get(circuit_name)
+    if circuit is None:
+        raise HTTPException(status_code=404, detail="Circuit files not found")
+    bundle_version = file_service.bundle_version(circuit_name)
+    if version is not None and version != bundle_version:
+        raise HTTPException(status_code=404, detail="Artifact version not found")
+
+    etag = f'"bundle-{bundle_version}"'
+    headers = {"ETag": etag, "Cache-Control": IMMUTABLE if version is not None else REVALIDATE}
+    if_none_match = request.headers.get("if-none-match", "")
+    if etag in {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")} or if_none_match.strip() == "*":
+        return Response(status_code=304, headers=headers)
+    members = [
+        (f"{circuit_name}/{_filename(circuit_name, kind)}", circuit.artifacts[kind])
+        for kind in MEDIA_TYPES
+    ]
+    for _, artifact in members:
+        if not is_current(artifact.stat, await anyio.to_thread.run_sync(stat_or_none, artifact.path)):
+            raise _rebuilding()
+    return TarBundleResponse(members, f"{circuit_name}.tar", headers)
+
+@router.api_route("/circuit/{circuit_name}/bundle", methods=["GET", "HEAD"])
+async def get_bundle(circuit_name: str, request: Request):
+    """wasm, zkey and vkey of a circuit in one uncompressed tar stream"""
+    return await _serve_bundle(request, circuit_name)
+
+@router.api_route("/circuit/{circuit_name}/wasm", methods=["GET", "HEAD"])
+async def get_wasm(circuit_name: str, request: Request):
+    return await _serve_artifact(request, circuit_name, "wasm")
+
+@router.api_route("/circuit/{circuit_name}/zkey", methods=["GET", "HEAD"])
+async def get_zkey(circuit_name: str, request: Request):
+    return await _serve_artifact(request, circuit_name, "zkey")
+
+@router.api_route("/circuit/{circuit_name}/vkey", methods=["GET", "HEAD"])
+async def get_vkey(circuit_name: str, request: Request):
+    return await _serve_artifact(request, circuit_name, "vkey")
+
+@router.api_route("/circuit/{circuit_name}/{artifact}/{version}", methods=["GET", "HEAD"])
+async def get_versioned_artifact(circuit_name: str, artifact: str, version: str, request: Request):
+    """Content-hash-versioned artifact URL, cacheable forever"""
+    if artifact == "bundle":
+        return await _serve_bundle(request, circuit_name, version)
+    if artifact not in MEDIA_TYPES:
+        raise HTTPException(status_code=404, detail=f"Unknown artifact {artifact}")
+    return await _serve_artifact(request, circuit_name, artifact, version)
+
+class ProofRequest(BaseModel):
+    proof: Dict[str, Any]
+    publicSignals: List[Union[str, int]]
+
+class BatchProofRequest(BaseModel):
+    proofs: List[ProofRequest]
+
+async def _prepared_key(circuit_name: str):
     try:
-        zkey_path = file_service.get_circuit_paths(circuit_name)["zkey"]
-        if not zkey_path.exists():
-            raise HTTPException(status_code=404, detail="ZKEY file not found")
-        return FileResponse(
-            path=zkey_path,
-            media_type="application/octet-stream",
-            filename=f"{circuit_name}.zkey"
-        )
+        pvk = await run_in_threadpool(verifier.prepared_key, circuit_name)
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        raise HTTPException(status_code=500, detail=f"Invalid verification key: {str(e)}")
+    if pvk is None:
+        raise HTTPException(status_code=404, detail="Verification key not found")
+    return pvk
 
-@router.get("/circuit/{circuit_name}/vkey")
-async def get_vkey(circuit_name: str):
+@router.post("/circuit/{circuit_name}/verify")
+async def verify_proof(circuit_name: str, request: ProofRequest):
+    """Check a snarkjs Groth16 proof against the circuit's verification key"""
+    pvk = await _prepared_key(circuit_name)
     try:
-        vkey_path = file_service.get_circuit_paths(circuit_name)["vkey"]
-        if not vkey_path.exists():
-            raise HTTPException(status_code=404, detail="Verification key not found")
-        return FileResponse(
-            path=vkey_path,
-            media_type="application/json",
-            filename=f"verification_key_{circuit_name}.json"
-        )
+        valid = await run_in_threadpool(verifier.verify, pvk, request.proof, request.publicSignals)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"valid": valid}
+
+@router.post("/circuit/{circuit_name}/verify/batch")
+async def verify_proofs(circuit_name: str, request: BatchProofRequest):
+    """Check many proofs for one circuit with a single batched pairing check"""
+    if len(request.proofs) > MAX_VERIFY_BATCH:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_VERIFY_BATCH} proofs per batch")
+    pvk = await _prepared_key(circuit_name)
+    items = [(item.proof, item.publicSignals) for item in request.proofs]
+    results = await run_in_threadpool(verifier.verify_batch, pvk, items)
+    return {"valid": all(results), "results": results}
+
+class WitnessRequest(BaseModel):
+    input: Dict[str, Any]
+
+@router.post("/circuit/{circuit_name}/witness")
+async def calculate_witness(circuit_name: str, request: WitnessRequest, format: str = "json"):
+    """Witness for the given inputs, as JSON strings or a snarkjs .wtns file (?format=wtns)"""
+    if format not in ("json", "wtns"):
+        raise HTTPException(status_code=400, detail="format must be json or wtns")
+    calculate = witness_engine.calculate_wtns if format == "wtns" else witness_engine.calculate
+    try:
+        witness = await run_in_threadpool(calculate, circuit_name, request.input)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except WitnessPoolBusyError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    if witness is None:
+        raise HTTPException(status_code=404, detail="Circuit files not found")
+    if format == "wtns":
+        return Response(
+            content=witness,
+            media_type="application/octet-stream",
+            headers={"Content-Disposition": f'attachment; filename="{circuit_name}.wtns"'},
+        )
+    return {"witness": [str(value) for value in witness]}
+
+# (manifest generation, listing) so /circuits is rendered once per rebuild
+_listing: tuple = (-1, None)
+
+def _with_urls(request: Request, circuits: list) -> list:
+    for circuit in circuits:
+        circuit["urls"] = {
+            kind: request.url_for(
+                "get_versioned_artifact", circuit_name=circuit["name"], artifact=kind, version=version
+            ).path
+            for kind, version in circuit["versions"].items()
+        }
+    return circuits
 
 @router.get("/circuits")
-async def list_circuits():
+async def list_circuits(request: Request):
+    global _listing
     try:
-        circuits = file_service.list_available_circuits()
-        return JSONResponse(content={"circuits": circuits})
+        generation = file_service.manifest.generation
+        if _listing[0] != generation:
+            _listing = (generation, _with_urls(request, file_service.list_available_circuits()))
+        return JSONResponse(content={"circuits": _listing[1]})
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
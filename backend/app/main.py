@@ -1,8 +1,22 @@
+import os
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import FileResponse, JSONResponse
-from .api.zk_files_routes.routes import router as zk_files_router
+from .api.zk_files_routes.routes import file_service, verifier, witness_engine, router as zk_files_router
 from .api.web3_routes.routes import router as web3_router
+from .api.events_routes.routes import router as events_router
+from .services.agent_executor import agent_executor
+from .services.agent_store import agent_store
+from .services.job_runner import job_runner
+from .services.event_indexer import event_indexer
+from .web3_interactions import rpc
+from .web3_interactions.async_contract_interactions import close_async_web3
+from .web3_interactions.contract_interactions import provider_pool, receipt_watcher
+from .web_3_agents.agent_cache import agent_cache
+from .web_3_agents.plan_cache import plan_cache
+from .web_3_agents.wallet_pool import wallet_pool
+from .web_3_agents.balance_cache import balance_cache
+from .web_3_agents.onchain_agent import cdp_configured
 
 app = FastAPI()  # Adjust path as needed
 
@@ -17,4 +31,46 @@ app.add_middleware(
 
 # Initialize the agent manager at startup
 app.include_router(zk_files_router, prefix="/zkproof", tags=["zkproof"])
-app.include_router(web3_router, prefix="/api", tags=["web3"])
\ No newline at end of file
+app.include_router(web3_router, prefix="/api", tags=["web3"])
+app.include_router(events_router, prefix="/events", tags=["events"])
+
+@app.get("/metrics")
+async def metrics():
+    return {
+        "agent_executor": agent_executor.stats(),
+        "agent_cache": agent_cache.stats(),
+        "agent_store": agent_store.stats(),
+        "plan_cache": plan_cache.stats(),
+        "wallet_pool": wallet_pool.stats(),
+        "jobs": job_runner.stats(),
+        "balance_cache": balance_cache.stats(),
+        "receipt_watcher": receipt_watcher.stats(),
+        "rpc_pool": provider_pool.stats(),
+        "event_indexer": event_indexer.stats(),
+        "circuit_manifest": file_service.manifest.stats(),
+        "vkey_cache": file_service.vkeys.stats(),
+        "groth16": verifier.stats(),
+        "witness_engine": witness_engine.stats(),
+    }
+
+@app.on_event("startup")
+def startup():
+    job_runner.start()
+    provider_pool.start()
+    file_service.manifest.start()
+    if os.getenv("EVENT_INDEXER_ENABLED", "true").lower() == "true":
+        event_indexer.start()
+    if cdp_configured:
+        wallet_pool.start()
+
+@app.on_event("shutdown")
+async def shutdown():
+    agent_executor.shutdown()
+    job_runner.shutdown()
+    wallet_pool.stop()
+    receipt_watcher.stop()
+    provider_pool.stop()
+    event_indexer.stop()
+    file_service.manifest.stop()
+    await rpc.close()
+    await close_async_web3()
@@ -0,0 +1,132 @@
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import Any, Callable, Dict
+
+
+class ExecutorSaturatedError(Exception):
+    """Raised when the agent executor queue is full"""
+
+
+class UserConcurrencyError(Exception):
+    """Raised when a user already has the maximum number of agent calls in flight"""
+
+
+class AgentExecutor:
+    """
+    Bounded thread pool for the blocking agent paths (Gemini calls, CDP wallet
+    creation, on-chain waits) so they never run on the event loop.
+
+    Admission is decided up front: a call is rejected with
+    UserConcurrencyError when the user is at their cap, and with
+    ExecutorSaturatedError when the waiting queue is full.
+    """
+
+    def __init__(self, max_workers: int = 32, max_queue: int = 256, max_per_user: int = 4):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.max_per_user = max_per_user
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="agent-worker")
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._running = 0
+        self._per_user: Dict[str, int] = {}
+
+        # Metrics
+        self._submitted = 0
+        self._completed = 0
+        self._failed = 0
+        self._rejected_queue = 0
+        self._rejected_user = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._run_total = 0.0
+
+    def submit(self, user_id: str, fn: Callable[..., Any], *args, **kwargs) -> "asyncio.Future":
+        """Admit a blocking call and return an awaitable for its result"""
+        with self._lock:
+            if self._per_user.get(user_id, 0) >= self.max_per_user:
+                self._rejected_user += 1
+                raise UserConcurrencyError(
+                    f"User {user_id} already has {self.max_per_user} agent requests in flight"
+                )
+            if self._queued >= self.max_queue:
+                self._rejected_queue += 1
+                raise ExecutorSaturatedError("Agent executor queue is full, try again later")
+            self._queued += 1
+            self._submitted += 1
+            self._per_user[user_id] = self._per_user.get(user_id, 0) + 1
+
+        enqueued_at = time.monotonic()
+        future = self._pool.submit(self._call, enqueued_at, fn, args, kwargs)
+        future.add_done_callback(lambda f: self._release(user_id, f))
+        return asyncio.wrap_future(future)
+
+    async def run(self, user_id: str, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Run a blocking call on the pool and await its result"""
+        return await self.submit(user_id, fn, *args, **kwargs)
+
+    def _call(self, enqueued_at: float, fn: Callable[..., Any], args: tuple, kwargs: dict) -> Any:
+        started_at = time.monotonic()
+        waited = started_at - enqueued_at
+        with self._lock:
+            self._queued -= 1
+            self._running += 1
+            self._wait_total += waited
+            self._wait_max = max(self._wait_max, waited)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            with self._lock:
+                self._run_total += time.monotonic() - started_at
+
+    def _release(self, user_id: str, future: Future):
+        with self._lock:
+            if future.cancelled():
+                # Cancelled before a worker picked it up
+                self._queued -= 1
+            else:
+                self._running -= 1
+                if future.exception() is None:
+                    self._completed += 1
+                else:
+                    self._failed += 1
+            remaining = self._per_user.get(user_id, 1) - 1
+            if remaining > 0:
+                self._per_user[user_id] = remaining
+            else:
+                self._per_user.pop(user_id, None)
+
+    def stats(self) -> Dict[str, Any]:
+        """Snapshot of queue depth, wait times and outcome counters"""
+        with self._lock:
+            started = self._completed + self._failed + self._running
+            return {
+                "max_workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "max_per_user": self.max_per_user,
+                "queue_depth": self._queued,
+                "running": self._running,
+                "active_users": len(self._per_user),
+                "submitted": self._submitted,
+                "completed": self._completed,
+                "failed": self._failed,
+                "rejected_queue_full": self._rejected_queue,
+                "rejected_user_limit": self._rejected_user,
+                "avg_wait_ms": round(self._wait_total / started * 1000, 2) if started else 0.0,
+                "max_wait_ms": round(self._wait_max * 1000, 2),
+                "avg_run_ms": round(self._run_total / (self._completed + self._failed) * 1000, 2)
+                if (self._completed + self._failed) else 0.0,
+            }
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+agent_executor = AgentExecutor(
+    max_workers=int(os.getenv("AGENT_EXECUTOR_WORKERS", "32")),
+    max_queue=int(os.getenv("AGENT_EXECUTOR_QUEUE", "256")),
+    max_per_user=int(os.getenv("AGENT_EXECUTOR_PER_USER", "4")),
+)
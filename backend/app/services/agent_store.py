@@ -0,0 +1,181 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+
+class AgentStore:
+    """
+    SQLite-backed store of the agents each user owns, with a read-through
+    cache of serialized GET /agents responses.
+
+    Writes go through BEGIN IMMEDIATE transactions so concurrent writers are
+    serialized by SQLite, and every write drops the user's cached response.
+    Cached responses also expire after cache_ttl seconds, which bounds how
+    long a write made by another worker process can go unseen.
+    """
+
+    def __init__(self, db_path: str, legacy_dir: Optional[str] = None, cache_ttl: float = 5.0):
+        self.db_path = db_path
+        self.legacy_dir = legacy_dir
+        self.cache_ttl = cache_ttl
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self._local = threading.local()
+        self._cache: Dict[str, Tuple[float, bytes]] = {}
+        self._cache_lock = threading.Lock()
+        # Bumped on every write so a load that raced with it is not cached
+        self._generation: Dict[str, int] = {}
+        self.cache_hits = 0
+        self.cache_misses = 0
+        with self._connect() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS agents (
+                    user_id TEXT NOT NULL,
+                    wallet_id TEXT NOT NULL,
+                    name TEXT NOT NULL,
+                    functions TEXT NOT NULL,
+                    wallet_address TEXT NOT NULL,
+                    position INTEGER NOT NULL,
+                    updated_at REAL NOT NULL,
+                    PRIMARY KEY (user_id, wallet_id)
+                ) WITHOUT ROWID
+                """
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # Autocommit mode so writes can open BEGIN IMMEDIATE explicitly
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _write(self, user_id: str, statements):
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            statements(conn)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            self.invalidate(user_id)
+
+    @staticmethod
+    def _upsert(conn: sqlite3.Connection, user_id: str, agent: dict, now: float):
+        conn.execute(
+            """
+            INSERT INTO agents (user_id, wallet_id, name, functions, wallet_address, position, updated_at)
+            VALUES (?, ?, ?, ?, ?,
+                    (SELECT COALESCE(MAX(position) + 1, 0) FROM agents WHERE user_id = ?), ?)
+            ON CONFLICT(user_id, wallet_id) DO UPDATE SET
+                name = excluded.name,
+                functions = excluded.functions,
+                wallet_address = excluded.wallet_address,
+                updated_at = excluded.updated_at
+            """,
+            (user_id, agent["wallet_id"], agent["name"], json.dumps(agent["functions"]),
+             agent["wallet_address"], user_id, now),
+        )
+
+    def upsert_agent(self, user_id: str, agent: dict):
+        """Add or update a single agent without touching the rest of the user's list"""
+        self._write(user_id, lambda conn: self._upsert(conn, user_id, agent, time.time()))
+
+    def replace_agents(self, user_id: str, agents: List[dict]):
+        """Atomically replace the user's agents with a new list"""
+        def statements(conn):
+            now = time.time()
+            conn.execute("DELETE FROM agents WHERE user_id = ?", (user_id,))
+            for agent in agents:
+                self._upsert(conn, user_id, agent, now)
+        self._write(user_id, statements)
+
+    def remove_agent(self, user_id: str, wallet_id: str):
+        self._write(user_id, lambda conn: conn.execute(
+            "DELETE FROM agents WHERE user_id = ? AND wallet_id = ?", (user_id, wallet_id)
+        ))
+
+    def list_agents(self, user_id: str) -> List[dict]:
+        """Read the user's agents from the database, in creation order"""
+        rows = self._connect().execute(
+            """
+            SELECT name, functions, wallet_address, wallet_id FROM agents
+            WHERE user_id = ? ORDER BY position
+            """,
+            (user_id,),
+        ).fetchall()
+        if not rows:
+            return self._import_legacy(user_id)
+        return [
+            {
+                "name": name,
+                "functions": json.loads(functions),
+                "wallet_address": wallet_address,
+                "wallet_id": wallet_id,
+                "user_id": user_id,
+            }
+            for name, functions, wallet_address, wallet_id in rows
+        ]
+
+    def _import_legacy(self, user_id: str) -> List[dict]:
+        """Move user_data/{user_id}.json written by the old file layout into the database"""
+        if not self.legacy_dir:
+            return []
+        file_path = os.path.join(self.legacy_dir, f"{user_id}.json")
+        if not os.path.exists(file_path):
+            return []
+        with open(file_path, "r") as json_file:
+            agents = [agent for agent in json.load(json_file) if agent.get("wallet_id")]
+        self.replace_agents(user_id, agents)
+        print(f"Imported {len(agents)} agents for user {user_id} from {file_path}")
+        return agents
+
+    def cached(self, user_id: str) -> Optional[bytes]:
+        """Serialized agent list from memory, or None if it has to be loaded"""
+        with self._cache_lock:
+            entry = self._cache.get(user_id)
+            if entry is not None and time.monotonic() - entry[0] <= self.cache_ttl:
+                self.cache_hits += 1
+                return entry[1]
+            self.cache_misses += 1
+            return None
+
+    def load(self, user_id: str) -> Optional[bytes]:
+        """Load and cache the serialized agent list, None when the user has no agents"""
+        with self._cache_lock:
+            generation = self._generation.get(user_id, 0)
+        agents = self.list_agents(user_id)
+        if not agents:
+            return None
+        body = json.dumps(agents).encode()
+        with self._cache_lock:
+            if self._generation.get(user_id, 0) == generation:
+                self._cache[user_id] = (time.monotonic(), body)
+        return body
+
+    def invalidate(self, user_id: str):
+        with self._cache_lock:
+            self._cache.pop(user_id, None)
+            self._generation[user_id] = self._generation.get(user_id, 0) + 1
+
+    def stats(self) -> Dict[str, int]:
+        with self._cache_lock:
+            return {
+                "cached_users": len(self._cache),
+                "cache_hits": self.cache_hits,
+                "cache_misses": self.cache_misses,
+            }
+
+
+agent_store = AgentStore(
+    os.getenv("AGENT_STORE_PATH", os.path.join("user_data", "agents.db")),
+    legacy_dir="user_data",
+    cache_ttl=float(os.getenv("AGENT_STORE_CACHE_TTL", "5")),
+)
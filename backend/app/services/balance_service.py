@@ -0,0 +1,76 @@
+import os
+from decimal import Decimal
+from typing import Any, Dict, List, Optional
+
+from ..web3_interactions.rpc import batch_call, JsonRpcError
+
+BALANCE_OF_SELECTOR = "0x70a08231"
+DECIMALS_SELECTOR = "0x313ce567"
+
+# USDC contract per CDP network id
+USDC_ADDRESSES = {
+    "base-sepolia": "0x036CbD53842c5426634e7929541eC2318f3dCF7e",
+    "base-mainnet": "0x833589fCD6eDb6E08f4c7C32D4f71b54bdA02913",
+}
+
+NETWORK_ID = os.getenv("BALANCE_NETWORK_ID", "base-sepolia")
+
+
+def resolve_asset(asset: str) -> Optional[str]:
+    """Contract address of an ERC-20 asset, None for native ETH"""
+    if asset.lower() == "eth":
+        return None
+    if asset.lower() == "usdc":
+        return USDC_ADDRESSES[NETWORK_ID]
+    if asset.startswith("0x") and len(asset) == 42:
+        return asset
+    raise ValueError(f"Unknown asset: {asset}")
+
+
+def _pad_address(address: str) -> str:
+    return address.lower().replace("0x", "").rjust(64, "0")
+
+
+def _format(raw: int, decimals: int) -> str:
+    text = format(Decimal(raw).scaleb(-decimals), "f")
+    return text.rstrip("0").rstrip(".") if "." in text else text
+
+
+async def fetch_balances(rpc_url: str, addresses: List[str], assets: List[str]) -> Dict[str, Dict[str, Any]]:
+    """
+    Fetch every (address, asset) balance in one set of JSON-RPC batches.
+
+    Returns {address: {asset: {"balance": str, "raw": str} or {"error": str}}}.
+    """
+    tokens = {asset: resolve_asset(asset) for asset in assets}
+    erc20_assets = [asset for asset, token in tokens.items() if token is not None]
+
+    # decimals() once per token, then one balance call per (address, asset)
+    calls = [("eth_call", [{"to": tokens[asset], "data": DECIMALS_SELECTOR}, "latest"]) for asset in erc20_assets]
+    slots = []
+    for address in addresses:
+        for asset in assets:
+            token = tokens[asset]
+            if token is None:
+                calls.append(("eth_getBalance", [address, "latest"]))
+            else:
+                calls.append(("eth_call", [
+                    {"to": token, "data": BALANCE_OF_SELECTOR + _pad_address(address)}, "latest"
+                ]))
+            slots.append((address, asset))
+
+    results = await batch_call(rpc_url, calls)
+    decimals = {"eth": 18}
+    for asset, result in zip(erc20_assets, results[:len(erc20_assets)]):
+        decimals[asset] = int(result, 16) if not isinstance(result, JsonRpcError) and result not in (None, "0x") else None
+
+    balances: Dict[str, Dict[str, Any]] = {address: {} for address in addresses}
+    for (address, asset), result in zip(slots, results[len(erc20_assets):]):
+        if isinstance(result, JsonRpcError):
+            balances[address][asset] = {"error": str(result)}
+        elif decimals.get(asset) is None:
+            balances[address][asset] = {"error": f"{asset} is not an ERC-20 token on {NETWORK_ID}"}
+        else:
+            raw = int(result, 16) if result not in (None, "0x") else 0
+            balances[address][asset] = {"balance": _format(raw, decimals[asset]), "raw": str(raw)}
+    return balances
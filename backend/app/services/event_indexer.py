@@ -0,0 +1,267 @@
+import os
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from ..web3_interactions.abi_codec import EventDecoder, compile_abi
+from ..web3_interactions.contract_interactions import contract_registry, provider_pool
+from ..web3_interactions.rpc import JsonRpcError
+from .event_store import EventStore, event_store
+
+TOPIC_COLUMNS = ("topic1", "topic2", "topic3")
+
+# Placeholder addresses in CONTRACT_ADDRESSES are tiny numbers; nothing to index there
+_MIN_REAL_ADDRESS = 2 ** 32
+
+
+def normalize_topic(abi_type: str, value: Any) -> str:
+    """Canonical text form of an indexed argument, as stored in the topic columns"""
+    if abi_type == "address":
+        return str(value).lower()
+    if abi_type.startswith(("uint", "int")):
+        return str(int(value, 0) if isinstance(value, str) else int(value))
+    if abi_type == "bool":
+        return "true" if value in (True, "true", "1", 1) else "false"
+    if isinstance(value, (bytes, bytearray)):
+        return "0x" + bytes(value).hex()
+    return str(value).lower()
+
+
+def _jsonable(value: Any) -> Any:
+    # uint256 doesn't fit a JSON number for most clients
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, int):
+        return str(value)
+    if isinstance(value, (bytes, bytearray)):
+        return "0x" + bytes(value).hex()
+    if isinstance(value, (list, tuple)):
+        return [_jsonable(item) for item in value]
+    return value
+
+
+def parse_start_blocks(value: str) -> Dict[str, int]:
+    """Deployment block per contract from a "token:123,basicNFT:456" list"""
+    start_blocks = {}
+    for item in value.split(","):
+        if not item.strip():
+            continue
+        name, _, block = item.partition(":")
+        try:
+            start_blocks[name.strip()] = int(block)
+        except ValueError:
+            raise ValueError(f"Invalid EVENT_INDEXER_START_BLOCKS entry {item.strip()!r}, expected name:block")
+    return start_blocks
+
+
+class IndexedContract:
+    """A contract's events keyed by topic0, with the topic column of each indexed argument"""
+
+    def __init__(self, name: str, address: str, abi: List[dict], start_block: int):
+        self.name = name
+        self.address = address
+        self.start_block = start_block
+        self.events: Dict[str, EventDecoder] = compile_abi(abi).events
+        self.topic_columns: Dict[str, Dict[str, str]] = {}
+        self.topic_types: Dict[str, Dict[str, str]] = {}
+        for decoder in self.events.values():
+            self.topic_columns[decoder.name] = {name: column for (name, _), column in zip(decoder.indexed, TOPIC_COLUMNS)}
+            self.topic_types[decoder.name] = dict(decoder.indexed)
+
+    def decode(self, raw_log: dict) -> Optional[Dict[str, Any]]:
+        decoder = self.events.get(raw_log["topics"][0]) if raw_log.get("topics") else None
+        if decoder is None:
+            return None
+        args = decoder.decode(raw_log)
+        types = self.topic_types[decoder.name]
+        return {
+            "event": decoder.name,
+            "block_number": int(raw_log["blockNumber"], 16),
+            "log_index": int(raw_log["logIndex"], 16),
+            "tx_hash": raw_log["transactionHash"],
+            "block_hash": raw_log["blockHash"],
+            "topics": [normalize_topic(types[name], args[name]) for name in types],
+            "args": {name: _jsonable(value) for name, value in args.items()},
+        }
+
+
+class EventIndexer:
+    """
+    Follows the chain and stores the events of every registered contract.
+
+    Each contract has its own checkpoint. Missing ranges are fetched with
+    eth_getLogs in chunks that halve when the node rejects them and double
+    while results stay small. The checkpoint's block hash is re-checked on
+    every pass; if the chain no longer has that block, the last
+    reorg_depth blocks of events are rolled back and indexed again.
+
+    Only contracts with a configured start block (their deployment block)
+    are indexed, so nothing is ever scanned from genesis.
+    """
+
+    def __init__(self, store: EventStore, start_blocks: Dict[str, int], initial_range: int = 2000,
+                 max_range: int = 10000, target_logs: int = 5000, reorg_depth: int = 12,
+                 poll_interval: float = 5.0):
+        self.store = store
+        self.start_blocks = start_blocks
+        self.max_range = max_range
+        self.target_logs = target_logs
+        self.reorg_depth = reorg_depth
+        self.poll_interval = poll_interval
+        self._ranges: Dict[str, int] = {}
+        self._initial_range = initial_range
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        # ((name, address, abi) of every configured contract, contracts built from them)
+        self._contracts: Tuple[Tuple, Dict[str, IndexedContract]] = ((), {})
+
+        # Metrics
+        self.indexed = 0
+        self.reorgs = 0
+        self.range_errors = 0
+        self.last_error: Optional[str] = None
+
+    def contracts(self) -> Dict[str, IndexedContract]:
+        """
+        Contracts with a start block, events and a real deployment address.
+
+        Rebuilt only when the registry's ABI or address of one of them changes.
+        """
+        abis = contract_registry.abis
+        source = []
+        for name in sorted(self.start_blocks):
+            try:
+                address = contract_registry.address(name)
+            except KeyError:
+                address = None
+            source.append((name, address, abis.get(name)))
+        signature, contracts = self._contracts
+        if len(signature) == len(source) and all(
+            old[0] == new[0] and old[1] == new[1] and old[2] is new[2] for old, new in zip(signature, source)
+        ):
+            return contracts
+
+        contracts = {}
+        for name, address, abi in source:
+            if abi is None or not address or int(address, 16) < _MIN_REAL_ADDRESS:
+                continue
+            contract = IndexedContract(name, address, abi, self.start_blocks[name])
+            if contract.events:
+                contracts[name] = contract
+        self._contracts = (tuple(source), contracts)
+        return contracts
+
+    def _block_hash(self, number: int) -> Optional[str]:
+        block = provider_pool.batch_call_sync([("eth_getBlockByNumber", [hex(number), False])])[0]
+        if isinstance(block, JsonRpcError):
+            raise block
+        return block["hash"] if block else None
+
+    def _resume_point(self, contract: IndexedContract) -> int:
+        """Last block whose events are stored, after undoing any reorged blocks"""
+        checkpoint = self.store.checkpoint(contract.name, contract.address)
+        if checkpoint is None:
+            # New contract or a new deployment address
+            self.store.reset(contract.name)
+            return contract.start_block - 1
+        block_number, block_hash = checkpoint
+        if block_number < contract.start_block or self._block_hash(block_number) == block_hash:
+            return block_number
+
+        target = max(block_number - self.reorg_depth, contract.start_block - 1)
+        target_hash = self._block_hash(target) if target >= 0 else ""
+        removed = self.store.rollback(contract.name, contract.address, target, target_hash or "")
+        self.reorgs += 1
+        print(f"Reorg at block {block_number} for {contract.name}: rolled back {removed} events to block {target}")
+        return target
+
+    def _sync(self, contract: IndexedContract, head: int):
+        start = self._resume_point(contract) + 1
+        size = self._ranges.get(contract.name, self._initial_range)
+        while start <= head and not self._stopping.is_set():
+            end = min(start + size - 1, head)
+            log_filter = {
+                "address": contract.address,
+                "fromBlock": hex(start),
+                "toBlock": hex(end),
+                "topics": [list(contract.events)],
+            }
+            try:
+                logs, block = provider_pool.batch_call_sync([
+                    ("eth_getLogs", [log_filter]),
+                    ("eth_getBlockByNumber", [hex(end), False]),
+                ])
+                if isinstance(logs, JsonRpcError):
+                    raise logs
+                if isinstance(block, JsonRpcError) or not block:
+                    raise Exception(f"Block {end} not available")
+            except Exception as e:
+                # Usually too many results or too wide a range for the node
+                self.range_errors += 1
+                if size == 1:
+                    raise
+                size = max(size // 2, 1)
+                continue
+
+            events = [
+                event for event in (contract.decode(log) for log in logs if not log.get("removed"))
+                if event is not None
+            ]
+            self.store.save_range(contract.name, contract.address, events, end, block["hash"])
+            self.indexed += len(events)
+            if len(logs) < self.target_logs // 2:
+                size = min(size * 2, self.max_range)
+            start = end + 1
+        self._ranges[contract.name] = size
+
+    def index_once(self):
+        """Bring every contract up to the current head"""
+        head = provider_pool.batch_call_sync([("eth_blockNumber", [])])[0]
+        if isinstance(head, JsonRpcError):
+            raise head
+        head = int(head, 16)
+        for contract in self.contracts().values():
+            try:
+                self._sync(contract, head)
+            except Exception as e:
+                self.last_error = f"{contract.name}: {str(e)}"
+                print(f"Error indexing {contract.name} events: {str(e)}")
+
+    def _run(self):
+        while not self._stopping.is_set():
+            try:
+                self.index_once()
+            except Exception as e:
+                self.last_error = str(e)
+                print(f"Error indexing events: {str(e)}")
+            self._stopping.wait(self.poll_interval)
+
+    def start(self):
+        if not self.start_blocks:
+            print("Event indexing disabled: set EVENT_INDEXER_START_BLOCKS to each contract's deployment block")
+            return
+        if self._thread is None or not self._thread.is_alive():
+            self._stopping.clear()
+            self._thread = threading.Thread(target=self._run, name="event-indexer", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stopping.set()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "checkpoints": self.store.stats(),
+            "indexed": self.indexed,
+            "reorgs": self.reorgs,
+            "range_errors": self.range_errors,
+            "last_error": self.last_error,
+        }
+
+
+event_indexer = EventIndexer(
+    event_store,
+    # Deployment block per contract, e.g. "token:12345678,basicNFT:12345900"
+    start_blocks=parse_start_blocks(os.getenv("EVENT_INDEXER_START_BLOCKS", "")),
+    max_range=int(os.getenv("EVENT_INDEXER_MAX_RANGE", "10000")),
+    reorg_depth=int(os.getenv("EVENT_INDEXER_REORG_DEPTH", "12")),
+    poll_interval=float(os.getenv("EVENT_INDEXER_POLL_INTERVAL", "5")),
+)
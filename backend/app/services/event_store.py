@@ -0,0 +1,177 @@
+import json
+import os
+import sqlite3
+import threading
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+
+class EventStore:
+    """
+    SQLite store of decoded contract events.
+
+    Indexed event arguments go to the topic1..topic3 columns (addresses
+    lowercased, integers as decimal strings) so lookups by them hit an index
+    instead of scanning; every argument is also kept as JSON.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS events (
+                    contract TEXT NOT NULL,
+                    block_number INTEGER NOT NULL,
+                    log_index INTEGER NOT NULL,
+                    event TEXT NOT NULL,
+                    tx_hash TEXT NOT NULL,
+                    block_hash TEXT NOT NULL,
+                    topic1 TEXT,
+                    topic2 TEXT,
+                    topic3 TEXT,
+                    args TEXT NOT NULL,
+                    PRIMARY KEY (contract, block_number, log_index)
+                ) WITHOUT ROWID
+                """
+            )
+            for column in ("topic1", "topic2", "topic3"):
+                conn.execute(
+                    f"CREATE INDEX IF NOT EXISTS events_{column} ON events (contract, event, {column}, block_number)"
+                )
+            conn.execute("CREATE INDEX IF NOT EXISTS events_event ON events (contract, event, block_number)")
+            conn.execute("CREATE INDEX IF NOT EXISTS events_tx ON events (tx_hash)")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS checkpoints (
+                    contract TEXT PRIMARY KEY,
+                    address TEXT NOT NULL,
+                    block_number INTEGER NOT NULL,
+                    block_hash TEXT NOT NULL
+                ) WITHOUT ROWID
+                """
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+        return conn
+
+    def checkpoint(self, contract: str, address: str) -> Optional[Tuple[int, str]]:
+        """(last indexed block, its hash); None if never indexed or the address changed"""
+        row = self._connect().execute(
+            "SELECT address, block_number, block_hash FROM checkpoints WHERE contract = ?", (contract,)
+        ).fetchone()
+        if row is None or row["address"] != address.lower():
+            return None
+        return row["block_number"], row["block_hash"]
+
+    def save_range(self, contract: str, address: str, events: Sequence[Dict[str, Any]],
+                   block_number: int, block_hash: str):
+        """Store a range's events and move the checkpoint in one transaction"""
+        conn = self._connect()
+        with conn:
+            conn.executemany(
+                """
+                INSERT OR REPLACE INTO events
+                    (contract, block_number, log_index, event, tx_hash, block_hash, topic1, topic2, topic3, args)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                [
+                    (
+                        contract,
+                        event["block_number"],
+                        event["log_index"],
+                        event["event"],
+                        event["tx_hash"],
+                        event["block_hash"],
+                        *(list(event["topics"]) + [None, None, None])[:3],
+                        json.dumps(event["args"]),
+                    )
+                    for event in events
+                ],
+            )
+            conn.execute(
+                "INSERT OR REPLACE INTO checkpoints (contract, address, block_number, block_hash) VALUES (?, ?, ?, ?)",
+                (contract, address.lower(), block_number, block_hash),
+            )
+
+    def rollback(self, contract: str, address: str, to_block: int, block_hash: str) -> int:
+        """Forget events after to_block (reorg), returning how many were removed"""
+        conn = self._connect()
+        with conn:
+            cursor = conn.execute(
+                "DELETE FROM events WHERE contract = ? AND block_number > ?", (contract, to_block)
+            )
+            conn.execute(
+                "INSERT OR REPLACE INTO checkpoints (contract, address, block_number, block_hash) VALUES (?, ?, ?, ?)",
+                (contract, address.lower(), to_block, block_hash),
+            )
+        return cursor.rowcount
+
+    def reset(self, contract: str):
+        """Drop a contract's events, e.g. after its address changed"""
+        conn = self._connect()
+        with conn:
+            conn.execute("DELETE FROM events WHERE contract = ?", (contract,))
+            conn.execute("DELETE FROM checkpoints WHERE contract = ?", (contract,))
+
+    def query(self, contract: str, event: Optional[str] = None, topics: Optional[Dict[str, str]] = None,
+              any_topics: Optional[Dict[str, str]] = None, from_block: Optional[int] = None,
+              to_block: Optional[int] = None, limit: int = 100, offset: int = 0) -> List[Dict[str, Any]]:
+        """
+        Events of a contract, newest first.
+
+        topics maps topic columns to values that must all match; any_topics
+        to values of which one must match (e.g. a wallet as sender or
+        receiver).
+        """
+        clauses = ["contract = ?"]
+        params: List[Any] = [contract]
+        if event is not None:
+            clauses.append("event = ?")
+            params.append(event)
+        for column, value in (topics or {}).items():
+            clauses.append(f"{column} = ?")
+            params.append(value)
+        if any_topics:
+            clauses.append("(" + " OR ".join(f"{column} = ?" for column in any_topics) + ")")
+            params.extend(any_topics.values())
+        if from_block is not None:
+            clauses.append("block_number >= ?")
+            params.append(from_block)
+        if to_block is not None:
+            clauses.append("block_number <= ?")
+            params.append(to_block)
+        rows = self._connect().execute(
+            f"""
+            SELECT * FROM events WHERE {" AND ".join(clauses)}
+            ORDER BY block_number DESC, log_index DESC LIMIT ? OFFSET ?
+            """,
+            params + [limit, offset],
+        ).fetchall()
+        return [
+            {
+                "contract": row["contract"],
+                "event": row["event"],
+                "block_number": row["block_number"],
+                "log_index": row["log_index"],
+                "tx_hash": row["tx_hash"],
+                "block_hash": row["block_hash"],
+                "args": json.loads(row["args"]),
+            }
+            for row in rows
+        ]
+
+    def stats(self) -> Dict[str, Any]:
+        rows = self._connect().execute("SELECT contract, block_number FROM checkpoints").fetchall()
+        return {row["contract"]: row["block_number"] for row in rows}
+
+
+event_store = EventStore(os.getenv("EVENT_STORE_PATH", os.path.join("user_data", "events.db")))
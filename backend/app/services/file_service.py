@@ -1,43 +1,340 @@
+from collections import OrderedDict
 from pathlib import Path
-from typing import Optional, Dict
+from typing import Any, Optional, Dict, List, NamedTuple, Tuple
+import hashlib
 import json
+import os
+import struct
+import threading
+import time
+
+# Precompressed variants written next to an artifact by zkcompiler.sh, in order of preference
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+
+class Artifact(NamedTuple):
+    path: Path
+    stat: os.stat_result
+    digest: str
+    # content-coding -> (path, stat) of a precompressed variant that is current and smaller
+    encodings: Dict[str, Tuple[Path, os.stat_result]]
+
+    @property
+    def version(self) -> str:
+        """Short content hash used in immutable URLs"""
+        return self.digest[:16]
+
+
+class Circuit(NamedTuple):
+    name: str
+    artifacts: Dict[str, Artifact]
+    metadata: Dict[str, Any]
+    # (mtime_ns, size) of every file the entry was built from
+    signature: Tuple
+
+
+def _sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def stat_or_none(path: Path) -> Optional[os.stat_result]:
+    try:
+        return path.stat()
+    except (FileNotFoundError, NotADirectoryError):
+        return None
+
+
+def is_current(expected: os.stat_result, actual: Optional[os.stat_result]) -> bool:
+    """Whether a file still has the (mtime_ns, size) the manifest indexed it with"""
+    return actual is not None and actual.st_mtime_ns == expected.st_mtime_ns \
+        and actual.st_size == expected.st_size
+
+
+def _r1cs_header(path: Path) -> Dict[str, int]:
+    """Wire and constraint counts from the header section of a circom .r1cs file"""
+    with open(path, "rb") as f:
+        magic, _, sections = struct.unpack("<4sII", f.read(12))
+        if magic != b"r1cs":
+            return {}
+        for _ in range(sections):
+            section_type, size = struct.unpack("<IQ", f.read(12))
+            if section_type != 1:
+                f.seek(size, os.SEEK_CUR)
+                continue
+            field_size = struct.unpack("<I", f.read(4))[0]
+            f.seek(field_size, os.SEEK_CUR)
+            wires, outputs, public_inputs, private_inputs, labels, constraints = \
+                struct.unpack("<IIIIQI", f.read(28))
+            return {
+                "nWires": wires,
+                "nOutputs": outputs,
+                "nPublicInputs": public_inputs,
+                "nPrivateInputs": private_inputs,
+                "nConstraints": constraints,
+            }
+    return {}
+
+
+class CircuitManifest:
+    """
+    In-memory index of the compiled circuits under build/.
+
+    Holds every artifact's path, stat, content hash and precompressed
+    variants plus metadata from the verification key and .r1cs header, so
+    lookups never touch the filesystem. A background thread polls mtimes
+    and rebuilds only the circuits whose files changed; files modified in
+    the last `settle` seconds are left for the next pass, so a build that
+    zkcompiler.sh is still writing isn't hashed half-way.
+    """
+
+    def __init__(self, base_path: Path, poll_interval: float = 2.0, settle: float = 1.0):
+        self.base_path = base_path
+        self.poll_interval = poll_interval
+        self.settle = settle
+        # Replaced wholesale on refresh, so readers never need the lock
+        self._circuits: Dict[str, Circuit] = {}
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        # Metrics
+        self.generation = 0
+        self.refreshes = 0
+        self.rebuilt = 0
+        self.last_error: Optional[str] = None
+
+        # Nothing is being built at startup as far as we know, so don't wait for files to settle
+        self.refresh(settle=0)
+
+    @staticmethod
+    def paths(base_path: Path, circuit_name: str) -> Dict[str, Path]:
+        circuit_dir = base_path / circuit_name
+        return {
+            "wasm": circuit_dir / f"{circuit_name}_js" / f"{circuit_name}.wasm",
+            "zkey": circuit_dir / f"{circuit_name}.zkey",
+            "vkey": circuit_dir / f"verification_key_{circuit_name}.json"
+        }
+
+    def _signature(self, circuit_name: str) -> Optional[Tuple]:
+        """(mtime_ns, size) of a circuit's files, None if any required artifact is missing"""
+        signature = []
+        paths = self.paths(self.base_path, circuit_name)
+        for path in paths.values():
+            stat = stat_or_none(path)
+            if stat is None:
+                return None
+            signature.append((stat.st_mtime_ns, stat.st_size))
+            for _, suffix in ENCODINGS:
+                variant = stat_or_none(path.with_name(path.name + suffix))
+                signature.append((variant.st_mtime_ns, variant.st_size) if variant else None)
+        r1cs = stat_or_none(self.base_path / circuit_name / f"{circuit_name}.r1cs")
+        signature.append((r1cs.st_mtime_ns, r1cs.st_size) if r1cs else None)
+        return tuple(signature)
+
+    def _build(self, circuit_name: str, signature: Tuple, previous: Optional[Circuit]) -> Circuit:
+        artifacts = {}
+        for kind, path in self.paths(self.base_path, circuit_name).items():
+            stat = path.stat()
+            encodings = {}
+            for encoding, suffix in ENCODINGS:
+                variant = path.with_name(path.name + suffix)
+                variant_stat = stat_or_none(variant)
+                # A variant older than the artifact is left over from a previous build
+                if variant_stat is not None and variant_stat.st_mtime_ns >= stat.st_mtime_ns \
+                        and variant_stat.st_size < stat.st_size:
+                    encodings[encoding] = (variant, variant_stat)
+            old = previous.artifacts.get(kind) if previous else None
+            unchanged = old is not None and old.stat.st_mtime_ns == stat.st_mtime_ns \
+                and old.stat.st_size == stat.st_size
+            digest = old.digest if unchanged else _sha256(path)
+            artifacts[kind] = Artifact(path, stat, digest, encodings)
+
+        metadata: Dict[str, Any] = {
+            kind: {"size": artifact.stat.st_size, "mtime": artifact.stat.st_mtime}
+            for kind, artifact in artifacts.items()
+        }
+        vkey = json.loads(artifacts["vkey"].path.read_text())
+        metadata.update({key: vkey.get(key) for key in ("protocol", "curve", "nPublic")})
+        r1cs = self.base_path / circuit_name / f"{circuit_name}.r1cs"
+        if r1cs.exists():
+            metadata.update(_r1cs_header(r1cs))
+        return Circuit(circuit_name, artifacts, metadata, signature)
+
+    def refresh(self, settle: Optional[float] = None):
+        """Re-stat build/ and rebuild the entries of circuits whose files changed"""
+        settle = self.settle if settle is None else settle
+        with self._lock:
+            self.refreshes += 1
+            current = self._circuits
+            circuits = {}
+            now = time.time_ns()
+            try:
+                # Dot directories are zkcompiler.sh's staging area
+                names = [entry.name for entry in os.scandir(self.base_path)
+                         if entry.is_dir() and not entry.name.startswith(".")]
+            except FileNotFoundError:
+                names = []
+            changed = False
+            for circuit_name in names:
+                previous = current.get(circuit_name)
+                signature = self._signature(circuit_name)
+                if signature is None:
+                    changed = changed or previous is not None
+                    continue
+                if previous is not None and previous.signature == signature:
+                    circuits[circuit_name] = previous
+                    continue
+                if any(item and now - item[0] < settle * 1e9 for item in signature):
+                    # Still being written; the previous entry stays, and the file
+                    # routes refuse to serve files that no longer match it
+                    if previous is not None:
+                        circuits[circuit_name] = previous
+                    continue
+                try:
+                    circuits[circuit_name] = self._build(circuit_name, signature, previous)
+                except Exception as e:
+                    self.last_error = f"{circuit_name}: {str(e)}"
+                    print(f"Error indexing circuit {circuit_name}: {str(e)}")
+                    if previous is not None:
+                        circuits[circuit_name] = previous
+                    continue
+                self.rebuilt += 1
+                changed = True
+            if changed or circuits.keys() != current.keys():
+                self._circuits = circuits
+                self.generation += 1
+
+    def get(self, circuit_name: str) -> Optional[Circuit]:
+        return self._circuits.get(circuit_name)
+
+    def circuits(self) -> Dict[str, Circuit]:
+        return self._circuits
+
+    def _run(self):
+        while not self._stopping.wait(self.poll_interval):
+            try:
+                self.refresh()
+            except Exception as e:
+                self.last_error = str(e)
+                print(f"Error refreshing circuit manifest: {str(e)}")
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stopping.clear()
+            self._thread = threading.Thread(target=self._run, name="circuit-manifest", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stopping.set()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "circuits": len(self._circuits),
+            "generation": self.generation,
+            "refreshes": self.refreshes,
+            "rebuilt": self.rebuilt,
+            "last_error": self.last_error,
+        }
+
+
+class VerificationKeyCache:
+    """
+    LRU cache of parsed verification keys, keyed by circuit and content hash.
+
+    A rebuilt vkey has a new hash, so it is parsed again instead of served
+    stale. The parsed dicts are shared between callers and must not be
+    modified.
+    """
+
+    def __init__(self, max_size: int = 64):
+        self.max_size = max_size
+        self._entries: "OrderedDict[Tuple[str, str], dict]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, circuit_name: str, artifact: Artifact) -> dict:
+        key = (circuit_name, artifact.digest)
+        with self._lock:
+            vkey = self._entries.get(key)
+            if vkey is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return vkey
+            self.misses += 1
+        vkey = json.loads(artifact.path.read_bytes())
+        with self._lock:
+            self._entries[key] = vkey
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return vkey
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
 
 class CircuitFileService:
     def __init__(self, base_path: str):
         self.base_path = Path(base_path)
         print(self.base_path)
         print(self.base_path.exists())
-        
+        self.manifest = CircuitManifest(
+            self.base_path, poll_interval=float(os.getenv("CIRCUIT_MANIFEST_POLL_INTERVAL", "2"))
+        )
+        self.vkeys = VerificationKeyCache(int(os.getenv("VKEY_CACHE_SIZE", "64")))
+
     def get_circuit_paths(self, circuit_name: str) -> Dict[str, Path]:
         """Get all paths related to a circuit"""
-        circuit_dir = self.base_path / circuit_name
-        return {
-            "wasm": circuit_dir / f"{circuit_name}_js" / f"{circuit_name}.wasm",
-            "zkey": circuit_dir / f"{circuit_name}.zkey",
-            "vkey": circuit_dir / f"verification_key_{circuit_name}.json"
-        }
+        return CircuitManifest.paths(self.base_path, circuit_name)
 
     def verify_circuit_files(self, circuit_name: str) -> bool:
         """Verify all required files exist for a circuit"""
-        paths = self.get_circuit_paths(circuit_name)
-        return all(path.exists() for path in paths.values())
+        return self.manifest.get(circuit_name) is not None
+
+    def get_artifact(self, circuit_name: str, kind: str) -> Optional[Artifact]:
+        """A circuit artifact (wasm, zkey or vkey) with its content hash, None if missing"""
+        circuit = self.manifest.get(circuit_name)
+        return circuit.artifacts.get(kind) if circuit is not None else None
 
     def read_verification_key(self, circuit_name: str) -> Optional[dict]:
-        """Read and parse verification key JSON"""
-        vkey_path = self.get_circuit_paths(circuit_name)["vkey"]
-        if vkey_path.exists():
-            return json.loads(vkey_path.read_text())
+        """Parsed verification key JSON (shared, don't modify), None if missing"""
+        artifact = self.get_artifact(circuit_name, "vkey")
+        if artifact is not None:
+            return self.vkeys.get(circuit_name, artifact)
         return None
 
-    def list_available_circuits(self):
+    def bundle_version(self, circuit_name: str) -> Optional[str]:
+        """Short hash over all of a circuit's artifacts, used in the bundle's URL and ETag"""
+        circuit = self.manifest.get(circuit_name)
+        if circuit is None:
+            return None
+        digests = "".join(circuit.artifacts[kind].digest for kind in sorted(circuit.artifacts))
+        return hashlib.sha256(digests.encode()).hexdigest()[:16]
+
+    def list_available_circuits(self) -> List[Dict[str, Any]]:
         """List all available circuits with valid files"""
-        circuits = []
-        for circuit_dir in self.base_path.iterdir():
-            if circuit_dir.is_dir():
-                circuit_name = circuit_dir.name
-                if self.verify_circuit_files(circuit_name):
-                    circuits.append({
-                        "name": circuit_name,
-                        "paths": {k: str(v) for k, v in self.get_circuit_paths(circuit_name).items()}
-                    })
-        return circuits 
\ No newline at end of file
+        return [
+            {
+                "name": circuit.name,
+                "paths": {kind: str(artifact.path) for kind, artifact in circuit.artifacts.items()},
+                "versions": {
+                    **{kind: artifact.version for kind, artifact in circuit.artifacts.items()},
+                    "bundle": self.bundle_version(circuit.name),
+                },
+                "metadata": circuit.metadata,
+            }
+            for circuit in self.manifest.circuits().values()
+        ]
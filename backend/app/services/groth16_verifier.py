@@ -0,0 +1,625 @@
+import os
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from py_ecc.optimized_bn128 import FQ12, b2 as _TWIST_B, curve_order, field_modulus
+from py_ecc.optimized_bn128.optimized_pairing import pseudo_binary_encoding
+
+# Groth16 verification over BN254 (snarkjs "bn128").
+#
+# py_ecc's pairing does the Miller loop on the twisted point in FQ12 and a
+# plain square-and-multiply final exponentiation, about a second per
+# proof. Here the G2 side stays in FQ2, every line is a sparse FQ12 element
+# (FQ2 factors are dropped since the final exponentiation kills them), the
+# lines of the fixed verification key points are computed once per key, all
+# pairings of a check share one Miller loop, and the final exponentiation
+# uses Frobenius maps. Results are the same as py_ecc's pairing.
+
+P = field_modulus
+R = curve_order
+# BN curve parameter
+BN_U = 4965661367192848881
+TWIST_B = (int(_TWIST_B.coeffs[0]), int(_TWIST_B.coeffs[1]))
+# Security of a random linear combination batch check is 2^-BATCH_BITS
+BATCH_BITS = 128
+
+G1Point = Tuple[int, int, int]
+G2Point = Tuple[Tuple[int, int], Tuple[int, int], Tuple[int, int]]
+# A line as its six FQ12 coefficients (see _line)
+Line = Tuple[int, int, int, int, int, int]
+
+
+# FQ2 = FQ[i] / (i^2 + 1), as (c0, c1)
+
+def _f2_add(a, b):
+    return (a[0] + b[0]) % P, (a[1] + b[1]) % P
+
+
+def _f2_sub(a, b):
+    return (a[0] - b[0]) % P, (a[1] - b[1]) % P
+
+
+def _f2_mul(a, b):
+    a0, a1 = a
+    b0, b1 = b
+    return (a0 * b0 - a1 * b1) % P, (a0 * b1 + a1 * b0) % P
+
+
+def _f2_sqr(a):
+    a0, a1 = a
+    return (a0 + a1) * (a0 - a1) % P, 2 * a0 * a1 % P
+
+
+def _f2_scale(a, k: int):
+    return a[0] * k % P, a[1] * k % P
+
+
+def _f2_pow(a, e: int):
+    result = (1, 0)
+    while e:
+        if e & 1:
+            result = _f2_mul(result, a)
+        a = _f2_sqr(a)
+        e >>= 1
+    return result
+
+
+F2_ZERO = (0, 0)
+F2_ONE = (1, 0)
+# w^6 = 9 + i in py_ecc's FQ12 = FQ[w] / (w^12 - 18w^6 + 82)
+XI = (9, 1)
+G1_GENERATOR: G1Point = (1, 2, 1)
+G2_GENERATOR: G2Point = (
+    (10857046999023057135944570762232829481370756359578518086990519993285655852781,
+     11559732032986387107991004021392285783925812861821192530917403151452391805634),
+    (8495653923123431417604973247489272438418190587263600148770280649306958101930,
+     4082367875863433681332203403145435568316851327593401208105741076214120093531),
+    F2_ONE,
+)
+# Frobenius constants: psi(x, y) = (conj(x) * XI^((p-1)/3), conj(y) * XI^((p-1)/2))
+PSI_X = _f2_pow(XI, (P - 1) // 3)
+PSI_Y = _f2_pow(XI, (P - 1) // 2)
+
+
+# G1 in homogeneous projective coordinates over FQ (y^2 = x^3 + 3)
+
+def _g1_double(pt: G1Point) -> G1Point:
+    x, y, z = pt
+    if not z:
+        return pt
+    w = 3 * x * x % P
+    s = y * z % P
+    b = x * y * s % P
+    h = (w * w - 8 * b) % P
+    s2 = s * s % P
+    return 2 * h * s % P, (w * (4 * b - h) - 8 * y * y * s2) % P, 8 * s * s2 % P
+
+
+def _g1_add(p1: G1Point, p2: G1Point) -> G1Point:
+    if not p1[2]:
+        return p2
+    if not p2[2]:
+        return p1
+    x1, y1, z1 = p1
+    x2, y2, z2 = p2
+    u1, u2 = y2 * z1 % P, y1 * z2 % P
+    v1, v2 = x2 * z1 % P, x1 * z2 % P
+    if v1 == v2:
+        return _g1_double(p1) if u1 == u2 else (1, 1, 0)
+    u, v = u1 - u2, v1 - v2
+    v_sq = v * v % P
+    v_sq_v2 = v_sq * v2 % P
+    v_cu = v * v_sq % P
+    w = z1 * z2 % P
+    a = (u * u * w - v_cu - 2 * v_sq_v2) % P
+    return v * a % P, (u * (v_sq_v2 - a) - v_cu * u2) % P, v_cu * w % P
+
+
+def _g1_mul(pt: G1Point, k: int) -> G1Point:
+    result = (1, 1, 0)
+    for bit in bin(k)[2:] if k else "":
+        result = _g1_double(result)
+        if bit == "1":
+            result = _g1_add(result, pt)
+    return result
+
+
+def _g1_affine(pt: G1Point) -> Optional[Tuple[int, int]]:
+    x, y, z = pt
+    if not z:
+        return None
+    z_inv = pow(z, -1, P)
+    return x * z_inv % P, y * z_inv % P
+
+
+# G2 on the twist y^2 = x^3 + 3/(9+i) over FQ2, homogeneous projective.
+# The add/double steps also return the line through the points, as
+# (M*Z1, N*Z1, M*Y1 - N*X1) for slope N/M, mapped to FQ12 coefficients.
+
+def _line(m, n, x1, y1, z1) -> Line:
+    a = _f2_mul(m, z1)
+    b = _f2_mul(n, z1)
+    c = _f2_sub(_f2_mul(m, y1), _f2_mul(n, x1))
+    # FQ2 element c0 + c1*i is (c0 - 9c1) + c1*w^6 in FQ12
+    return (
+        (a[0] - 9 * a[1]) % P, a[1],
+        (b[0] - 9 * b[1]) % P, b[1],
+        (c[0] - 9 * c[1]) % P, c[1],
+    )
+
+
+def _g2_double_step(pt: G2Point) -> Tuple[Line, G2Point]:
+    x, y, z = pt
+    w = _f2_scale(_f2_sqr(x), 3)
+    s = _f2_mul(y, z)
+    line = _line(_f2_scale(s, 2), w, x, y, z)
+    b = _f2_mul(_f2_mul(x, y), s)
+    h = _f2_sub(_f2_sqr(w), _f2_scale(b, 8))
+    s2 = _f2_sqr(s)
+    new_x = _f2_scale(_f2_mul(h, s), 2)
+    new_y = _f2_sub(_f2_mul(w, _f2_sub(_f2_scale(b, 4), h)), _f2_scale(_f2_mul(_f2_sqr(y), s2), 8))
+    new_z = _f2_scale(_f2_mul(s, s2), 8)
+    return line, (new_x, new_y, new_z)
+
+
+def _g2_add_step(p1: G2Point, p2: G2Point) -> Tuple[Line, G2Point]:
+    x1, y1, z1 = p1
+    x2, y2, z2 = p2
+    u1, u2 = _f2_mul(y2, z1), _f2_mul(y1, z2)
+    v1, v2 = _f2_mul(x2, z1), _f2_mul(x1, z2)
+    u, v = _f2_sub(u1, u2), _f2_sub(v1, v2)
+    line = _line(v, u, x1, y1, z1)
+    if v == F2_ZERO:
+        return line, (_g2_double_step(p1)[1] if u == F2_ZERO else (F2_ONE, F2_ONE, F2_ZERO))
+    v_sq = _f2_sqr(v)
+    v_sq_v2 = _f2_mul(v_sq, v2)
+    v_cu = _f2_mul(v, v_sq)
+    w = _f2_mul(z1, z2)
+    a = _f2_sub(_f2_sub(_f2_mul(_f2_sqr(u), w), v_cu), _f2_scale(v_sq_v2, 2))
+    new_x = _f2_mul(v, a)
+    new_y = _f2_sub(_f2_mul(u, _f2_sub(v_sq_v2, a)), _f2_mul(v_cu, u2))
+    return line, (new_x, new_y, _f2_mul(v_cu, w))
+
+
+def _g2_add(p1: G2Point, p2: G2Point) -> G2Point:
+    if p1[2] == F2_ZERO:
+        return p2
+    if p2[2] == F2_ZERO:
+        return p1
+    return _g2_add_step(p1, p2)[1]
+
+
+def _g2_neg(pt: G2Point) -> G2Point:
+    x, y, z = pt
+    return x, ((-y[0]) % P, (-y[1]) % P), z
+
+
+def _g2_mul(pt: G2Point, k: int) -> G2Point:
+    result = (F2_ONE, F2_ONE, F2_ZERO)
+    for bit in bin(k)[2:] if k else "":
+        if result[2] != F2_ZERO:
+            result = _g2_double_step(result)[1]
+        if bit == "1":
+            result = _g2_add(result, pt)
+    return result
+
+
+def _g2_psi(pt: G2Point) -> G2Point:
+    """Untwist-Frobenius-twist endomorphism"""
+    x, y, z = pt
+    conj = lambda a: (a[0], (-a[1]) % P)
+    return _f2_mul(conj(x), PSI_X), _f2_mul(conj(y), PSI_Y), conj(z)
+
+
+def _g2_eq(p1: G2Point, p2: G2Point) -> bool:
+    x1, y1, z1 = p1
+    x2, y2, z2 = p2
+    return _f2_mul(x1, z2) == _f2_mul(x2, z1) and _f2_mul(y1, z2) == _f2_mul(y2, z1)
+
+
+def _g2_in_subgroup(pt: G2Point) -> bool:
+    # [u+1]Q + psi([u]Q) + psi^2([u]Q) == psi^3([2u]Q) (El Housni, Guillevic, Piellard),
+    # half the work of checking psi(Q) == [6u^2]Q
+    u_pt = _g2_mul(pt, BN_U)
+    lhs = _g2_add(_g2_add(_g2_add(u_pt, pt), _g2_psi(u_pt)), _g2_psi(_g2_psi(u_pt)))
+    rhs = _g2_psi(_g2_psi(_g2_psi(_g2_double_step(u_pt)[1])))
+    return _g2_eq(lhs, rhs)
+
+
+def _g2_lines(q: G2Point) -> List[List[Line]]:
+    """Lines of the optimal ate Miller loop for q, grouped by loop step"""
+    steps = []
+    r = q
+    neg_q = _g2_neg(q)
+    for digit in pseudo_binary_encoding[63::-1]:
+        line, r = _g2_double_step(r)
+        step = [line]
+        if digit:
+            line, r = _g2_add_step(r, q if digit == 1 else neg_q)
+            step.append(line)
+        steps.append(step)
+    q1 = _g2_psi(q)
+    neg_q2 = _g2_neg(_g2_psi(q1))
+    line1, r = _g2_add_step(r, q1)
+    line2, _ = _g2_add_step(r, neg_q2)
+    steps.append([line1, line2])
+    return steps
+
+
+# FQ12 as 12 ints, reduced with w^12 = 18w^6 - 82
+
+F12_ONE = [1] + [0] * 11
+
+
+def _f12_reduce(t: List[int]) -> List[int]:
+    for k in range(len(t) - 1, 11, -1):
+        top = t[k]
+        if top:
+            t[k - 6] += 18 * top
+            t[k - 12] -= 82 * top
+    return [c % P for c in t[:12]]
+
+
+def _f12_mul(a: List[int], b: List[int]) -> List[int]:
+    t = [0] * 23
+    for i, ai in enumerate(a):
+        if ai:
+            for j, bj in enumerate(b):
+                t[i + j] += ai * bj
+    return _f12_reduce(t)
+
+
+def _f12_mul_line(f: List[int], line: Line, x: int, y: int) -> List[int]:
+    """f times the line evaluated at the affine G1 point (x, y): nonzero at w^0,1,3,6,7,9"""
+    a0, a1, b0, b1, c0, c1 = line
+    l0, l6 = -y * a0 % P, -y * a1 % P
+    l1, l7 = x * b0 % P, x * b1 % P
+    t = [0] * 21
+    for i, fi in enumerate(f):
+        if fi:
+            t[i] += fi * l0
+            t[i + 1] += fi * l1
+            t[i + 3] += fi * c0
+            t[i + 6] += fi * l6
+            t[i + 7] += fi * l7
+            t[i + 9] += fi * c1
+    return _f12_reduce(t)
+
+
+def _frobenius_table() -> List[List[Tuple[int, int]]]:
+    # w^(k*p) = w^k * (w^(p-1))^k with w^(p-1) = XI^((p-1)/6) in FQ2
+    gamma = _f2_pow(XI, (P - 1) // 6)
+    table = []
+    power = F2_ONE
+    for k in range(12):
+        u0, u1 = (power[0] - 9 * power[1]) % P, power[1]
+        if k < 6:
+            table.append([(k, u0), (k + 6, u1)])
+        else:
+            table.append([(k, (u0 + 18 * u1) % P), (k - 6, -82 * u1 % P)])
+        power = _f2_mul(power, gamma)
+    return table
+
+
+FROBENIUS = _frobenius_table()
+# (p^4 - p^2 + 1) / r in base p, for a 4-way exponentiation with Frobenius powers
+_HARD = (P ** 4 - P ** 2 + 1) // R
+HARD_DIGITS = [(_HARD // P ** i) % P for i in range(4)]
+
+
+def _f12_frobenius(f: List[int], times: int = 1) -> List[int]:
+    for _ in range(times):
+        t = [0] * 12
+        for fk, image in zip(f, FROBENIUS):
+            if fk:
+                for position, coeff in image:
+                    t[position] += fk * coeff
+        f = [c % P for c in t]
+    return f
+
+
+def _final_exponentiation(f: List[int]) -> List[int]:
+    # Easy part f^((p^6 - 1)(p^2 + 1))
+    f_inv = [int(c) for c in FQ12(f).inv().coeffs]
+    f = _f12_mul(_f12_frobenius(f, 6), f_inv)
+    f = _f12_mul(_f12_frobenius(f, 2), f)
+    # Hard part f^(l0 + l1*p + l2*p^2 + l3*p^3)
+    bases = [f]
+    for _ in range(3):
+        bases.append(_f12_frobenius(bases[-1]))
+    table = [F12_ONE] * 16
+    for mask in range(1, 16):
+        low = mask & -mask
+        table[mask] = _f12_mul(table[mask ^ low], bases[low.bit_length() - 1])
+    result = F12_ONE
+    for bit in range(max(d.bit_length() for d in HARD_DIGITS) - 1, -1, -1):
+        result = _f12_mul(result, result)
+        mask = sum(1 << i for i, digit in enumerate(HARD_DIGITS) if digit >> bit & 1)
+        if mask:
+            result = _f12_mul(result, table[mask])
+    return result
+
+
+def _pairing_product_is_one(pairs: Sequence[Tuple[List[List[Line]], Optional[Tuple[int, int]]]]) -> bool:
+    """Whether the product of e(P, Q) over (lines of Q, affine P) pairs is 1"""
+    pairs = [(lines, point) for lines, point in pairs if point is not None]
+    f = F12_ONE
+    last = len(pairs[0][0]) - 1 if pairs else -1
+    for step in range(last + 1):
+        if step < last:
+            f = _f12_mul(f, f)
+        for lines, (x, y) in pairs:
+            for line in lines[step]:
+                f = _f12_mul_line(f, line, x, y)
+    return _final_exponentiation(f) == F12_ONE
+
+
+def _field_element(value: Any) -> int:
+    number = int(value)
+    if not 0 <= number < P:
+        raise ValueError("Coordinate is not a field element")
+    return number
+
+
+def _g1_from_json(coords: Sequence[Any]) -> G1Point:
+    x, y, z = (_field_element(c) for c in coords[:3])
+    point = _g1_affine((x, y, z))
+    if point is None:
+        raise ValueError("G1 point at infinity")
+    x, y = point
+    if (y * y - x * x * x - 3) % P:
+        raise ValueError("G1 point is not on the curve")
+    return x, y, 1
+
+
+def _g2_from_json(coords: Sequence[Sequence[Any]], check_subgroup: bool = True) -> G2Point:
+    (x0, x1), (y0, y1), (z0, z1) = ((_field_element(a), _field_element(b)) for a, b in coords[:3])
+    x, y, z = (x0, x1), (y0, y1), (z0, z1)
+    if z == F2_ZERO:
+        raise ValueError("G2 point at infinity")
+    # y^2 z = x^3 + b z^3
+    z2 = _f2_sqr(z)
+    if _f2_mul(_f2_sqr(y), z) != _f2_add(_f2_mul(_f2_sqr(x), x), _f2_mul(TWIST_B, _f2_mul(z2, z))):
+        raise ValueError("G2 point is not on the curve")
+    point = (x, y, z)
+    if check_subgroup and not _g2_in_subgroup(point):
+        raise ValueError("G2 point is not in the prime-order subgroup")
+    return point
+
+
+class PreparedVerifyingKey:
+    """A snarkjs Groth16 verification key with the Miller loop lines of beta, gamma and delta precomputed"""
+
+    def __init__(self, vkey: Dict[str, Any]):
+        if vkey.get("protocol") != "groth16" or vkey.get("curve") not in ("bn128", "bn254"):
+            raise ValueError("Only groth16 keys over bn128 are supported")
+        self.n_public = int(vkey["nPublic"])
+        self.alpha = _g1_from_json(vkey["vk_alpha_1"])
+        self.ic = [_g1_from_json(point) for point in vkey["IC"]]
+        if len(self.ic) != self.n_public + 1:
+            raise ValueError("IC does not match nPublic")
+        # Negated so a valid proof makes the whole product 1
+        self.neg_beta_lines = _g2_lines(_g2_neg(_g2_from_json(vkey["vk_beta_2"])))
+        self.neg_gamma_lines = _g2_lines(_g2_neg(_g2_from_json(vkey["vk_gamma_2"])))
+        self.neg_delta_lines = _g2_lines(_g2_neg(_g2_from_json(vkey["vk_delta_2"])))
+
+
+class ParsedProof:
+    def __init__(self, pvk: PreparedVerifyingKey, proof: Dict[str, Any], public_signals: Sequence[Any]):
+        if len(public_signals) != pvk.n_public:
+            raise ValueError(f"Expected {pvk.n_public} public signals, got {len(public_signals)}")
+        self.public = [int(signal) for signal in public_signals]
+        if any(not 0 <= signal < R for signal in self.public):
+            raise ValueError("Public signal is not a field element")
+        try:
+            self.a = _g1_from_json(proof["pi_a"])
+            self.b = _g2_from_json(proof["pi_b"])
+            self.c = _g1_from_json(proof["pi_c"])
+        except (KeyError, TypeError) as e:
+            raise ValueError(f"Malformed proof: {str(e)}")
+        self.b_lines: Optional[List[List[Line]]] = None
+
+    def lines(self) -> List[List[Line]]:
+        if self.b_lines is None:
+            self.b_lines = _g2_lines(self.b)
+        return self.b_lines
+
+
+def verify_parsed(pvk: PreparedVerifyingKey, proofs: Sequence[ParsedProof]) -> bool:
+    """
+    Check proofs against one key with a single pairing product.
+
+    With one proof this is the Groth16 equation e(A, B) = e(alpha, beta) *
+    e(vk_x, gamma) * e(C, delta). With several, each proof's equation is
+    raised to a random 128-bit r_i and the equations are multiplied, so the
+    gamma, delta and beta pairings and the final exponentiation are shared;
+    an invalid proof passes with probability 2^-128.
+    """
+    if not proofs:
+        return True
+    weights = [1] if len(proofs) == 1 else [secrets.randbits(BATCH_BITS) | 1 for _ in proofs]
+    # sum r_i * vk_x_i folds into one combination of the IC points
+    ic_scalars = [sum(weights) % R] + [
+        sum(r * proof.public[j] for r, proof in zip(weights, proofs)) % R for j in range(pvk.n_public)
+    ]
+    vk_x = (1, 1, 0)
+    c = (1, 1, 0)
+    for point, scalar in zip(pvk.ic, ic_scalars):
+        vk_x = _g1_add(vk_x, _g1_mul(point, scalar))
+    pairs = []
+    for r, proof in zip(weights, proofs):
+        pairs.append((proof.lines(), _g1_affine(_g1_mul(proof.a, r) if r != 1 else proof.a)))
+        c = _g1_add(c, _g1_mul(proof.c, r) if r != 1 else proof.c)
+    pairs.append((pvk.neg_beta_lines, _g1_affine(_g1_mul(pvk.alpha, ic_scalars[0]))))
+    pairs.append((pvk.neg_gamma_lines, _g1_affine(vk_x)))
+    pairs.append((pvk.neg_delta_lines, _g1_affine(c)))
+    return _pairing_product_is_one(pairs)
+
+
+def verify_each(pvk: PreparedVerifyingKey, proofs: Sequence[ParsedProof]) -> List[bool]:
+    """Batch check; when it fails, split the batch in halves to find the invalid proofs"""
+    if verify_parsed(pvk, proofs):
+        return [True] * len(proofs)
+    if len(proofs) == 1:
+        return [False]
+    middle = len(proofs) // 2
+    return verify_each(pvk, proofs[:middle]) + verify_each(pvk, proofs[middle:])
+
+
+class Groth16Verifier:
+    """
+    Verifies snarkjs Groth16 proofs against the circuits' verification keys.
+
+    Prepared keys are cached per circuit and vkey content hash, so a rebuilt
+    circuit gets a freshly prepared key. Batches of proofs for one circuit
+    are checked together with a random linear combination.
+    """
+
+    def __init__(self, file_service, max_keys: int = 32):
+        self.file_service = file_service
+        self.max_keys = max_keys
+        self._prepared: "OrderedDict[Tuple[str, str], PreparedVerifyingKey]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        # Metrics
+        self.verified = 0
+        self.rejected = 0
+        self.batches = 0
+        self.prepared = 0
+
+    def prepared_key(self, circuit_name: str) -> Optional[PreparedVerifyingKey]:
+        artifact = self.file_service.get_artifact(circuit_name, "vkey")
+        if artifact is None:
+            return None
+        key = (circuit_name, artifact.digest)
+        with self._lock:
+            pvk = self._prepared.get(key)
+            if pvk is not None:
+                self._prepared.move_to_end(key)
+                return pvk
+        pvk = PreparedVerifyingKey(self.file_service.read_verification_key(circuit_name))
+        with self._lock:
+            self._prepared[key] = pvk
+            self.prepared += 1
+            while len(self._prepared) > self.max_keys:
+                self._prepared.popitem(last=False)
+        return pvk
+
+    def _count(self, results: List[bool]):
+        with self._lock:
+            self.verified += results.count(True)
+            self.rejected += results.count(False)
+
+    def verify(self, pvk: PreparedVerifyingKey, proof: Dict[str, Any], public_signals: Sequence[Any]) -> bool:
+        """Raises ValueError for a malformed proof"""
+        valid = verify_parsed(pvk, [ParsedProof(pvk, proof, public_signals)])
+        self._count([valid])
+        return valid
+
+    def verify_batch(self, pvk: PreparedVerifyingKey,
+                     items: Sequence[Tuple[Dict[str, Any], Sequence[Any]]]) -> List[bool]:
+        """Validity of each (proof, public signals) item; malformed ones are invalid"""
+        results: List[bool] = [False] * len(items)
+        parsed, positions = [], []
+        for i, (proof, public_signals) in enumerate(items):
+            try:
+                parsed.append(ParsedProof(pvk, proof, public_signals))
+                positions.append(i)
+            except (ValueError, TypeError):
+                continue
+        for i, valid in zip(positions, verify_each(pvk, parsed)):
+            results[i] = valid
+        with self._lock:
+            self.batches += 1
+        self._count(results)
+        return results
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "prepared_keys": len(self._prepared),
+                "prepared": self.prepared,
+                "verified": self.verified,
+                "rejected": self.rejected,
+                "batches": self.batches,
+            }
+
+
+def _synthetic_key_and_proofs(n_public: int, count: int) -> Tuple[Dict[str, Any], List[Tuple[Dict[str, Any], List[str]]]]:
+    """
+    A verification key with known trapdoor and proofs that satisfy it.
+
+    Verification cost depends only on nPublic, so this stands in for
+    circuits without real proofs at hand.
+    """
+    def g1_json(k: int) -> List[str]:
+        x, y = _g1_affine(_g1_mul(G1_GENERATOR, k))
+        return [str(x), str(y), "1"]
+
+    def g2_json(k: int) -> List[List[str]]:
+        x, y, z = _g2_mul(G2_GENERATOR, k)
+        z_norm = (z[0] * z[0] + z[1] * z[1]) % P
+        z_inv = _f2_scale((z[0], (-z[1]) % P), pow(z_norm, -1, P))
+        x, y = _f2_mul(x, z_inv), _f2_mul(y, z_inv)
+        return [[str(x[0]), str(x[1])], [str(y[0]), str(y[1])], ["1", "0"]]
+
+    alpha, beta, gamma, delta = (secrets.randbelow(R - 1) + 1 for _ in range(4))
+    ic = [secrets.randbelow(R - 1) + 1 for _ in range(n_public + 1)]
+    vkey = {
+        "protocol": "groth16",
+        "curve": "bn128",
+        "nPublic": n_public,
+        "vk_alpha_1": g1_json(alpha),
+        "vk_beta_2": g2_json(beta),
+        "vk_gamma_2": g2_json(gamma),
+        "vk_delta_2": g2_json(delta),
+        "IC": [g1_json(k) for k in ic],
+    }
+    proofs = []
+    for _ in range(count):
+        public = [secrets.randbelow(R) for _ in range(n_public)]
+        a, b = secrets.randbelow(R - 1) + 1, secrets.randbelow(R - 1) + 1
+        x = (ic[0] + sum(s * k for s, k in zip(public, ic[1:]))) % R
+        # a*b = alpha*beta + x*gamma + c*delta
+        c = (a * b - alpha * beta - x * gamma) * pow(delta, -1, R) % R
+        proof = {"pi_a": g1_json(a), "pi_b": g2_json(b), "pi_c": g1_json(c), "protocol": "groth16", "curve": "bn128"}
+        proofs.append((proof, [str(s) for s in public]))
+    return vkey, proofs
+
+
+# Proofs verified per second, one by one and batched:
+# python -m app.services.groth16_verifier
+# Real proofs are used when build/<name>/proof.json and public.json exist,
+# otherwise synthetic ones for a key with the circuit's nPublic.
+if __name__ == "__main__":
+    import json
+    from pathlib import Path
+
+    build = Path(os.getenv("CIRCUIT_BUILD_PATH", "./app/zk_circuits/build"))
+    for circuit_name in ("multiply", "dummy"):
+        circuit_dir = build / circuit_name
+        vkey = json.loads((circuit_dir / f"verification_key_{circuit_name}.json").read_text())
+        proof_path, public_path = circuit_dir / "proof.json", circuit_dir / "public.json"
+        if proof_path.exists() and public_path.exists():
+            source = "real proof"
+            samples = [(json.loads(proof_path.read_text()), json.loads(public_path.read_text()))]
+        else:
+            source = "synthetic proofs"
+            vkey, samples = _synthetic_key_and_proofs(int(vkey["nPublic"]), 16)
+
+        start = time.perf_counter()
+        pvk = PreparedVerifyingKey(vkey)
+        print(f"{circuit_name} (nPublic={pvk.n_public}, {source}): key prepared in "
+              f"{(time.perf_counter() - start) * 1000:.0f} ms")
+        for size in (1, 16, 256):
+            items = [samples[i % len(samples)] for i in range(size)]
+            start = time.perf_counter()
+            assert all(verify_parsed(pvk, [ParsedProof(pvk, proof, public)]) for proof, public in items)
+            single = size / (time.perf_counter() - start)
+            start = time.perf_counter()
+            assert verify_parsed(pvk, [ParsedProof(pvk, proof, public) for proof, public in items])
+            batched = size / (time.perf_counter() - start)
+            print(f"  batch {size:>3}: {single:8.1f} proofs/s one by one, {batched:8.1f} proofs/s batched")
@@ -0,0 +1,176 @@
+import os
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+from .agent_executor import ExecutorSaturatedError
+from .job_store import (
+    job_store, QUEUED, RUNNING, SUBMITTED, MINED, COMPLETED, FAILED
+)
+
+# A handler receives the job payload and an emit callback for progress events
+JobHandler = Callable[[dict, Callable[[dict], None]], Any]
+
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+# States a running job passes through, in order
+PROGRESS = [RUNNING, SUBMITTED, MINED]
+
+
+def _worker_alive(worker: Optional[str]) -> bool:
+    """Whether the process that claimed a job still runs (only decidable on this host)"""
+    if not worker:
+        return False
+    host, _, pid = worker.rpartition(":")
+    if host != socket.gethostname():
+        return True
+    try:
+        os.kill(int(pid), 0)
+    except (ValueError, ProcessLookupError):
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class JobRunner:
+    """
+    Executes persisted jobs on a worker pool.
+
+    Progress events from on-chain tools move a job forward through
+    submitted (transaction hash known) and mined while it runs. On startup queued jobs are re-enqueued;
+    jobs that were mid-flight when the process died are failed rather than
+    re-run, since replaying an on-chain action could send it twice.
+    """
+
+    def __init__(self, max_workers: int = 16, max_queued: int = 1000, retention: float = 86400.0,
+                 cleanup_interval: float = 600.0):
+        self.max_workers = max_workers
+        self.max_queued = max_queued
+        self.retention = retention
+        self.cleanup_interval = cleanup_interval
+        self._handlers: Dict[str, JobHandler] = {}
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job-worker")
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._stopping = threading.Event()
+        self._cleanup_thread: Optional[threading.Thread] = None
+
+        # Metrics
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.cleaned = 0
+
+    def register(self, kind: str, handler: JobHandler):
+        self._handlers[kind] = handler
+
+    def submit(self, user_id: str, kind: str, payload: dict) -> str:
+        """Persist a job and queue it, returning its id immediately"""
+        if kind not in self._handlers:
+            raise ValueError(f"Unknown job kind: {kind}")
+        with self._lock:
+            if self._queued >= self.max_queued:
+                raise ExecutorSaturatedError("Job queue is full, try again later")
+            self._queued += 1
+            self.submitted += 1
+        job_id = job_store.create(user_id, kind, payload)
+        self._pool.submit(self._execute, job_id, kind, payload)
+        return job_id
+
+    def _execute(self, job_id: str, kind: str, payload: dict):
+        with self._lock:
+            self._queued -= 1
+        if not job_store.claim(job_id, WORKER_ID):
+            # Another worker process picked it up during recovery
+            return
+
+        # Only moves forward: running -> submitted (a transaction hash is known) -> mined
+        progress = {"state": RUNNING, "awaiting_receipt": False}
+
+        def emit(event: dict):
+            kind = event.get("event")
+            if kind not in ("tool_started", "tx_submitted", "tool_finished", "tool_failed"):
+                return
+            state = progress["state"]
+            if kind == "tx_submitted":
+                progress["awaiting_receipt"] = True
+                if PROGRESS.index(state) < PROGRESS.index(SUBMITTED):
+                    state = SUBMITTED
+            elif kind in ("tool_finished", "tool_failed") and event.get("onchain"):
+                # A tool that returned after submitting waited for its transaction
+                if kind == "tool_finished" and progress["awaiting_receipt"]:
+                    state = MINED
+                progress["awaiting_receipt"] = False
+            progress["state"] = state
+            job_store.update(job_id, state, event=event)
+
+        try:
+            result = self._handlers[kind](payload, emit)
+            job_store.update(job_id, COMPLETED, result=result)
+            with self._lock:
+                self.completed += 1
+        except Exception as e:
+            print(f"Job {job_id} failed: {str(e)}")
+            job_store.update(job_id, FAILED, error=str(e))
+            with self._lock:
+                self.failed += 1
+
+    def recover(self):
+        """Resume jobs left behind by a previous process"""
+        for job_id in job_store.ids_in_states([RUNNING, SUBMITTED, MINED]):
+            job = job_store.get(job_id)
+            if job["worker"] != WORKER_ID and not _worker_alive(job["worker"]):
+                job_store.update(job_id, FAILED, error="Interrupted by a server restart")
+        for job_id in job_store.ids_in_states([QUEUED]):
+            job = job_store.get(job_id)
+            if job["kind"] not in self._handlers:
+                job_store.update(job_id, FAILED, error=f"Unknown job kind: {job['kind']}")
+                continue
+            with self._lock:
+                self._queued += 1
+            self._pool.submit(self._execute, job_id, job["kind"], job["payload"])
+            print(f"Re-queued job {job_id}")
+
+    def cleanup(self) -> int:
+        """Delete finished jobs older than the retention period"""
+        removed = job_store.delete_finished_before(time.time() - self.retention)
+        with self._lock:
+            self.cleaned += removed
+        return removed
+
+    def _cleanup_loop(self):
+        while not self._stopping.wait(self.cleanup_interval):
+            try:
+                self.cleanup()
+            except Exception as e:
+                print(f"Error cleaning up jobs: {str(e)}")
+
+    def start(self):
+        self.recover()
+        self._cleanup_thread = threading.Thread(target=self._cleanup_loop, name="job-cleanup", daemon=True)
+        self._cleanup_thread.start()
+
+    def shutdown(self):
+        self._stopping.set()
+        self._pool.shutdown(wait=False)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "max_workers": self.max_workers,
+                "queued": self._queued,
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "failed": self.failed,
+                "cleaned": self.cleaned,
+                "retention_seconds": self.retention,
+            }
+
+
+job_runner = JobRunner(
+    max_workers=int(os.getenv("JOB_WORKERS", "16")),
+    max_queued=int(os.getenv("JOB_MAX_QUEUED", "1000")),
+    retention=float(os.getenv("JOB_RETENTION_SECONDS", "86400")),
+)
@@ -0,0 +1,152 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+QUEUED = "queued"
+RUNNING = "running"
+SUBMITTED = "submitted"
+MINED = "mined"
+COMPLETED = "completed"
+FAILED = "failed"
+
+TERMINAL_STATES = {COMPLETED, FAILED}
+
+
+class JobStore:
+    """SQLite-backed store of asynchronous jobs, so they survive restarts"""
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS jobs (
+                    job_id TEXT PRIMARY KEY,
+                    user_id TEXT NOT NULL,
+                    kind TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    state TEXT NOT NULL,
+                    result TEXT,
+                    error TEXT,
+                    events TEXT NOT NULL DEFAULT '[]',
+                    worker TEXT,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL,
+                    finished_at REAL
+                ) WITHOUT ROWID
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_user ON jobs (user_id, created_at)")
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_state ON jobs (state)")
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_finished ON jobs (finished_at)")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _to_dict(row: sqlite3.Row) -> Dict[str, Any]:
+        return {
+            "job_id": row["job_id"],
+            "user_id": row["user_id"],
+            "kind": row["kind"],
+            "payload": json.loads(row["payload"]),
+            "state": row["state"],
+            "result": json.loads(row["result"]) if row["result"] is not None else None,
+            "error": row["error"],
+            "events": json.loads(row["events"]),
+            "worker": row["worker"],
+            "created_at": row["created_at"],
+            "updated_at": row["updated_at"],
+            "finished_at": row["finished_at"],
+        }
+
+    def create(self, user_id: str, kind: str, payload: dict) -> str:
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                """
+                INSERT INTO jobs (job_id, user_id, kind, payload, state, created_at, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                """,
+                (job_id, user_id, kind, json.dumps(payload), QUEUED, now, now),
+            )
+        return job_id
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        row = self._connect().execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return self._to_dict(row) if row else None
+
+    def list_for_user(self, user_id: str, limit: int = 50) -> List[Dict[str, Any]]:
+        rows = self._connect().execute(
+            "SELECT * FROM jobs WHERE user_id = ? ORDER BY created_at DESC LIMIT ?", (user_id, limit)
+        ).fetchall()
+        return [self._to_dict(row) for row in rows]
+
+    def claim(self, job_id: str, worker: str) -> bool:
+        """Atomically move a queued job to running; False if another worker got it first"""
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET state = ?, worker = ?, updated_at = ? WHERE job_id = ? AND state = ?",
+                (RUNNING, worker, time.time(), job_id, QUEUED),
+            )
+        return cursor.rowcount == 1
+
+    def ids_in_states(self, states: List[str]) -> List[str]:
+        placeholders = ", ".join("?" for _ in states)
+        rows = self._connect().execute(
+            f"SELECT job_id FROM jobs WHERE state IN ({placeholders}) ORDER BY created_at", states
+        ).fetchall()
+        return [row["job_id"] for row in rows]
+
+    def update(self, job_id: str, state: str, result: Any = None, error: Optional[str] = None,
+               event: Optional[dict] = None):
+        """Move a job to a new state, optionally recording its result, error or a progress event"""
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                """
+                UPDATE jobs SET
+                    state = ?,
+                    result = COALESCE(?, result),
+                    error = COALESCE(?, error),
+                    events = CASE WHEN ? IS NULL THEN events ELSE json_insert(events, '$[#]', json(?)) END,
+                    updated_at = ?,
+                    finished_at = CASE WHEN ? THEN ? ELSE finished_at END
+                WHERE job_id = ?
+                """,
+                (
+                    state,
+                    json.dumps(result, default=str) if result is not None else None,
+                    error,
+                    json.dumps(event, default=str) if event is not None else None,
+                    json.dumps(event, default=str) if event is not None else None,
+                    now,
+                    state in TERMINAL_STATES,
+                    now,
+                    job_id,
+                ),
+            )
+
+    def delete_finished_before(self, cutoff: float) -> int:
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "DELETE FROM jobs WHERE finished_at IS NOT NULL AND finished_at < ?", (cutoff,)
+            )
+        return cursor.rowcount
+
+
+job_store = JobStore(os.getenv("JOB_STORE_PATH", os.path.join("user_data", "jobs.db")))
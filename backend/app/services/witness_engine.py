@@ -0,0 +1,409 @@
+import struct
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+import wasmtime
+
+# Witness computation from the wasm that circom emits next to each build
+# (build/<name>/<name>_js/<name>.wasm), following the protocol of the
+# witness_calculator.js it ships with: init, write every input signal
+# through the shared read/write memory, then read the witness back one
+# field element at a time.
+#
+# Compiling the module is the expensive part, so it happens once per wasm
+# content hash, and each circuit keeps a pool of instantiated modules that
+# are re-initialized for every witness instead of being rebuilt.
+
+# Codes passed to runtime.exceptionHandler
+RUNTIME_ERRORS = {
+    1: "Signal not found.",
+    2: "Too many signals set.",
+    3: "Signal already set.",
+    4: "Assert Failed.",
+    5: "Not enough memory.",
+    6: "Input signal array access exceeds the size.",
+}
+
+FNV_OFFSET = 0xCBF29CE484222325
+FNV_PRIME = 0x100000001B3
+
+
+def _fnv_hash(name: str) -> Tuple[int, int]:
+    """64-bit FNV-1a of a signal name, split into the (msb, lsb) halves the wasm expects"""
+    h = FNV_OFFSET
+    for c in name:
+        h = ((h ^ ord(c)) * FNV_PRIME) & 0xFFFFFFFFFFFFFFFF
+    return h >> 32, h & 0xFFFFFFFF
+
+
+def _flatten(value: Any, out: List[Any]) -> List[Any]:
+    if isinstance(value, (list, tuple)):
+        for item in value:
+            _flatten(item, out)
+    else:
+        out.append(value)
+    return out
+
+
+def _qualify(prefix: str, value: Any, out: Dict[str, Any]):
+    """Flatten nested inputs into signal names ("a.b", "c[1].d") like qualify_input"""
+    if isinstance(value, (list, tuple)):
+        flat = _flatten(value, [])
+        nested = [isinstance(item, dict) for item in flat]
+        if any(nested) and not all(nested):
+            raise ValueError(f"Types are not the same in the key {prefix}")
+        if flat and nested[0]:
+            for i, item in enumerate(value):
+                _qualify(f"{prefix}[{i}]", item, out)
+        else:
+            out[prefix] = value
+    elif isinstance(value, dict):
+        for key, item in value.items():
+            _qualify(f"{prefix}.{key}" if prefix else key, item, out)
+    else:
+        out[prefix] = value
+
+
+def _field_element(value: Any, prime: int) -> int:
+    if isinstance(value, bool):
+        value = int(value)
+    elif isinstance(value, float) and value.is_integer():
+        value = int(value)
+    elif isinstance(value, str):
+        text = value.strip()
+        try:
+            value = int(text, 16) if text.lower().startswith(("0x", "-0x")) else int(text)
+        except ValueError:
+            raise ValueError(f"Invalid field element {value!r}")
+    if not isinstance(value, int):
+        raise ValueError(f"Invalid field element {value!r}")
+    return value % prime
+
+
+class WitnessCalculator:
+    """One instantiated circuit module; not thread-safe, the pool hands it to one caller at a time"""
+
+    def __init__(self, engine: wasmtime.Engine, module: wasmtime.Module):
+        self.store = wasmtime.Store(engine)
+        self._errors: List[str] = []
+        self._message = ""
+
+        i32 = wasmtime.ValType.i32()
+        linker = wasmtime.Linker(engine)
+        linker.define_func("runtime", "exceptionHandler", wasmtime.FuncType([i32], []), self._exception)
+        linker.define_func("runtime", "printErrorMessage", wasmtime.FuncType([], []), self._print_error)
+        linker.define_func("runtime", "writeBufferMessage", wasmtime.FuncType([], []), self._write_buffer)
+        linker.define_func("runtime", "showSharedRWMemory", wasmtime.FuncType([], []), self._show_shared)
+        exports = linker.instantiate(self.store, module).exports(self.store)
+
+        self._init = exports["init"]
+        self._get_signal_size = exports["getInputSignalSize"]
+        self._set_signal = exports["setInputSignal"]
+        self._get_witness = exports["getWitness"]
+        self._get_message_char = exports["getMessageChar"]
+        self._read_word = exports["readSharedRWMemory"]
+        self._write_word = exports["writeSharedRWMemory"]
+        self._memory = exports["memory"] if "memory" in exports else None
+        # Newer circom builds export where the shared memory lives, so it can be
+        # read and written in one go instead of word by word
+        shared_start = exports["getSharedRWMemoryStart"] if "getSharedRWMemoryStart" in exports else None
+        self._shared = shared_start(self.store) if shared_start is not None and self._memory is not None else None
+
+        self.version = exports["getVersion"](self.store)
+        self.n32 = exports["getFieldNumLen32"](self.store)
+        self.n8 = self.n32 * 4
+        exports["getRawPrime"](self.store)
+        self.prime_bytes = self._read_shared()
+        self.prime = int.from_bytes(self.prime_bytes, "little")
+        self.witness_size = exports["getWitnessSize"](self.store)
+        self.input_size = exports["getInputSize"](self.store)
+
+    def _get_message(self) -> str:
+        chars = []
+        c = self._get_message_char(self.store)
+        while c != 0:
+            chars.append(chr(c))
+            c = self._get_message_char(self.store)
+        return "".join(chars)
+
+    def _exception(self, code: int):
+        raise ValueError(RUNTIME_ERRORS.get(code, "Unknown error.") + "".join(f"\n{e}" for e in self._errors))
+
+    def _print_error(self):
+        self._errors.append(self._get_message())
+
+    def _write_buffer(self):
+        # Every log() call in the circuit ends with a lone "\n"
+        message = self._get_message()
+        if message == "\n":
+            print(self._message)
+            self._message = ""
+        else:
+            self._message = f"{self._message} {message}" if self._message else message
+
+    def _show_shared(self):
+        value = str(int.from_bytes(self._read_shared(), "little"))
+        self._message = f"{self._message} {value}" if self._message else value
+
+    def _read_shared(self) -> bytes:
+        if self._shared is not None:
+            return bytes(self._memory.read(self.store, self._shared, self._shared + self.n8))
+        return b"".join(struct.pack("<I", self._read_word(self.store, j)) for j in range(self.n32))
+
+    def _write_shared(self, value: int):
+        data = value.to_bytes(self.n8, "little")
+        if self._shared is not None:
+            self._memory.write(self.store, data, self._shared)
+            return
+        for j in range(self.n32):
+            self._write_word(self.store, j, int.from_bytes(data[4 * j:4 * j + 4], "little"))
+
+    def _set_inputs(self, inputs: Dict[str, Any], signals: Dict[str, Tuple[int, int, int]], sanity_check: bool):
+        self._errors = []
+        self._init(self.store, 1 if sanity_check else 0)
+        qualified: Dict[str, Any] = {}
+        _qualify("", inputs, qualified)
+        count = 0
+        for name, value in qualified.items():
+            signal = signals.get(name)
+            if signal is None:
+                msb, lsb = _fnv_hash(name)
+                signal = (msb, lsb, self._get_signal_size(self.store, msb, lsb))
+                if signal[2] <= 0:
+                    raise ValueError(f"Signal {name} not found")
+                # Only the circuit's own signals are remembered, not whatever names callers send
+                signals[name] = signal
+            msb, lsb, size = signal
+            values = _flatten(value, [])
+            if len(values) < size:
+                raise ValueError(f"Not enough values for input signal {name}")
+            if len(values) > size:
+                raise ValueError(f"Too many values for input signal {name}")
+            for i, item in enumerate(values):
+                self._write_shared(_field_element(item, self.prime))
+                self._set_signal(self.store, msb, lsb, i)
+                count += 1
+        if count < self.input_size:
+            raise ValueError(f"Not all inputs have been set. Only {count} out of {self.input_size}")
+
+    def witness_bytes(self, inputs: Dict[str, Any], signals: Dict[str, Tuple[int, int, int]],
+                      sanity_check: bool = False) -> bytes:
+        """Witness as consecutive little-endian field elements of n8 bytes"""
+        self._set_inputs(inputs, signals, sanity_check)
+        chunks = []
+        for i in range(self.witness_size):
+            self._get_witness(self.store, i)
+            chunks.append(self._read_shared())
+        return b"".join(chunks)
+
+
+class WitnessPoolBusyError(Exception):
+    """Raised when every calculator of a circuit stays busy for the whole acquire timeout"""
+
+
+class WitnessPool:
+    """
+    Compiled module of one circuit build and at most `size` instantiated
+    calculators; callers beyond that wait for one to be released.
+    """
+
+    def __init__(self, engine: wasmtime.Engine, wasm_path: str, size: int, acquire_timeout: float):
+        self.engine = engine
+        self.module = wasmtime.Module.from_file(engine, wasm_path)
+        self.size = size
+        self.acquire_timeout = acquire_timeout
+        # Signal name -> (hash msb, hash lsb, size); identical for every instance
+        self.signals: Dict[str, Tuple[int, int, int]] = {}
+        self._idle: List[WitnessCalculator] = [WitnessCalculator(engine, self.module) for _ in range(size)]
+        self._available = threading.Condition()
+        # Calculators in existence, idle or handed out
+        self._live = size
+        self.instantiated = size
+
+    def acquire(self) -> WitnessCalculator:
+        deadline = time.monotonic() + self.acquire_timeout
+        with self._available:
+            while not self._idle and self._live >= self.size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise WitnessPoolBusyError(f"All {self.size} witness calculators are busy")
+                self._available.wait(remaining)
+            if self._idle:
+                return self._idle.pop()
+            # A discarded calculator left room for a replacement
+            self._live += 1
+        try:
+            calculator = WitnessCalculator(self.engine, self.module)
+        except Exception:
+            self.discard()
+            raise
+        with self._available:
+            self.instantiated += 1
+        return calculator
+
+    def release(self, calculator: WitnessCalculator):
+        with self._available:
+            self._idle.append(calculator)
+            self._available.notify()
+
+    def discard(self):
+        """Give up the slot of a calculator that can't be reused"""
+        with self._available:
+            self._live -= 1
+            self._available.notify()
+
+    def idle(self) -> int:
+        return len(self._idle)
+
+
+class WitnessEngine:
+    """
+    Computes witnesses for the compiled circuits under build/.
+
+    Modules are compiled once per circuit and wasm content hash, so a
+    rebuilt circuit gets a fresh pool. Calculators go back to their pool
+    after bad inputs or failed asserts; one that hit a wasm trap or any
+    other error is dropped and replaced on demand. A request that finds
+    all `pool_size` calculators busy waits up to `acquire_timeout` seconds.
+    """
+
+    def __init__(self, file_service, pool_size: int = 4, max_circuits: int = 16, acquire_timeout: float = 10):
+        self.file_service = file_service
+        self.pool_size = pool_size
+        self.acquire_timeout = acquire_timeout
+        self.max_circuits = max_circuits
+        self.engine = wasmtime.Engine()
+        self._pools: "OrderedDict[Tuple[str, str], WitnessPool]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        # Metrics
+        self.compiled = 0
+        self.witnesses = 0
+        self.failures = 0
+
+    def pool(self, circuit_name: str) -> Optional[WitnessPool]:
+        artifact = self.file_service.get_artifact(circuit_name, "wasm")
+        if artifact is None:
+            return None
+        key = (circuit_name, artifact.digest)
+        with self._lock:
+            pool = self._pools.get(key)
+            if pool is not None:
+                self._pools.move_to_end(key)
+                return pool
+        pool = WitnessPool(self.engine, str(artifact.path), self.pool_size, self.acquire_timeout)
+        with self._lock:
+            existing = self._pools.get(key)
+            if existing is not None:
+                # Another thread compiled the same build first; use its pool
+                pool = existing
+            else:
+                self._pools[key] = pool
+                self.compiled += 1
+            self._pools.move_to_end(key)
+            while len(self._pools) > self.max_circuits:
+                self._pools.popitem(last=False)
+        return pool
+
+    def _run(self, circuit_name: str, inputs: Dict[str, Any], sanity_check: bool) -> Optional[Tuple[WitnessCalculator, bytes]]:
+        pool = self.pool(circuit_name)
+        if pool is None:
+            return None
+        calculator = pool.acquire()
+        try:
+            witness = calculator.witness_bytes(inputs, pool.signals, sanity_check)
+        except ValueError:
+            # Bad inputs and failed circuit asserts; init() resets the instance on next use
+            pool.release(calculator)
+            with self._lock:
+                self.failures += 1
+            raise
+        except Exception:
+            # A wasm trap or anything unexpected leaves the instance in an unknown state
+            pool.discard()
+            with self._lock:
+                self.failures += 1
+            raise
+        pool.release(calculator)
+        with self._lock:
+            self.witnesses += 1
+        return calculator, witness
+
+    def calculate(self, circuit_name: str, inputs: Dict[str, Any], sanity_check: bool = False) -> Optional[List[int]]:
+        """Witness values for a circuit, None if it isn't built; raises ValueError for bad inputs"""
+        result = self._run(circuit_name, inputs, sanity_check)
+        if result is None:
+            return None
+        calculator, witness = result
+        n8 = calculator.n8
+        return [int.from_bytes(witness[i:i + n8], "little") for i in range(0, len(witness), n8)]
+
+    def calculate_wtns(self, circuit_name: str, inputs: Dict[str, Any], sanity_check: bool = False) -> Optional[bytes]:
+        """Witness in snarkjs' binary .wtns format, ready for proving"""
+        result = self._run(circuit_name, inputs, sanity_check)
+        if result is None:
+            return None
+        calculator, witness = result
+        n8 = calculator.n8
+        return b"".join((
+            struct.pack("<4sII", b"wtns", 2, 2),
+            # Section 1: field size, prime and witness length
+            struct.pack("<IQI", 1, 8 + n8, n8),
+            calculator.prime_bytes,
+            struct.pack("<I", calculator.witness_size),
+            # Section 2: the witness itself
+            struct.pack("<IQ", 2, n8 * calculator.witness_size),
+            witness,
+        ))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "circuits": len(self._pools),
+                "idle_instances": sum(pool.idle() for pool in self._pools.values()),
+                "instantiated": sum(pool.instantiated for pool in self._pools.values()),
+                "compiled": self.compiled,
+                "witnesses": self.witnesses,
+                "failures": self.failures,
+            }
+
+
+# Inputs for the example circuits in circuits/; other builds can put an input.json next to their artifacts
+SAMPLE_INPUTS = {
+    "multiply": {"a": 3, "b": 11, "c": 33, "d": 14},
+    "dummy": {"x": 3},
+}
+
+
+# Cold vs warm witness generation for the circuits under build/:
+# python -m app.services.witness_engine
+if __name__ == "__main__":
+    import json
+    from .file_service import CircuitFileService
+
+    file_service = CircuitFileService("./app/zk_circuits/build")
+    for circuit_name in sorted(file_service.manifest.circuits()):
+        input_path = file_service.base_path / circuit_name / "input.json"
+        if input_path.exists():
+            inputs = json.loads(input_path.read_text())
+        elif circuit_name in SAMPLE_INPUTS:
+            inputs = SAMPLE_INPUTS[circuit_name]
+        else:
+            print(f"{circuit_name}: no input.json, skipped")
+            continue
+
+        engine = WitnessEngine(file_service)
+        start = time.perf_counter()
+        witness = engine.calculate(circuit_name, inputs)
+        cold = time.perf_counter() - start
+
+        count = 0
+        start = time.perf_counter()
+        while time.perf_counter() - start < 1.0:
+            engine.calculate(circuit_name, inputs)
+            count += 1
+        warm = (time.perf_counter() - start) / count
+        print(f"{circuit_name}: {len(witness)} signals, first call (compile + instantiate) {cold * 1000:.1f} ms, "
+              f"pooled {warm * 1e6:.0f} us/witness")
@@ -0,0 +1,258 @@
+import re
+import threading
+import time
+from typing import Any, Callable, Dict, List, Mapping, Optional, Sequence, Tuple
+
+import eth_abi
+from eth_utils.abi import (
+    event_abi_to_log_topic,
+    function_abi_to_4byte_selector,
+    get_abi_input_types,
+)
+
+_STATIC_TYPE = re.compile(r"^(address|bool|u?int(\d*)|bytes(\d+))$")
+_HEX_ADDRESS = re.compile(r"^0x[0-9a-fA-F]{40}$")
+
+
+def _check_integer(abi_type: str, value: Any):
+    # Like eth_abi: no floats, numeric strings or bools, which int() would quietly convert
+    if not isinstance(value, int) or isinstance(value, bool):
+        raise TypeError(f"{abi_type} expects an int, got {type(value).__name__} {value!r}")
+
+
+def _word_encoder(abi_type: str) -> Optional[Callable[[Any], str]]:
+    """Encoder of one value to a 64-hex-char word, None for types that need eth_abi"""
+    match = _STATIC_TYPE.match(abi_type)
+    if match is None:
+        return None
+    if abi_type == "address":
+        def encode_address(value: Any) -> str:
+            if isinstance(value, (bytes, bytearray)) and len(value) == 20:
+                return bytes(value).hex().rjust(64, "0")
+            if not isinstance(value, str) or not _HEX_ADDRESS.match(value):
+                raise ValueError(f"Invalid address: {value!r}")
+            return value[2:].lower().rjust(64, "0")
+        return encode_address
+    if abi_type == "bool":
+        def encode_bool(value: Any) -> str:
+            if not isinstance(value, bool):
+                raise TypeError(f"bool expects True or False, got {value!r}")
+            return "1".rjust(64, "0") if value else "0" * 64
+        return encode_bool
+    if abi_type.startswith("bytes"):
+        size = int(match.group(3))
+
+        def encode_fixed_bytes(value: Any) -> str:
+            if isinstance(value, str):
+                value = bytes.fromhex(value[2:] if value.startswith("0x") else value)
+            if len(value) > size:
+                raise ValueError(f"Value is longer than {abi_type}")
+            return bytes(value).hex().ljust(64, "0")
+        return encode_fixed_bytes
+
+    bits = int(match.group(2) or 256)
+    if abi_type.startswith("uint"):
+        limit = 2 ** bits
+
+        def encode_uint(value: Any) -> str:
+            _check_integer(abi_type, value)
+            if not 0 <= value < limit:
+                raise ValueError(f"{value} is out of range for {abi_type}")
+            return format(value, "064x")
+        return encode_uint
+
+    low, high = -(2 ** (bits - 1)), 2 ** (bits - 1)
+
+    def encode_int(value: Any) -> str:
+        _check_integer(abi_type, value)
+        if not low <= value < high:
+            raise ValueError(f"{value} is out of range for {abi_type}")
+        return format(value % 2 ** 256, "064x")
+    return encode_int
+
+
+def _word_decoder(abi_type: str) -> Optional[Callable[[str], Any]]:
+    """Decoder of one 64-hex-char word, None for types that need eth_abi"""
+    match = _STATIC_TYPE.match(abi_type)
+    if match is None:
+        return None
+    if abi_type == "address":
+        return lambda word: "0x" + word[24:].lower()
+    if abi_type == "bool":
+        return lambda word: int(word, 16) != 0
+    if abi_type.startswith("bytes"):
+        size = int(match.group(3))
+        return lambda word: bytes.fromhex(word[:2 * size])
+    if abi_type.startswith("uint"):
+        return lambda word: int(word, 16)
+
+    def decode_int(word: str) -> int:
+        value = int(word, 16)
+        return value - 2 ** 256 if value >= 2 ** 255 else value
+    return decode_int
+
+
+def _lower_addresses(value: Any) -> Any:
+    # eth_abi returns checksummed addresses; the fast path returns lowercase
+    if isinstance(value, str) and _HEX_ADDRESS.match(value):
+        return value.lower()
+    if isinstance(value, (list, tuple)):
+        return type(value)(_lower_addresses(item) for item in value)
+    return value
+
+
+class FunctionEncoder:
+    """Calldata encoder for one function with its selector computed once"""
+
+    def __init__(self, abi: dict):
+        self.name = abi["name"]
+        self.types: List[str] = get_abi_input_types(abi)
+        self.signature = f"{self.name}({','.join(self.types)})"
+        self.selector = "0x" + function_abi_to_4byte_selector(abi).hex()
+        encoders = [_word_encoder(abi_type) for abi_type in self.types]
+        # Every argument is one word: no offsets, just concatenation
+        self._words: Optional[List[Callable[[Any], str]]] = None if None in encoders else encoders
+
+    def encode(self, *args: Any) -> str:
+        if len(args) != len(self.types):
+            raise TypeError(f"{self.signature} takes {len(self.types)} arguments, got {len(args)}")
+        if self._words is not None:
+            return self.selector + "".join(encode(arg) for encode, arg in zip(self._words, args))
+        return self.selector + eth_abi.encode(self.types, args).hex()
+
+
+class EventDecoder:
+    """Log decoder for one event, keyed by its topic0"""
+
+    def __init__(self, abi: dict):
+        self.name = abi["name"]
+        self.topic0 = "0x" + event_abi_to_log_topic(abi).hex()
+        inputs = abi["inputs"]
+        types = get_abi_input_types(abi)
+        self.indexed: List[Tuple[str, str]] = [
+            (arg["name"], abi_type) for arg, abi_type in zip(inputs, types) if arg.get("indexed")
+        ]
+        self.data: List[Tuple[str, str]] = [
+            (arg["name"], abi_type) for arg, abi_type in zip(inputs, types) if not arg.get("indexed")
+        ]
+        self.names = [arg["name"] for arg in inputs]
+        # Dynamic indexed values are stored as their hash, so they stay hex
+        self._topic_decoders = [_word_decoder(abi_type) for _, abi_type in self.indexed]
+        decoders = [_word_decoder(abi_type) for _, abi_type in self.data]
+        self._data_words: Optional[List[Callable[[str], Any]]] = None if None in decoders else decoders
+        self._data_types = [abi_type for _, abi_type in self.data]
+
+    def decode(self, log: Mapping[str, Any]) -> Dict[str, Any]:
+        """Arguments of a raw JSON-RPC log, in ABI order"""
+        values: Dict[str, Any] = {}
+        topics = log["topics"]
+        for (name, _), decode, topic in zip(self.indexed, self._topic_decoders, topics[1:]):
+            values[name] = decode(topic[2:]) if decode is not None else topic
+        data = log["data"][2:]
+        if self._data_words is not None:
+            for i, ((name, _), decode) in enumerate(zip(self.data, self._data_words)):
+                values[name] = decode(data[64 * i:64 * (i + 1)])
+        elif self.data:
+            decoded = eth_abi.decode(self._data_types, bytes.fromhex(data))
+            for (name, _), value in zip(self.data, decoded):
+                values[name] = _lower_addresses(value)
+        return {name: values[name] for name in self.names}
+
+
+class CompiledABI:
+    """Function encoders by name and signature, event decoders by topic0"""
+
+    def __init__(self, abi: Sequence[dict]):
+        self.functions: Dict[str, FunctionEncoder] = {}
+        self.events: Dict[str, EventDecoder] = {}
+        for item in abi:
+            if item.get("type") == "function":
+                encoder = FunctionEncoder(item)
+                # First overload wins for the bare name; signatures are exact
+                self.functions.setdefault(encoder.name, encoder)
+                self.functions[encoder.signature] = encoder
+            elif item.get("type") == "event" and not item.get("anonymous"):
+                decoder = EventDecoder(item)
+                self.events[decoder.topic0] = decoder
+
+    def encode(self, function: str, *args: Any) -> str:
+        return self.functions[function].encode(*args)
+
+    def decode_log(self, log: Mapping[str, Any]) -> Optional[Tuple[str, Dict[str, Any]]]:
+        """(event name, arguments), or None for logs this ABI doesn't declare"""
+        topics = log.get("topics")
+        decoder = self.events.get(topics[0]) if topics else None
+        if decoder is None:
+            return None
+        return decoder.name, decoder.decode(log)
+
+
+# id(abi) -> (abi, compiled); holding the ABI keeps its id from being reused
+_compiled: Dict[int, Tuple[Sequence[dict], CompiledABI]] = {}
+_compiled_lock = threading.Lock()
+
+
+def compile_abi(abi: Sequence[dict]) -> CompiledABI:
+    """Compiled codec for an ABI list, built once per ABI object"""
+    entry = _compiled.get(id(abi))
+    if entry is None or entry[0] is not abi:
+        with _compiled_lock:
+            entry = _compiled.get(id(abi))
+            if entry is None or entry[0] is not abi:
+                entry = _compiled[id(abi)] = (abi, CompiledABI(abi))
+    return entry[1]
+
+
+def _bench(label: str, fn: Callable[[], Any], seconds: float = 1.0) -> float:
+    count = 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        for _ in range(100):
+            fn()
+        count += 100
+    rate = count / seconds
+    print(f"{label:<40} {rate:>12,.0f} ops/s")
+    return rate
+
+
+# Micro-benchmark against web3's generic path:
+# python -m app.web3_interactions.abi_codec
+if __name__ == "__main__":
+    from web3._utils.events import get_event_data
+    from web3._utils.method_formatters import log_entry_formatter
+
+    from .contract_interactions import contract_registry, w3
+
+    token = contract_registry.contract(w3, 'token')
+    compiled = compile_abi(contract_registry.abis['token'])
+    recipient = "0x" + "ab" * 20
+    checksummed = w3.to_checksum_address(recipient)
+    assert compiled.encode("transfer", recipient, 10 ** 18) == \
+        token.functions.transfer(checksummed, 10 ** 18)._encode_transaction_data()
+
+    transfer_abi = next(item for item in contract_registry.abis['token']
+                        if item.get("type") == "event" and item["name"] == "Transfer")
+    topic0 = "0x" + event_abi_to_log_topic(transfer_abi).hex()
+    raw_log = {
+        "address": token.address,
+        "topics": [topic0, "0x" + "11".rjust(64, "0"), "0x" + recipient[2:].rjust(64, "0")],
+        "data": "0x" + format(10 ** 18, "064x"),
+        "blockNumber": "0x1",
+        "blockHash": "0x" + "00" * 32,
+        "transactionHash": "0x" + "00" * 32,
+        "transactionIndex": "0x0",
+        "logIndex": "0x0",
+        "removed": False,
+    }
+
+    print("Encode transfer(address,uint256)")
+    generic = _bench("  web3 contract function",
+                     lambda: token.functions.transfer(checksummed, 10 ** 18)._encode_transaction_data())
+    fast = _bench("  compiled encoder", lambda: compiled.encode("transfer", recipient, 10 ** 18))
+    print(f"  speedup: {fast / generic:.1f}x")
+
+    print("Decode Transfer log")
+    generic = _bench("  web3 get_event_data",
+                     lambda: get_event_data(w3.codec, transfer_abi, log_entry_formatter(raw_log)))
+    fast = _bench("  compiled decoder", lambda: compiled.decode_log(raw_log))
+    print(f"  speedup: {fast / generic:.1f}x")
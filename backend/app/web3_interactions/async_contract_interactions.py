@@ -0,0 +1,226 @@
+import asyncio
+import os
+from typing import Any, Mapping, Optional
+
+from aiohttp import ClientSession, ClientTimeout, TCPConnector
+from web3 import AsyncWeb3
+
+from .contract_interactions import (
+    CONTRACT_ADDRESS,
+    contract_registry,
+    fee_oracle,
+    nonce_manager,
+    provider_pool,
+    receipt_watcher,
+)
+from .nonce_manager import is_nonce_error
+from .provider_pool import AsyncPooledHTTPProvider
+from .rpc import RPC_TIMEOUT
+
+# Connection pool shared by every async interactor in the process
+RPC_POOL_LIMIT = int(os.getenv("RPC_POOL_LIMIT", "200"))
+RPC_POOL_LIMIT_PER_HOST = int(os.getenv("RPC_POOL_LIMIT_PER_HOST", "100"))
+RPC_KEEPALIVE_TIMEOUT = float(os.getenv("RPC_KEEPALIVE_TIMEOUT", "30"))
+RPC_CONNECT_TIMEOUT = float(os.getenv("RPC_CONNECT_TIMEOUT", "10"))
+
+_session: Optional[ClientSession] = None
+_async_w3: Optional[AsyncWeb3] = None
+_init_lock = asyncio.Lock()
+
+
+async def get_async_web3() -> AsyncWeb3:
+    """Process-wide AsyncWeb3 over the provider pool, on one keep-alive aiohttp session"""
+    global _session, _async_w3
+    if _async_w3 is not None:
+        return _async_w3
+    async with _init_lock:
+        if _async_w3 is None:
+            timeout = ClientTimeout(total=RPC_TIMEOUT, connect=RPC_CONNECT_TIMEOUT)
+            _session = ClientSession(
+                connector=TCPConnector(
+                    limit=RPC_POOL_LIMIT,
+                    limit_per_host=RPC_POOL_LIMIT_PER_HOST,
+                    keepalive_timeout=RPC_KEEPALIVE_TIMEOUT,
+                ),
+                timeout=timeout,
+            )
+            for endpoint in provider_pool.endpoints:
+                await endpoint.async_provider.cache_async_session(_session)
+            _async_w3 = AsyncWeb3(AsyncPooledHTTPProvider(provider_pool))
+    return _async_w3
+
+
+async def close_async_web3():
+    global _session, _async_w3
+    if _session is not None:
+        await _session.close()
+    _session = None
+    _async_w3 = None
+
+
+class AsyncSmartContractInteractor:
+    """
+    Async counterpart of SmartContractInteractor.
+
+    Shares the ABI registry, nonce manager and fee oracle with the sync
+    interactor, so both can send from the same account.
+    Create instances with AsyncSmartContractInteractor.create().
+    """
+
+    def __init__(self, w3: AsyncWeb3, private_key: str = None, max_retries: int = 3,
+                 fee_policy: Optional[str] = None):
+        self.w3 = w3
+        self.private_key = private_key
+        self.max_retries = max_retries
+        self.fee_policy = fee_policy
+        self.contract_address = CONTRACT_ADDRESS
+        self.abis: Mapping[str, Any] = contract_registry.abis
+        self.contract = self._initialize_contract()
+
+    @classmethod
+    async def create(cls, private_key: str = None, max_retries: int = 3,
+                     fee_policy: Optional[str] = None) -> "AsyncSmartContractInteractor":
+        return cls(await get_async_web3(), private_key, max_retries, fee_policy)
+
+    def _initialize_contract(self, contract_name: str = 'token', address: Optional[str] = None):
+        """Get the cached contract object for a contract name"""
+        return contract_registry.contract(self.w3, contract_name, address)
+
+    async def _get_transaction_params(self, from_address: str, value: int = 0):
+        """Get basic transaction parameters; the provider pool fails over between endpoints"""
+        try:
+            return {
+                'from': from_address,
+                'value': value,
+                'chainId': await fee_oracle.async_chain_id(self.w3),
+                **await fee_oracle.async_fees(self.w3, self.fee_policy),
+            }
+        except Exception as e:
+            raise Exception(f"Failed to get transaction params: {str(e)}")
+
+    async def _build_transaction(self, fn, from_address: str, value: int = 0):
+        """Build a transaction for a contract call; gas is filled in when it is sent"""
+        tx = await self._get_transaction_params(from_address, value)
+        tx['to'] = fn.address
+        tx['data'] = fn._encode_transaction_data()
+        return tx
+
+    # Token Functions
+    async def transfer_tokens(self, to_address: str, amount: int, from_address: str, wait: bool = True):
+        """Transfer tokens to another address"""
+        tx = await self._build_transaction(self.contract.functions.transfer(to_address, amount), from_address)
+        return await self._send_transaction(tx, wait=wait)
+
+    # NFT Functions
+    async def mint_nft(self, from_address: str, wait: bool = True):
+        """Mint a new NFT"""
+        contract = self._initialize_contract('basicNFT')
+        tx = await self._build_transaction(contract.functions.mint(), from_address)
+        return await self._send_transaction(tx, wait=wait)
+
+    # Crowdfunding Functions
+    async def contribute_to_campaign(self, amount: int, from_address: str, wait: bool = True):
+        """Contribute to crowdfunding campaign"""
+        contract = self._initialize_contract('crowdFunding')
+        tx = await self._build_transaction(contract.functions.contribute(), from_address, amount)
+        return await self._send_transaction(tx, wait=wait)
+
+    # Staking Functions
+    async def stake_tokens(self, amount: int, from_address: str, wait: bool = True):
+        """Stake tokens"""
+        contract = self._initialize_contract('staking')
+        tx = await self._build_transaction(contract.functions.stake(), from_address, amount)
+        return await self._send_transaction(tx, wait=wait)
+
+    async def withdraw_stake(self, from_address: str, wait: bool = True):
+        """Withdraw staked tokens"""
+        contract = self._initialize_contract('staking')
+        tx = await self._build_transaction(contract.functions.withdraw(), from_address)
+        return await self._send_transaction(tx, wait=wait)
+
+    # Voting Functions
+    async def cast_vote(self, proposal_id: int, from_address: str, wait: bool = True):
+        """Cast a vote for a proposal"""
+        contract = self._initialize_contract('voting')
+        tx = await self._build_transaction(contract.functions.vote(proposal_id), from_address)
+        return await self._send_transaction(tx, wait=wait)
+
+    # TimeLock Functions
+    async def deposit_timelock(self, amount: int, from_address: str, wait: bool = True):
+        """Deposit to timelock contract"""
+        contract = self._initialize_contract('timeLock')
+        tx = await self._build_transaction(contract.functions.deposit(), from_address, amount)
+        return await self._send_transaction(tx, wait=wait)
+
+    async def withdraw_timelock(self, from_address: str, wait: bool = True):
+        """Withdraw from timelock contract"""
+        contract = self._initialize_contract('timeLock')
+        tx = await self._build_transaction(contract.functions.withdraw(), from_address)
+        return await self._send_transaction(tx, wait=wait)
+
+    # DEX Functions
+    async def deposit_to_dex(self, token_address: str, amount: int, from_address: str, wait: bool = True):
+        """Deposit tokens to DEX"""
+        contract = self._initialize_contract('simpleDEX')
+        tx = await self._build_transaction(contract.functions.deposit(token_address, amount), from_address)
+        return await self._send_transaction(tx, wait=wait)
+
+    async def withdraw_from_dex(self, token_address: str, amount: int, from_address: str, wait: bool = True):
+        """Withdraw tokens from DEX"""
+        contract = self._initialize_contract('simpleDEX')
+        tx = await self._build_transaction(contract.functions.withdraw(token_address, amount), from_address)
+        return await self._send_transaction(tx, wait=wait)
+
+    # Subscription Functions
+    async def subscribe(self, from_address: str, amount: int, wait: bool = True):
+        """Subscribe to a service"""
+        contract = self._initialize_contract('subscription')
+        tx = await self._build_transaction(contract.functions.subscribe(), from_address, amount)
+        return await self._send_transaction(tx, wait=wait)
+
+    async def _send_transaction(self, transaction, wait: bool = True):
+        """Sign and send a transaction; returns the receipt, or the hash when wait is False"""
+        if not self.private_key:
+            raise ValueError("Private key not set")
+
+        # A live estimate also catches calls that would revert before they are sent
+        if 'gas' not in transaction:
+            transaction['gas'] = await self.w3.eth.estimate_gas(transaction)
+
+        tx_hash = await self._submit(transaction)
+        if not wait:
+            return tx_hash
+        return await self.wait_for_receipt(tx_hash)
+
+    async def _chain_nonce(self, address: str) -> int:
+        return await self.w3.eth.get_transaction_count(address, 'pending')
+
+    async def _submit(self, transaction):
+        """Sign with a locally reserved nonce and broadcast, resyncing on nonce errors"""
+        sender = transaction['from']
+        transaction.pop('nonce', None)
+        if not nonce_manager.is_tracked(sender):
+            nonce_manager.seed(sender, await self._chain_nonce(sender))
+        for _ in range(self.max_retries):
+            nonce = nonce_manager.reserve(sender)
+            signed_tx = self.w3.eth.account.sign_transaction({**transaction, 'nonce': nonce}, self.private_key)
+            try:
+                tx_hash = await self.w3.eth.send_raw_transaction(signed_tx.raw_transaction)
+            except Exception as e:
+                message = str(e).lower()
+                if 'already known' in message or 'known transaction' in message:
+                    nonce_manager.confirm(sender, nonce)
+                    return signed_tx.hash
+                nonce_manager.release(sender, nonce)
+                if not is_nonce_error(e):
+                    raise
+                print(f"Nonce {nonce} rejected for {sender} ({str(e)}), resyncing")
+                nonce_manager.resync(sender, await self._chain_nonce(sender))
+                continue
+            nonce_manager.confirm(sender, nonce)
+            return tx_hash
+        raise Exception(f"Failed to send transaction: nonce conflicts for {sender}")
+
+    async def wait_for_receipt(self, tx_hash, timeout: float = 120):
+        """Wait for a transaction sent with wait=False to be mined"""
+        return await asyncio.wrap_future(receipt_watcher.watch(tx_hash, timeout=timeout))
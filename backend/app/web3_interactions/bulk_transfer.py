@@ -0,0 +1,373 @@
+import csv
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from eth_account import Account
+from web3 import Web3
+from web3.exceptions import TimeExhausted
+
+from .abi_codec import compile_abi
+from .contract_interactions import (
+    SmartContractInteractor,
+    contract_registry,
+    fee_oracle,
+    nonce_manager,
+    provider_pool,
+    receipt_watcher,
+)
+from .receipt_watcher import TransactionDroppedError
+from .rpc import MAX_BATCH_SIZE, JsonRpcError
+
+# Progress log states
+SIGNED = "signed"
+SENT = "sent"
+MINED = "mined"
+REVERTED = "reverted"
+# Not seen by the watcher's node; the same raw transaction is rebroadcast on resume
+DROPPED = "dropped"
+# Never accepted by a node, so signed again with a new nonce on resume
+FAILED = "failed"
+# Dropped, and its nonce was then used by another transaction (e.g. a gap
+# fill), so the original can never be mined and it is signed again
+REPLACED = "replaced"
+RETRY_STATES = (FAILED, REPLACED)
+
+
+def read_transfers_csv(path: str) -> Iterator[Tuple[str, int]]:
+    """
+    Stream (recipient, amount in base units) rows.
+
+    Only the first row may be a header; any other row without a valid
+    address and a whole-number amount raises ValueError with its line
+    number, so no payout is dropped silently. Blank and # lines are skipped.
+    """
+    with open(path, newline="") as f:
+        reader = csv.reader(f)
+        for row in reader:
+            if not any(cell.strip() for cell in row) or row[0].startswith("#"):
+                continue
+            recipient = row[0].strip()
+            amount = row[1].strip() if len(row) > 1 else ""
+            if reader.line_num == 1 and not amount.isdigit():
+                continue
+            if not amount.isdigit():
+                raise ValueError(f"{path}:{reader.line_num}: amount {amount!r} is not a whole number of base units")
+            if not Web3.is_address(recipient):
+                raise ValueError(f"{path}:{reader.line_num}: invalid recipient {recipient!r}")
+            yield recipient, int(amount)
+
+
+def _calldata_gas(data: str) -> int:
+    """Intrinsic gas of calldata: 16 per non-zero byte, 4 per zero byte"""
+    payload = bytes.fromhex(data[2:])
+    zeros = payload.count(0)
+    return 16 * (len(payload) - zeros) + 4 * zeros
+
+
+def _already_known(error: JsonRpcError) -> bool:
+    message = str(error).lower()
+    return "already known" in message or "known transaction" in message
+
+
+class ProgressLog:
+    """
+    Append-only JSONL log of each transfer's signed transaction and state.
+
+    Raw transactions are written (and fsynced) before they are broadcast, so
+    after a crash the exact same transactions are re-sent instead of signing
+    new ones, which makes a resumed airdrop unable to pay anyone twice.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._file = None
+
+    def load(self) -> Dict[int, Dict[str, Any]]:
+        """Latest record per transfer index, with fields merged across records"""
+        records: Dict[int, Dict[str, Any]] = {}
+        if not os.path.exists(self.path):
+            return records
+        with open(self.path) as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # Torn last line from a crash
+                    continue
+                records.setdefault(record["index"], {}).update(record)
+        return records
+
+    def append(self, records: List[Dict[str, Any]], sync: bool = False):
+        if not records:
+            return
+        with self._lock:
+            if self._file is None:
+                self._file = open(self.path, "a")
+            self._file.write("".join(json.dumps(record) + "\n" for record in records))
+            self._file.flush()
+            if sync:
+                os.fsync(self._file.fileno())
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+class BulkTransfer:
+    """
+    Sends many token transfers from one key.
+
+    Transfers are signed locally with consecutive nonces and broadcast as
+    JSON-RPC batches of eth_sendRawTransaction. At most `window` transfers
+    are unconfirmed at a time, and confirmations are tracked collectively
+    by the receipt watcher. Progress goes to a ProgressLog keyed by the
+    transfer's position in the input, so resume with the same input.
+    """
+
+    def __init__(self, interactor: SmartContractInteractor, from_address: str, log_path: str,
+                 window: int = 1000, batch_size: int = MAX_BATCH_SIZE, confirm_timeout: float = 600,
+                 contract_name: str = 'token', gas_margin: float = 1.2):
+        if not interactor.private_key:
+            raise ValueError("Private key not set")
+        self.interactor = interactor
+        self.from_address = Web3.to_checksum_address(from_address)
+        self.log = ProgressLog(log_path)
+        self.window = window
+        # A batch holds its window slots until it is broadcast
+        self.batch_size = min(batch_size, window)
+        self.confirm_timeout = confirm_timeout
+        self.token_address = contract_registry.address(contract_name)
+        self._encode_transfer = compile_abi(contract_registry.abis[contract_name]).functions['transfer'].encode
+        self._slots = threading.Semaphore(window)
+        self._in_flight = 0
+        self._idle = threading.Condition()
+        self.gas_margin = gas_margin
+        # (estimate for a transfer to a fresh address, calldata gas of that sample)
+        self._gas_sample: Optional[Tuple[int, int]] = None
+        self._counts = {MINED: 0, REVERTED: 0, DROPPED: 0, FAILED: 0, "timeout": 0}
+        self._counts_lock = threading.Lock()
+
+    def _count(self, state: str):
+        with self._counts_lock:
+            self._counts[state] += 1
+
+    def _gas_limit(self, amount: int, data: str) -> int:
+        """
+        Gas limit for one transfer.
+
+        Transfers differ mainly by whether the recipient's balance slot is
+        new, which costs about 17k gas more. One estimate against a freshly
+        generated address covers that worst case, and the calldata gas of
+        each transfer is added on top, since recipients and amounts have
+        different numbers of zero bytes.
+        """
+        if self._gas_sample is None:
+            fresh = Account.create().address
+            sample = {
+                'from': self.from_address,
+                'to': self.token_address,
+                'value': 0,
+                'data': self._encode_transfer(fresh, amount),
+            }
+            estimate = self.interactor.w3.eth.estimate_gas(sample)
+            self._gas_sample = (estimate, _calldata_gas(sample['data']))
+        estimate, sample_calldata = self._gas_sample
+        return int(estimate * self.gas_margin) + max(0, _calldata_gas(data) - sample_calldata)
+
+    def _base_transaction(self) -> Dict[str, Any]:
+        return {
+            'value': 0,
+            'chainId': fee_oracle.chain_id,
+            **fee_oracle.fees(self.interactor.fee_policy),
+        }
+
+    def _track(self, record: Dict[str, Any]):
+        """Hold a window slot until the receipt watcher settles the transfer"""
+        with self._idle:
+            self._in_flight += 1
+        future = receipt_watcher.watch(record["hash"], timeout=self.confirm_timeout)
+        future.add_done_callback(lambda f: self._settled(record["index"], f))
+
+    def _settled(self, index: int, future: Future):
+        try:
+            receipt = future.result()
+            state = MINED if receipt['status'] == 1 else REVERTED
+            self.log.append([{"index": index, "state": state, "block": receipt['blockNumber']}])
+            self._count(state)
+        except TransactionDroppedError as e:
+            self.log.append([{"index": index, "state": DROPPED, "error": str(e)}])
+            self._count(DROPPED)
+        except TimeExhausted:
+            # Left as sent; a resumed run rebroadcasts it
+            self._count("timeout")
+        except Exception as e:
+            print(f"Error tracking transfer {index}: {str(e)}")
+        self._slots.release()
+        with self._idle:
+            self._in_flight -= 1
+            self._idle.notify_all()
+
+    def _broadcast(self, records: List[Dict[str, Any]], fresh: bool):
+        """Send signed transactions in one batch; fresh ones hold reserved nonces"""
+        results = provider_pool.batch_call_sync(
+            [("eth_sendRawTransaction", [r["raw"]]) for r in records], sender=self.from_address
+        )
+        sent = []
+        for record, result in zip(records, results):
+            accepted = not isinstance(result, JsonRpcError) or _already_known(result)
+            if not accepted and fresh:
+                nonce_manager.release(self.from_address, record["nonce"])
+                self.log.append([{"index": record["index"], "state": FAILED, "error": str(result)}])
+                self._count(FAILED)
+                self._slots.release()
+                continue
+            # A resent transaction rejected for its nonce may already be mined;
+            # the watcher tells, and fails it as dropped otherwise
+            if fresh:
+                nonce_manager.confirm(self.from_address, record["nonce"])
+            sent.append(record)
+        self.log.append([{"index": record["index"], "state": SENT} for record in sent])
+        for record in sent:
+            self._track(record)
+
+    def _send_batch(self, batch: List[Tuple[int, str, int]]):
+        key = self.interactor.private_key
+        records = []
+        for index, recipient, amount in batch:
+            self._slots.acquire()
+            tx = self._base_transaction()
+            tx['to'] = self.token_address
+            tx['data'] = self._encode_transfer(recipient, amount)
+            tx['gas'] = self._gas_limit(amount, tx['data'])
+            tx['nonce'] = nonce_manager.reserve(self.from_address)
+            signed = Account.sign_transaction(tx, key)
+            records.append({
+                "index": index,
+                "recipient": recipient,
+                "amount": str(amount),
+                "nonce": tx['nonce'],
+                "hash": signed.hash.to_0x_hex(),
+                "raw": signed.raw_transaction.to_0x_hex(),
+                "state": SIGNED,
+            })
+        self.log.append(records, sync=True)
+        self._broadcast(records, fresh=True)
+
+    def _replaced(self, dropped: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Dropped records whose nonce the chain has used for another transaction.
+
+        Only those are safe to sign again; any other dropped transaction may
+        still be mined from some node's mempool, so it keeps its nonce.
+        """
+        if not dropped:
+            return []
+        results = provider_pool.batch_call_sync(
+            [("eth_getTransactionCount", [self.from_address, "latest"])]
+            + [("eth_getTransactionReceipt", [record["hash"]]) for record in dropped],
+            sender=self.from_address,
+        )
+        for result in results:
+            if isinstance(result, JsonRpcError):
+                raise result
+        chain_nonce = int(results[0], 16)
+        return [
+            record for record, receipt in zip(dropped, results[1:])
+            if record["nonce"] < chain_nonce and receipt is None
+        ]
+
+    def _resume(self, done: Dict[int, Dict[str, Any]]) -> int:
+        """Rebroadcast transactions signed by a previous run that never settled"""
+        dropped = [record for record in done.values() if record["state"] == DROPPED and record.get("raw")]
+        replaced = self._replaced(dropped)
+        self.log.append([
+            {"index": record["index"], "state": REPLACED, "error": f"nonce {record['nonce']} used by another transaction"}
+            for record in replaced
+        ], sync=True)
+        for record in replaced:
+            record["state"] = REPLACED
+        # Rebroadcasting the same raw transaction is idempotent: it can only
+        # ever be mined once, at its original nonce
+        unsettled = [
+            record for record in done.values()
+            if record["state"] in (SIGNED, SENT, DROPPED) and record.get("raw")
+        ]
+        for start in range(0, len(unsettled), self.batch_size):
+            chunk = unsettled[start:start + self.batch_size]
+            for _ in chunk:
+                self._slots.acquire()
+            self._broadcast(chunk, fresh=False)
+        if unsettled:
+            # Count the rebroadcast nonces before handing out new ones
+            nonce_manager.resync(self.from_address)
+        return len(unsettled)
+
+    def run(self, transfers: Iterable[Tuple[str, int]]) -> Dict[str, Any]:
+        """Send every (recipient, amount) not already settled in the progress log"""
+        started = time.monotonic()
+        done = self.log.load()
+        resumed = self._resume(done)
+        skipped = 0
+        submitted = 0
+        batch: List[Tuple[int, str, int]] = []
+        try:
+            for index, (recipient, amount) in enumerate(transfers):
+                previous = done.get(index)
+                if previous is not None and previous["state"] not in RETRY_STATES:
+                    skipped += 1
+                    continue
+                batch.append((index, Web3.to_checksum_address(recipient), int(amount)))
+                if len(batch) >= self.batch_size:
+                    self._send_batch(batch)
+                    submitted += len(batch)
+                    batch = []
+            if batch:
+                self._send_batch(batch)
+                submitted += len(batch)
+
+            with self._idle:
+                while self._in_flight:
+                    self._idle.wait()
+        finally:
+            self.log.close()
+
+        if self._counts[FAILED] or self._counts[DROPPED]:
+            # Failed and dropped sends leave holes that block the transfers after them
+            self.interactor.fill_nonce_gaps(self.from_address)
+
+        elapsed = time.monotonic() - started
+        return {
+            "submitted": submitted,
+            "resumed": resumed,
+            "skipped": skipped,
+            **self._counts,
+            "elapsed_seconds": round(elapsed, 2),
+            "transfers_per_second": round(submitted / elapsed, 2) if elapsed else 0.0,
+        }
+
+
+# Example usage: python -m app.web3_interactions.bulk_transfer transfers.csv progress.jsonl
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print("Usage: python -m app.web3_interactions.bulk_transfer <transfers.csv> <progress.jsonl>")
+        sys.exit(1)
+    interactor = SmartContractInteractor(os.getenv("WALLET_PRIVATE_KEY"))
+    bulk = BulkTransfer(
+        interactor,
+        os.getenv("WALLET_ADDRESS"),
+        sys.argv[2],
+        window=int(os.getenv("BULK_TRANSFER_WINDOW", "1000")),
+    )
+    # Reject a bad row before anything is sent rather than part-way through
+    for _ in read_transfers_csv(sys.argv[1]):
+        pass
+    print(bulk.run(read_transfers_csv(sys.argv[1])))
@@ -1,17 +1,27 @@
 from web3 import Web3
+import copy
 import json
 import os
+import threading
+import weakref
 from pathlib import Path
-from typing import Dict, Any
+from types import MappingProxyType
+from typing import Dict, Any, Mapping, Optional, Tuple
 from dotenv import load_dotenv
-import time
 from requests.exceptions import RequestException
+from .nonce_manager import NonceManager, is_nonce_error
+from .fee_oracle import FeeOracle
+from .receipt_watcher import ReceiptWatcher
+from .provider_pool import ProviderPool, PooledHTTPProvider
 
 load_dotenv()
 
 # Base Testnet RPC URL
 BASE_TESTNET_RPC = os.getenv("ALCHEMY_URL")
 
+# Every endpoint to spread traffic over, comma separated; defaults to ALCHEMY_URL
+RPC_URLS = [url.strip() for url in os.getenv("RPC_URLS", "").split(",") if url.strip()] or [BASE_TESTNET_RPC]
+
 # Contract address
 CONTRACT_ADDRESS = "0xB9827072944AcE98726A8DdCfD5f52A1ab9D4de5"
 
@@ -30,197 +40,342 @@ CONTRACT_ADDRESSES = {
     'subscription': '0x0000000000000000000000000000000000000007'
 }
 
+# Web3Bridge (super_agent.sol) has no fixed deployment yet
+if os.getenv("WEB3_BRIDGE_ADDRESS"):
+    CONTRACT_ADDRESSES['web3Bridge'] = os.getenv("WEB3_BRIDGE_ADDRESS")
+
+# Contracts directory (going up two levels from this file)
+ABI_DIR = Path(__file__).resolve().parent.parent.parent / 'contracts' / 'abis'
+
+# Map contract names to their JSON files
+ABI_FILES = {
+    'token': 'token.json',
+    'basicNFT': 'nft.json',
+    'crowdFunding': 'crowdFunding.json',
+    'staking': 'staking.json',
+    'voting': 'voting.json',
+    'multiSigWallet': 'MultiSigWalet.json',
+    'timeLock': 'timeLock.json',
+    'simpleDEX': 'simpleDEX.json',
+    'escrow': 'escrow.json',
+    'subscription': 'subscription.json',
+    'web3Bridge': 'web3Bridge.json'
+}
+
+provider_pool = ProviderPool(
+    RPC_URLS,
+    timeout=float(os.getenv("RPC_TIMEOUT", "10")),
+    failure_threshold=int(os.getenv("RPC_FAILURE_THRESHOLD", "3")),
+    max_backoff=float(os.getenv("RPC_MAX_BACKOFF", "60")),
+    max_lag=int(os.getenv("RPC_MAX_LAG_BLOCKS", "5")),
+    health_interval=float(os.getenv("RPC_HEALTH_INTERVAL", "5")),
+)
+
 # Initialize Web3
-w3 = Web3(Web3.HTTPProvider(BASE_TESTNET_RPC))
+w3 = Web3(PooledHTTPProvider(provider_pool))
 
 
-class SmartContractInteractor:
-    def __init__(self, private_key: str = None, max_retries: int = 3):
-        self.max_retries = max_retries
-        self._initialize_web3()
-        self.contract_address = CONTRACT_ADDRESS
-        self.private_key = private_key
-        self.abis = self._load_abis()
-        self.contract = self._initialize_contract()
+class ContractRegistry:
+    """
+    Process-wide ABIs and contract objects.
 
-    def _initialize_web3(self):
-        """Try multiple RPC endpoints"""
-        try:
-            self.w3 = Web3(Web3.HTTPProvider(BASE_TESTNET_RPC))
-            # Test connection
-            self.w3.eth.block_number
-            print(f"Successfully connected to {BASE_TESTNET_RPC}")
-            return
-        except Exception as e:
-            print(f"Failed to connect to {BASE_TESTNET_RPC}: {str(e)}")
-            raise Exception("Failed to connect to any RPC endpoint")
+    ABI files are parsed once on first use and shared by every interactor;
+    callers get a read-only mapping and must treat the ABIs as immutable.
+    Contract objects are built lazily once per (web3 instance, name, address).
+    """
 
-    def _load_abis(self) -> Dict[str, Any]:
+    def __init__(self, abi_dir: Path, abi_files: Dict[str, str], addresses: Dict[str, str]):
+        self.abi_dir = abi_dir
+        self.abi_files = abi_files
+        self._addresses = dict(addresses)
+        self._abis: Optional[Dict[str, Any]] = None
+        self._contracts: "weakref.WeakKeyDictionary[Web3, Dict[Tuple[str, str], Any]]" = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    def _load(self) -> Dict[str, Any]:
         """Load all ABI files from the contracts directory"""
-        # Get the current file's directory
-        current_dir = Path(__file__).resolve().parent
-        
-        # Navigate to the contracts directory (going up two levels)
-        abi_dir = current_dir.parent.parent / 'contracts' / 'abis'
-        
-        if not abi_dir.exists():
-            raise FileNotFoundError(f"Contracts directory not found at {abi_dir}")
-            
+        if not self.abi_dir.exists():
+            raise FileNotFoundError(f"Contracts directory not found at {self.abi_dir}")
+
         abis = {}
-        
-        # Map contract names to their JSON files
-        abi_files = {
-            'token': 'token.json',
-            'basicNFT': 'nft.json',
-            'crowdFunding': 'crowdFunding.json',
-            'staking': 'staking.json',
-            'voting': 'voting.json',
-            'multiSigWallet': 'MultiSigWalet.json',
-            'timeLock': 'timeLock.json',
-            'simpleDEX': 'simpleDEX.json',
-            'escrow': 'escrow.json',
-            'subscription': 'subscription.json'
-        }
-        
-        for contract_name, json_file in abi_files.items():
-            abi_path = abi_dir / json_file
+        for contract_name, json_file in self.abi_files.items():
+            abi_path = self.abi_dir / json_file
             try:
                 with open(abi_path, 'r') as f:
                     abis[contract_name] = json.load(f)
             except FileNotFoundError:
                 print(f"Warning: ABI file {json_file} not found at {abi_path}")
                 continue
-                
+
         if not abis:
             raise FileNotFoundError("No ABI files could be loaded")
-            
         return abis
 
-    def _initialize_contract(self, contract_name: str = 'token'):
-        """Initialize the main contract"""
-        return self.w3.eth.contract(address=CONTRACT_ADDRESSES[contract_name], abi=self.abis[contract_name])
+    @property
+    def abis(self) -> Mapping[str, Any]:
+        if self._abis is None:
+            with self._lock:
+                if self._abis is None:
+                    self._abis = self._load()
+        return MappingProxyType(self._abis)
+
+    def address(self, contract_name: str) -> str:
+        return self._addresses[contract_name]
+
+    def register(self, contract_name: str, abi: Any, address: Optional[str] = None):
+        """Add or replace a contract ABI (and optionally its address) at runtime"""
+        abi = copy.deepcopy(abi)
+        abis = self.abis  # make sure the files are loaded first
+        with self._lock:
+            updated = dict(abis)
+            updated[contract_name] = abi
+            self._abis = updated
+            if address is not None:
+                self._addresses[contract_name] = address
+            # Drop contract objects built from the previous ABI
+            for contracts in self._contracts.values():
+                for key in [key for key in contracts if key[0] == contract_name]:
+                    del contracts[key]
+
+    def contract(self, web3: Web3, contract_name: str, address: Optional[str] = None):
+        """Contract object for (name, address), built on first use"""
+        address = address or self._addresses[contract_name]
+        key = (contract_name, address)
+        contracts = self._contracts.get(web3)
+        if contracts is not None and key in contracts:
+            return contracts[key]
+        abi = self.abis[contract_name]
+        with self._lock:
+            contracts = self._contracts.setdefault(web3, {})
+            if key not in contracts:
+                contracts[key] = web3.eth.contract(address=address, abi=abi)
+            return contracts[key]
+
+
+contract_registry = ContractRegistry(ABI_DIR, ABI_FILES, CONTRACT_ADDRESSES)
+
+# Shared by every interactor so concurrent senders never reuse a nonce
+nonce_manager = NonceManager(w3, stuck_after=float(os.getenv("NONCE_STUCK_AFTER", "120")))
+
+fee_oracle = FeeOracle(
+    w3,
+    default_policy=os.getenv("FEE_POLICY", "standard"),
+    history_blocks=int(os.getenv("FEE_HISTORY_BLOCKS", "10")),
+    block_time=float(os.getenv("FEE_BLOCK_TIME", "2")),
+)
+
+# One polling loop for the receipts of every transaction sent by this process
+receipt_watcher = ReceiptWatcher(
+    provider_pool.batch_call_sync,
+    poll_interval=float(os.getenv("RECEIPT_POLL_INTERVAL", "2")),
+    reorg_depth=int(os.getenv("RECEIPT_REORG_DEPTH", "3")),
+    drop_after=float(os.getenv("RECEIPT_DROP_AFTER", "300")),
+)
+
+
+class SmartContractInteractor:
+    def __init__(self, private_key: str = None, max_retries: int = 3, fee_policy: Optional[str] = None):
+        self.max_retries = max_retries
+        self.fee_policy = fee_policy
+        self._initialize_web3()
+        self.contract_address = CONTRACT_ADDRESS
+        self.private_key = private_key
+        self.abis = self._load_abis()
+        self.contract = self._initialize_contract()
+
+    def _initialize_web3(self):
+        """Share the process-wide Web3 instance so contract objects are reused"""
+        self.w3 = w3
+
+    def _load_abis(self) -> Mapping[str, Any]:
+        """Read-only view of the process-wide ABIs"""
+        return contract_registry.abis
+
+    def register_contract(self, contract_name: str, abi: Any, address: Optional[str] = None):
+        """Make an extra contract available to every interactor without a restart"""
+        contract_registry.register(contract_name, abi, address)
+        self.abis = contract_registry.abis
+
+    def _initialize_contract(self, contract_name: str = 'token', address: Optional[str] = None):
+        """Get the cached contract object for a contract name"""
+        return contract_registry.contract(self.w3, contract_name, address)
 
     def _get_transaction_params(self, from_address: str, value: int = 0):
-        """Get basic transaction parameters with retry logic"""
-        retry_count = 0
-        while retry_count < self.max_retries:
-            try:
-                return {
-                    'from': from_address,
-                    'value': value,
-                    'gasPrice': self.w3.eth.gas_price,
-                    'nonce': self.w3.eth.get_transaction_count(from_address),
-                }
-            except Exception as e:
-                retry_count += 1
-                if retry_count == self.max_retries:
-                    raise Exception(f"Failed to get transaction params: {str(e)}")
-                print(f"Failed to get transaction params, retrying... (attempt {retry_count}/{self.max_retries})")
-                time.sleep(1)
+        """
+        Get basic transaction parameters.
+
+        The nonce is assigned by the nonce manager when the transaction is sent.
+        Fees and the chain id come from memory except once per block, and
+        failing endpoints are retried on the others by the provider pool.
+        """
+        try:
+            return {
+                'from': from_address,
+                'value': value,
+                'chainId': fee_oracle.chain_id,
+                **fee_oracle.fees(self.fee_policy),
+            }
+        except Exception as e:
+            raise Exception(f"Failed to get transaction params: {str(e)}")
+
+    def _build_transaction(self, fn, from_address: str, value: int = 0):
+        """
+        Build a transaction for a contract call without the RPC calls that
+        build_transaction makes; gas is filled in when it is sent.
+        """
+        tx = self._get_transaction_params(from_address, value)
+        tx['to'] = fn.address
+        tx['data'] = fn._encode_transaction_data()
+        return tx
 
     # Token Functions
-    def transfer_tokens(self, to_address: str, amount: int, from_address: str):
+    def transfer_tokens(self, to_address: str, amount: int, from_address: str, wait: bool = True):
         """Transfer tokens to another address"""
-        tx_params = self._get_transaction_params(from_address)
-        tx = self.contract.functions.transfer(to_address, amount).build_transaction(tx_params)
-        return self._send_transaction(tx)
+        tx = self._build_transaction(self.contract.functions.transfer(to_address, amount), from_address)
+        return self._send_transaction(tx, wait=wait)
 
     # NFT Functions
-    def mint_nft(self, from_address: str):
+    def mint_nft(self, from_address: str, wait: bool = True):
         """Mint a new NFT"""
         contract = self._initialize_contract('basicNFT')
-        tx_params = self._get_transaction_params(from_address)
-        tx = contract.functions.mint().build_transaction(tx_params)
-        return self._send_transaction(tx)
+        tx = self._build_transaction(contract.functions.mint(), from_address)
+        return self._send_transaction(tx, wait=wait)
 
     # Crowdfunding Functions
-    def contribute_to_campaign(self, amount: int, from_address: str):
+    def contribute_to_campaign(self, amount: int, from_address: str, wait: bool = True):
         """Contribute to crowdfunding campaign"""
         contract = self._initialize_contract('crowdFunding')
-        tx_params = self._get_transaction_params(from_address, amount)
-        tx = contract.functions.contribute().build_transaction(tx_params)
-        return self._send_transaction(tx)
+        tx = self._build_transaction(contract.functions.contribute(), from_address, amount)
+        return self._send_transaction(tx, wait=wait)
 
     # Staking Functions
-    def stake_tokens(self, amount: int, from_address: str):
+    def stake_tokens(self, amount: int, from_address: str, wait: bool = True):
         """Stake tokens"""
         contract = self._initialize_contract('staking')
-        tx_params = self._get_transaction_params(from_address, amount)
-        tx = contract.functions.stake().build_transaction(tx_params)
-        return self._send_transaction(tx)
+        tx = self._build_transaction(contract.functions.stake(), from_address, amount)
+        return self._send_transaction(tx, wait=wait)
 
-    def withdraw_stake(self, from_address: str):
+    def withdraw_stake(self, from_address: str, wait: bool = True):
         """Withdraw staked tokens"""
         contract = self._initialize_contract('staking')
-        tx_params = self._get_transaction_params(from_address)
-        tx = contract.functions.withdraw().build_transaction(tx_params)
-        return self._send_transaction(tx)
+        tx = self._build_transaction(contract.functions.withdraw(), from_address)
+        return self._send_transaction(tx, wait=wait)
 
     # Voting Functions
-    def cast_vote(self, proposal_id: int, from_address: str):
+    def cast_vote(self, proposal_id: int, from_address: str, wait: bool = True):
         """Cast a vote for a proposal"""
         contract = self._initialize_contract('voting')
-        tx_params = self._get_transaction_params(from_address)
-        tx = contract.functions.vote(proposal_id).build_transaction(tx_params)
-        return self._send_transaction(tx)
+        tx = self._build_transaction(contract.functions.vote(proposal_id), from_address)
+        return self._send_transaction(tx, wait=wait)
 
     # TimeLock Functions
-    def deposit_timelock(self, amount: int, from_address: str):
+    def deposit_timelock(self, amount: int, from_address: str, wait: bool = True):
         """Deposit to timelock contract"""
         contract = self._initialize_contract('timeLock')
-        tx_params = self._get_transaction_params(from_address, amount)
-        tx = contract.functions.deposit().build_transaction(tx_params)
-        return self._send_transaction(tx)
+        tx = self._build_transaction(contract.functions.deposit(), from_address, amount)
+        return self._send_transaction(tx, wait=wait)
 
-    def withdraw_timelock(self, from_address: str):
+    def withdraw_timelock(self, from_address: str, wait: bool = True):
         """Withdraw from timelock contract"""
         contract = self._initialize_contract('timeLock')
-        tx_params = self._get_transaction_params(from_address)
-        tx = contract.functions.withdraw().build_transaction(tx_params)
-        return self._send_transaction(tx)
+        tx = self._build_transaction(contract.functions.withdraw(), from_address)
+        return self._send_transaction(tx, wait=wait)
 
     # DEX Functions
-    def deposit_to_dex(self, token_address: str, amount: int, from_address: str):
+    def deposit_to_dex(self, token_address: str, amount: int, from_address: str, wait: bool = True):
         """Deposit tokens to DEX"""
         contract = self._initialize_contract('simpleDEX')
-        tx_params = self._get_transaction_params(from_address)
-        tx = contract.functions.deposit(token_address, amount).build_transaction(tx_params)
-        return self._send_transaction(tx)
+        tx = self._build_transaction(contract.functions.deposit(token_address, amount), from_address)
+        return self._send_transaction(tx, wait=wait)
 
-    def withdraw_from_dex(self, token_address: str, amount: int, from_address: str):
+    def withdraw_from_dex(self, token_address: str, amount: int, from_address: str, wait: bool = True):
         """Withdraw tokens from DEX"""
         contract = self._initialize_contract('simpleDEX')
-        tx_params = self._get_transaction_params(from_address)
-        tx = contract.functions.withdraw(token_address, amount).build_transaction(tx_params)
-        return self._send_transaction(tx)
+        tx = self._build_transaction(contract.functions.withdraw(token_address, amount), from_address)
+        return self._send_transaction(tx, wait=wait)
 
     # Subscription Functions
-    def subscribe(self, from_address: str, amount: int):
+    def subscribe(self, from_address: str, amount: int, wait: bool = True):
         """Subscribe to a service"""
         contract = self._initialize_contract('subscription')
-        tx_params = self._get_transaction_params(from_address, amount)
-        tx = contract.functions.subscribe().build_transaction(tx_params)
-        return self._send_transaction(tx)
+        tx = self._build_transaction(contract.functions.subscribe(), from_address, amount)
+        return self._send_transaction(tx, wait=wait)
 
-    def _send_transaction(self, transaction):
-        """Sign and send a transaction"""
+    def _send_transaction(self, transaction, wait: bool = True):
+        """
+        Sign and send a transaction.
+
+        Returns the receipt, or just the transaction hash when wait is False so
+        callers can keep many transactions from one sender in flight.
+        """
         if not self.private_key:
             raise ValueError("Private key not set")
         
-        # Add gas estimate to transaction
-        transaction['gas'] = self.w3.eth.estimate_gas(transaction)
-        
-        # Sign transaction
-        signed_tx = self.w3.eth.account.sign_transaction(transaction, self.private_key)
+        # A live estimate also catches calls that would revert before they are sent
+        if 'gas' not in transaction:
+            transaction['gas'] = self.w3.eth.estimate_gas(transaction)
         
-        # Use raw_transaction instead of rawTransaction
-        tx_hash = self.w3.eth.send_raw_transaction(signed_tx.raw_transaction)
-        return self.w3.eth.wait_for_transaction_receipt(tx_hash)
+        tx_hash = self._submit(transaction)
+        if not wait:
+            return tx_hash
+        return self.wait_for_receipt(tx_hash)
+
+    def _submit(self, transaction):
+        """Sign with a locally reserved nonce and broadcast, resyncing on nonce errors"""
+        sender = transaction['from']
+        transaction.pop('nonce', None)
+        for _ in range(self.max_retries):
+            nonce = nonce_manager.reserve(sender)
+            signed_tx = self.w3.eth.account.sign_transaction({**transaction, 'nonce': nonce}, self.private_key)
+            try:
+                # Use raw_transaction instead of rawTransaction
+                tx_hash = self.w3.eth.send_raw_transaction(signed_tx.raw_transaction)
+            except Exception as e:
+                message = str(e).lower()
+                if 'already known' in message or 'known transaction' in message:
+                    # The node already has this exact transaction
+                    nonce_manager.confirm(sender, nonce)
+                    return signed_tx.hash
+                nonce_manager.release(sender, nonce)
+                if not is_nonce_error(e):
+                    raise
+                print(f"Nonce {nonce} rejected for {sender} ({str(e)}), resyncing")
+                nonce_manager.resync(sender)
+                continue
+            nonce_manager.confirm(sender, nonce)
+            return tx_hash
+        raise Exception(f"Failed to send transaction: nonce conflicts for {sender}")
+
+    def wait_for_receipt(self, tx_hash, timeout: float = 120):
+        """Wait for a transaction sent with wait=False to be mined"""
+        return receipt_watcher.wait(tx_hash, timeout=timeout)
+
+    def fill_nonce_gaps(self, from_address: str):
+        """Cancel nonces that block later transactions with 0-value self-transfers"""
+        if not self.private_key:
+            raise ValueError("Private key not set")
+        chain_id = fee_oracle.chain_id
+        # Outbid whatever may be stuck at these nonces
+        fees = {field: int(fee * 1.25) for field, fee in fee_oracle.fees('fast').items()}
+
+        def cancel(nonce: int):
+            signed_tx = self.w3.eth.account.sign_transaction({
+                'from': from_address,
+                'to': from_address,
+                'value': 0,
+                'gas': 21000,
+                **fees,
+                'nonce': nonce,
+                'chainId': chain_id,
+            }, self.private_key)
+            return self.w3.eth.send_raw_transaction(signed_tx.raw_transaction)
+
+        return nonce_manager.fill_gaps(from_address, cancel)
 
     def debug_paths(self):
         """Print debug information about paths"""
         current_dir = Path(__file__).resolve().parent
-        abi_dir = current_dir.parent.parent / 'contracts' / 'abis'
+        abi_dir = ABI_DIR
         
         print("Path Debug Information:")
         print(f"Current file location: {current_dir}")
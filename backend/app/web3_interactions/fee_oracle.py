@@ -0,0 +1,149 @@
+import asyncio
+import threading
+import time
+from statistics import median
+from typing import Any, Dict, Optional
+
+# Priority fee percentile of recent blocks used by each policy
+FEE_POLICIES = {
+    "slow": 10,
+    "standard": 50,
+    "fast": 90,
+}
+PERCENTILES = sorted(set(FEE_POLICIES.values()))
+
+
+class FeeOracle:
+    """
+    Transaction fees shared by every transaction builder.
+
+    One eth_feeHistory call per block interval refreshes the fees for all
+    policies at once; concurrent callers are served from memory and only one
+    of them refreshes. Chains without EIP-1559 fall back to eth_gasPrice.
+    """
+
+    def __init__(self, w3, default_policy: str = "standard", history_blocks: int = 10,
+                 block_time: float = 2.0, min_priority_fee: int = 1_000_000):
+        if default_policy not in FEE_POLICIES:
+            raise ValueError(f"Unknown fee policy: {default_policy}")
+        self.w3 = w3
+        self.default_policy = default_policy
+        self.history_blocks = history_blocks
+        self.block_time = block_time
+        self.min_priority_fee = min_priority_fee
+        self._fees: Dict[str, Dict[str, int]] = {}
+        self._block: Optional[int] = None
+        self._fetched_at = 0.0
+        self._chain_id: Optional[int] = None
+        self._lock = threading.Lock()
+        self._async_lock = asyncio.Lock()
+
+        # Metrics
+        self.refreshes = 0
+        self.hits = 0
+        self.legacy = False
+
+    @property
+    def chain_id(self) -> int:
+        if self._chain_id is None:
+            self._chain_id = self.w3.eth.chain_id
+        return self._chain_id
+
+    async def async_chain_id(self, async_w3) -> int:
+        if self._chain_id is None:
+            self._chain_id = await async_w3.eth.chain_id
+        return self._chain_id
+
+    def _stale(self) -> bool:
+        return not self._fees or time.monotonic() - self._fetched_at >= self.block_time
+
+    @staticmethod
+    def _has_base_fee(history) -> bool:
+        return bool(history) and any(history["baseFeePerGas"])
+
+    def _refresh(self):
+        try:
+            history = self.w3.eth.fee_history(self.history_blocks, "latest", PERCENTILES)
+        except Exception as e:
+            print(f"eth_feeHistory unavailable, using legacy gas price: {str(e)}")
+            history = None
+        gas_price = None if self._has_base_fee(history) else self.w3.eth.gas_price
+        self._apply(history, gas_price)
+
+    async def _async_refresh(self, async_w3):
+        try:
+            history = await async_w3.eth.fee_history(self.history_blocks, "latest", PERCENTILES)
+        except Exception as e:
+            print(f"eth_feeHistory unavailable, using legacy gas price: {str(e)}")
+            history = None
+        gas_price = None if self._has_base_fee(history) else await async_w3.eth.gas_price
+        with self._lock:
+            self._apply(history, gas_price)
+            self._fetched_at = time.monotonic()
+            self.refreshes += 1
+
+    def _apply(self, history, gas_price: Optional[int]):
+        if gas_price is not None:
+            self.legacy = True
+            self._fees = {policy: {"gasPrice": gas_price} for policy in FEE_POLICIES}
+            self._block = None
+            return
+
+        self.legacy = False
+        base_fees = history["baseFeePerGas"]
+        # The last base fee is the one for the next block
+        next_base_fee = base_fees[-1]
+        rewards = history.get("reward") or []
+        self._block = history["oldestBlock"] + len(base_fees) - 2
+        fees = {}
+        for policy, percentile in FEE_POLICIES.items():
+            column = PERCENTILES.index(percentile)
+            samples = [block[column] for block in rewards if block]
+            priority = max(int(median(samples)) if samples else 0, self.min_priority_fee)
+            fees[policy] = {
+                "maxPriorityFeePerGas": priority,
+                # Stays valid through several consecutive full blocks
+                "maxFeePerGas": 2 * next_base_fee + priority,
+            }
+        self._fees = fees
+
+    def _policy(self, policy: Optional[str]) -> str:
+        policy = policy or self.default_policy
+        if policy not in FEE_POLICIES:
+            raise ValueError(f"Unknown fee policy: {policy}")
+        return policy
+
+    def fees(self, policy: Optional[str] = None) -> Dict[str, int]:
+        """Fee fields for a transaction: EIP-1559 max fees, or gasPrice on legacy chains"""
+        policy = self._policy(policy)
+        with self._lock:
+            if self._stale():
+                self._refresh()
+                self._fetched_at = time.monotonic()
+                self.refreshes += 1
+            else:
+                self.hits += 1
+            return dict(self._fees[policy])
+
+    async def async_fees(self, async_w3, policy: Optional[str] = None) -> Dict[str, int]:
+        """fees() for event-loop callers; refreshes over the async provider"""
+        policy = self._policy(policy)
+        if self._stale():
+            async with self._async_lock:
+                # Only the first waiter refreshes
+                if self._stale():
+                    await self._async_refresh(async_w3)
+                    return dict(self._fees[policy])
+        with self._lock:
+            self.hits += 1
+            return dict(self._fees[policy])
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "block": self._block,
+                "legacy": self.legacy,
+                "refreshes": self.refreshes,
+                "hits": self.hits,
+                "fees": dict(self._fees),
+            }
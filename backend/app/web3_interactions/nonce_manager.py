@@ -0,0 +1,169 @@
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Set
+
+# Node error messages that mean our local view of the nonce is wrong
+RESYNC_ERRORS = (
+    "nonce too low",
+    "replacement transaction underpriced",
+    "transaction underpriced",
+    "already known",
+    "known transaction",
+)
+
+
+def is_nonce_error(error: Exception) -> bool:
+    message = str(error).lower()
+    return any(text in message for text in RESYNC_ERRORS)
+
+
+class _SenderState:
+    def __init__(self, next_nonce: int):
+        self.lock = threading.Lock()
+        self.next_nonce = next_nonce
+        # Nonces handed out but not yet accepted by the node
+        self.reserved: Set[int] = set()
+        # Nonces given back after a failed send; reused before next_nonce
+        self.free: Set[int] = set()
+        # Nonces accepted by the node -> time they were sent
+        self.pending: Dict[int, float] = {}
+
+
+class NonceManager:
+    """
+    Hands out nonces per sender from memory so one account can have many
+    transactions in flight.
+
+    The starting nonce comes from the chain's pending count the first time a
+    sender is seen, and again whenever the node reports a nonce error.
+    Nonces whose send failed are reused first so they don't leave a gap;
+    gaps and transactions stuck below the chain can be cancelled with
+    fill_gaps().
+    """
+
+    def __init__(self, w3, stuck_after: float = 120.0):
+        self.w3 = w3
+        self.stuck_after = stuck_after
+        self._senders: Dict[str, _SenderState] = {}
+        self._lock = threading.Lock()
+
+        # Metrics
+        self.reservations = 0
+        self.resyncs = 0
+        self.cancelled = 0
+
+    def _chain_count(self, address: str, block: str = "pending") -> int:
+        return self.w3.eth.get_transaction_count(address, block)
+
+    def _state(self, address: str) -> _SenderState:
+        key = address.lower()
+        state = self._senders.get(key)
+        if state is None:
+            with self._lock:
+                state = self._senders.get(key)
+                if state is None:
+                    state = _SenderState(self._chain_count(address))
+                    self._senders[key] = state
+        return state
+
+    def is_tracked(self, address: str) -> bool:
+        return address.lower() in self._senders
+
+    def seed(self, address: str, chain_nonce: int):
+        """Start tracking a sender from a pending count fetched by the caller (e.g. over async RPC)"""
+        with self._lock:
+            self._senders.setdefault(address.lower(), _SenderState(chain_nonce))
+
+    def reserve(self, address: str) -> int:
+        """Take the next nonce for a sender"""
+        state = self._state(address)
+        with state.lock:
+            if state.free:
+                nonce = min(state.free)
+                state.free.discard(nonce)
+            else:
+                nonce = state.next_nonce
+                state.next_nonce += 1
+            state.reserved.add(nonce)
+            self.reservations += 1
+            return nonce
+
+    def confirm(self, address: str, nonce: int):
+        """The node accepted the transaction using this nonce"""
+        state = self._state(address)
+        with state.lock:
+            state.reserved.discard(nonce)
+            state.pending[nonce] = time.monotonic()
+
+    def release(self, address: str, nonce: int):
+        """The transaction using this nonce was never accepted; hand it out again"""
+        state = self._state(address)
+        with state.lock:
+            state.reserved.discard(nonce)
+            if nonce < state.next_nonce:
+                state.free.add(nonce)
+
+    def resync(self, address: str, chain_nonce: Optional[int] = None):
+        """Re-read the sender's nonce from the chain after a nonce error"""
+        state = self._state(address)
+        if chain_nonce is None:
+            chain_nonce = self._chain_count(address)
+        with state.lock:
+            self.resyncs += 1
+            state.pending = {n: t for n, t in state.pending.items() if n >= chain_nonce}
+            state.free = {n for n in state.free if n >= chain_nonce}
+            in_use = state.reserved | set(state.pending)
+            state.next_nonce = max([chain_nonce] + [n + 1 for n in in_use])
+            # Anything between the chain nonce and our highest nonce that is
+            # neither reserved nor pending is a gap
+            state.free |= {
+                n for n in range(chain_nonce, state.next_nonce) if n not in in_use
+            }
+
+    def gaps(self, address: str) -> List[int]:
+        """
+        Nonces blocking later transactions: unused nonces below the highest
+        handed out, and pending ones not mined after stuck_after seconds.
+        """
+        state = self._state(address)
+        mined = self._chain_count(address, "latest")
+        now = time.monotonic()
+        with state.lock:
+            for nonce in [n for n in state.pending if n < mined]:
+                del state.pending[nonce]
+            stuck = {n for n, sent in state.pending.items() if now - sent > self.stuck_after}
+            holes = {n for n in state.free if n >= mined and any(p > n for p in state.pending)}
+            return sorted(stuck | holes)
+
+    def fill_gaps(self, address: str, cancel: Callable[[int], Any]) -> List[int]:
+        """
+        Cancel every gap with cancel(nonce), which should send a 0-value
+        self-transfer using that nonce (with a bumped fee for stuck ones).
+        """
+        filled = []
+        for nonce in self.gaps(address):
+            state = self._state(address)
+            with state.lock:
+                state.free.discard(nonce)
+                state.reserved.add(nonce)
+            try:
+                cancel(nonce)
+            except Exception as e:
+                print(f"Failed to cancel nonce {nonce} for {address}: {str(e)}")
+                self.release(address, nonce)
+                continue
+            self.confirm(address, nonce)
+            self.cancelled += 1
+            filled.append(nonce)
+        return filled
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            senders = list(self._senders.values())
+        return {
+            "senders": len(senders),
+            "in_flight": sum(len(s.pending) + len(s.reserved) for s in senders),
+            "reservations": self.reservations,
+            "resyncs": self.resyncs,
+            "cancelled": self.cancelled,
+        }
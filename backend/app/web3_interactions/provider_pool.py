@@ -0,0 +1,268 @@
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence
+
+from aiohttp import ClientTimeout
+from eth_account import Account
+from web3.providers.async_base import AsyncJSONBaseProvider
+from web3.providers.base import JSONBaseProvider
+from web3.providers.rpc import AsyncHTTPProvider, HTTPProvider
+
+from .rpc import JsonRpcError, RpcCall, batch_call_sync
+
+# Requests pinned to one endpoint per sender so nonces stay consistent
+WRITE_METHODS = {"eth_sendRawTransaction"}
+SENDER_METHODS = {"eth_getTransactionCount"}
+
+
+class Endpoint:
+    """One RPC endpoint with its latency/error EWMAs and circuit breaker state"""
+
+    def __init__(self, url: str, timeout: float):
+        self.url = url
+        self.timeout = timeout
+        # The pool fails over itself, so the per-endpoint providers don't retry
+        self.provider = HTTPProvider(url, request_kwargs={"timeout": timeout}, exception_retry_configuration=None)
+        self._async_provider: Optional[AsyncHTTPProvider] = None
+        self.latency: Optional[float] = None
+        self.error_rate = 0.0
+        self.failures = 0
+        self.open_until = 0.0
+        self.block: Optional[int] = None
+        self.requests = 0
+        self.errors = 0
+
+    @property
+    def async_provider(self) -> AsyncHTTPProvider:
+        if self._async_provider is None:
+            self._async_provider = AsyncHTTPProvider(
+                self.url,
+                request_kwargs={"timeout": ClientTimeout(total=self.timeout)},
+                exception_retry_configuration=None,
+            )
+        return self._async_provider
+
+    def score(self) -> float:
+        """Lower is better: expected latency inflated by the recent error rate"""
+        latency = self.latency if self.latency is not None else self.timeout / 10
+        return latency * (1 + 10 * self.error_rate)
+
+
+class ProviderPool:
+    """
+    Routes JSON-RPC traffic over several endpoints.
+
+    Reads go to the healthy endpoint with the best latency/error score;
+    transactions and nonce lookups stay on one endpoint per sender. After
+    failure_threshold consecutive failures an endpoint's circuit opens for
+    an exponentially growing backoff, and a background thread probes every
+    endpoint with eth_blockNumber to keep scores fresh and spot nodes
+    lagging behind the others.
+    """
+
+    def __init__(self, urls: Sequence[str], timeout: float = 10.0, alpha: float = 0.2,
+                 failure_threshold: int = 3, backoff: float = 1.0, max_backoff: float = 60.0,
+                 max_lag: int = 5, health_interval: float = 5.0):
+        if not urls:
+            raise ValueError("At least one RPC endpoint is required")
+        self.endpoints = [Endpoint(url, timeout) for url in urls]
+        self.alpha = alpha
+        self.failure_threshold = failure_threshold
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.max_lag = max_lag
+        self.health_interval = health_interval
+        self._pinned: Dict[str, Endpoint] = {}
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        # Metrics
+        self.failovers = 0
+        self.circuit_opens = 0
+
+    def record(self, endpoint: Endpoint, latency: Optional[float]):
+        """Record a request outcome; latency is None for a failure"""
+        with self._lock:
+            endpoint.requests += 1
+            failed = latency is None
+            endpoint.error_rate += self.alpha * ((1.0 if failed else 0.0) - endpoint.error_rate)
+            if not failed:
+                endpoint.latency = latency if endpoint.latency is None else \
+                    endpoint.latency + self.alpha * (latency - endpoint.latency)
+                endpoint.failures = 0
+                return
+            endpoint.errors += 1
+            endpoint.failures += 1
+            if endpoint.failures >= self.failure_threshold:
+                exponent = endpoint.failures - self.failure_threshold
+                endpoint.open_until = time.monotonic() + min(self.backoff * 2 ** exponent, self.max_backoff)
+                self.circuit_opens += 1
+
+    def _healthy(self, endpoint: Endpoint, now: float, head: Optional[int]) -> bool:
+        if now < endpoint.open_until:
+            return False
+        return head is None or endpoint.block is None or head - endpoint.block <= self.max_lag
+
+    def candidates(self, sender: Optional[str] = None) -> List[Endpoint]:
+        """Endpoints in the order to try them; unhealthy ones come last as a fallback"""
+        now = time.monotonic()
+        with self._lock:
+            blocks = [e.block for e in self.endpoints if e.block is not None]
+            head = max(blocks) if blocks else None
+            ranked = sorted(self.endpoints, key=lambda e: (not self._healthy(e, now, head), e.score()))
+            pinned = self._pinned.get(sender) if sender else None
+            if pinned is not None and self._healthy(pinned, now, head):
+                ranked.remove(pinned)
+                ranked.insert(0, pinned)
+            return ranked
+
+    def _succeeded(self, endpoint: Endpoint, sender: Optional[str], attempt: int):
+        if attempt:
+            self.failovers += 1
+        if sender:
+            with self._lock:
+                self._pinned[sender] = endpoint
+
+    @staticmethod
+    def sender_of(method: str, params: Any) -> Optional[str]:
+        """The account a request has to stay pinned for, if any"""
+        try:
+            if method in WRITE_METHODS:
+                return Account.recover_transaction(params[0]).lower()
+            if method in SENDER_METHODS:
+                return str(params[0]).lower()
+        except Exception:
+            return None
+        return None
+
+    def request(self, method: str, params: Any) -> Dict[str, Any]:
+        sender = self.sender_of(method, params)
+        error: Optional[Exception] = None
+        for attempt, endpoint in enumerate(self.candidates(sender)):
+            start = time.perf_counter()
+            try:
+                response = endpoint.provider.make_request(method, params)
+            except Exception as e:
+                self.record(endpoint, None)
+                error = e
+                continue
+            self.record(endpoint, time.perf_counter() - start)
+            self._succeeded(endpoint, sender, attempt)
+            return response
+        raise error
+
+    async def async_request(self, method: str, params: Any) -> Dict[str, Any]:
+        sender = self.sender_of(method, params)
+        error: Optional[Exception] = None
+        for attempt, endpoint in enumerate(self.candidates(sender)):
+            start = time.perf_counter()
+            try:
+                response = await endpoint.async_provider.make_request(method, params)
+            except Exception as e:
+                self.record(endpoint, None)
+                error = e
+                continue
+            self.record(endpoint, time.perf_counter() - start)
+            self._succeeded(endpoint, sender, attempt)
+            return response
+        raise error
+
+    def batch_call_sync(self, calls: Sequence[RpcCall], sender: Optional[str] = None) -> List[Any]:
+        """rpc.batch_call_sync on the best endpoint (pinned for sender), failing over on errors"""
+        sender = sender.lower() if sender else None
+        error: Optional[Exception] = None
+        for attempt, endpoint in enumerate(self.candidates(sender)):
+            start = time.perf_counter()
+            try:
+                results = batch_call_sync(endpoint.url, calls)
+            except Exception as e:
+                self.record(endpoint, None)
+                error = e
+                continue
+            self.record(endpoint, time.perf_counter() - start)
+            self._succeeded(endpoint, sender, attempt)
+            return results
+        raise error
+
+    def check_health(self):
+        """Probe every endpoint once"""
+        for endpoint in self.endpoints:
+            start = time.perf_counter()
+            try:
+                block = batch_call_sync(endpoint.url, [("eth_blockNumber", [])])[0]
+                if isinstance(block, JsonRpcError):
+                    raise block
+            except Exception as e:
+                print(f"RPC endpoint {endpoint.url} failed health check: {str(e)}")
+                self.record(endpoint, None)
+                continue
+            self.record(endpoint, time.perf_counter() - start)
+            with self._lock:
+                endpoint.block = int(block, 16)
+
+    def _run(self):
+        while not self._stopping.wait(self.health_interval):
+            self.check_health()
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stopping.clear()
+            self._thread = threading.Thread(target=self._run, name="rpc-health", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stopping.set()
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        with self._lock:
+            blocks = [e.block for e in self.endpoints if e.block is not None]
+            head = max(blocks) if blocks else None
+            return {
+                "failovers": self.failovers,
+                "circuit_opens": self.circuit_opens,
+                "pinned_senders": len(self._pinned),
+                "endpoints": [
+                    {
+                        "healthy": self._healthy(e, now, head),
+                        "latency_ms": round(e.latency * 1000, 1) if e.latency is not None else None,
+                        "error_rate": round(e.error_rate, 4),
+                        "block": e.block,
+                        "requests": e.requests,
+                        "errors": e.errors,
+                    }
+                    for e in self.endpoints
+                ],
+            }
+
+
+class PooledHTTPProvider(JSONBaseProvider):
+    """Web3 provider that sends every request through a ProviderPool"""
+
+    def __init__(self, pool: ProviderPool, **kwargs: Any):
+        super().__init__(**kwargs)
+        self.pool = pool
+
+    def make_request(self, method, params):
+        return self.pool.request(method, params)
+
+
+class AsyncPooledHTTPProvider(AsyncJSONBaseProvider):
+    """AsyncWeb3 provider that sends every request through a ProviderPool"""
+
+    def __init__(self, pool: ProviderPool, **kwargs: Any):
+        super().__init__(**kwargs)
+        self.pool = pool
+
+    async def make_request(self, method, params):
+        return await self.pool.async_request(method, params)
+
+    async def is_connected(self, show_traceback: bool = False) -> bool:
+        try:
+            response = await self.make_request("web3_clientVersion", [])
+        except Exception:
+            if show_traceback:
+                raise
+            return False
+        return "error" not in response
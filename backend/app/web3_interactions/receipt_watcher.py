@@ -0,0 +1,223 @@
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from hexbytes import HexBytes
+# Private web3 API: receipts are fetched in raw JSON-RPC batches, so they are
+# formatted exactly as w3.eth.get_transaction_receipt would. web3 is pinned
+# exactly in requirements.txt for this; re-check it when upgrading.
+from web3._utils.method_formatters import receipt_formatter
+from web3.datastructures import AttributeDict
+from web3.exceptions import TimeExhausted
+
+from .rpc import JsonRpcError, RpcCall
+
+
+class TransactionDroppedError(Exception):
+    """The node no longer knows a transaction that was never mined"""
+
+
+def _hash_key(tx_hash) -> str:
+    return HexBytes(tx_hash).to_0x_hex().lower()
+
+
+class _Waiter:
+    def __init__(self, deadline: Optional[float], confirmations: int,
+                 on_reorg: Optional[Callable[[str, Optional[AttributeDict]], None]]):
+        self.future: Future = Future()
+        self.deadline = deadline
+        self.confirmations = confirmations
+        self.on_reorg = on_reorg
+
+
+class _Entry:
+    def __init__(self):
+        self.added = time.monotonic()
+        self.receipt: Optional[AttributeDict] = None
+        self.waiters: List[_Waiter] = []
+
+
+class ReceiptWatcher:
+    """
+    One polling loop for the receipts of every pending transaction.
+
+    Each new block triggers a single JSON-RPC batch with the receipts of all
+    watched hashes, so polling traffic grows with blocks rather than with
+    transactions in flight. Mined receipts stay watched for reorg_depth
+    blocks and waiters are told if their receipt moves or disappears.
+    Transactions still unmined after drop_after seconds are checked with
+    eth_getTransactionByHash and failed if the node has forgotten them.
+    """
+
+    def __init__(self, batch_call: Callable[[Sequence[RpcCall]], List[Any]], poll_interval: float = 2.0,
+                 reorg_depth: int = 3, drop_after: float = 300.0):
+        self.batch_call = batch_call
+        self.poll_interval = poll_interval
+        self.reorg_depth = reorg_depth
+        self.drop_after = drop_after
+        self._entries: Dict[str, _Entry] = {}
+        self._lock = threading.Lock()
+        self._last_block: Optional[int] = None
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        # Metrics
+        self.polls = 0
+        self.resolved = 0
+        self.reorgs = 0
+        self.dropped = 0
+        self.timeouts = 0
+
+    def watch(self, tx_hash, timeout: Optional[float] = 120, confirmations: int = 0,
+              callback: Optional[Callable[[Future], None]] = None,
+              on_reorg: Optional[Callable[[str, Optional[AttributeDict]], None]] = None) -> Future:
+        """
+        Future resolved with the receipt once it is `confirmations` blocks deep.
+
+        callback is attached to the future; on_reorg(tx_hash, receipt) is
+        called if an already resolved receipt is reorged (receipt is None
+        while the transaction is back in the mempool).
+        """
+        waiter = _Waiter(
+            time.monotonic() + timeout if timeout is not None else None,
+            confirmations,
+            on_reorg,
+        )
+        if callback is not None:
+            waiter.future.add_done_callback(callback)
+        with self._lock:
+            self._entries.setdefault(_hash_key(tx_hash), _Entry()).waiters.append(waiter)
+        self._ensure_started()
+        return waiter.future
+
+    def wait(self, tx_hash, timeout: float = 120, confirmations: int = 0) -> AttributeDict:
+        """Blocking wait, a drop-in for wait_for_transaction_receipt"""
+        return self.watch(tx_hash, timeout, confirmations).result()
+
+    def _ensure_started(self):
+        if self._thread is None or not self._thread.is_alive():
+            with self._lock:
+                if self._thread is None or not self._thread.is_alive():
+                    self._stopping.clear()
+                    self._thread = threading.Thread(target=self._run, name="receipt-watcher", daemon=True)
+                    self._thread.start()
+
+    def _run(self):
+        while not self._stopping.wait(self.poll_interval):
+            if not self._entries:
+                continue
+            try:
+                self._poll()
+            except Exception as e:
+                print(f"Error polling receipts: {str(e)}")
+
+    def _poll(self):
+        self._expire()
+        block = self.batch_call([("eth_blockNumber", [])])[0]
+        if isinstance(block, JsonRpcError):
+            raise block
+        block = int(block, 16)
+        if block == self._last_block:
+            return
+        self._last_block = block
+
+        now = time.monotonic()
+        with self._lock:
+            hashes = list(self._entries)
+            drop_checks = [
+                tx_hash for tx_hash, entry in self._entries.items()
+                if entry.receipt is None and now - entry.added >= self.drop_after
+            ]
+        calls = [("eth_getTransactionReceipt", [tx_hash]) for tx_hash in hashes]
+        calls += [("eth_getTransactionByHash", [tx_hash]) for tx_hash in drop_checks]
+        results = self.batch_call(calls)
+        self.polls += 1
+
+        for tx_hash, result in zip(hashes, results[:len(hashes)]):
+            if not isinstance(result, JsonRpcError):
+                self._update(tx_hash, result, block)
+        for tx_hash, result in zip(drop_checks, results[len(hashes):]):
+            if result is None:
+                self._drop(tx_hash)
+
+    def _update(self, tx_hash: str, raw: Optional[dict], block: int):
+        receipt = AttributeDict.recursive(receipt_formatter(raw)) if raw is not None else None
+        with self._lock:
+            entry = self._entries.get(tx_hash)
+            if entry is None:
+                return
+            previous = entry.receipt
+            entry.receipt = receipt
+            reorged = previous is not None and (receipt is None or receipt['blockHash'] != previous['blockHash'])
+            if reorged:
+                self.reorgs += 1
+                resolved = [w for w in entry.waiters if w.future.done() and w.on_reorg is not None]
+            else:
+                resolved = []
+            ready = []
+            if receipt is not None:
+                depth = block - receipt['blockNumber']
+                ready = [w for w in entry.waiters if not w.future.done() and depth >= w.confirmations]
+                waiting = [w for w in entry.waiters if not w.future.done() and w not in ready]
+                if depth >= self.reorg_depth and not waiting:
+                    del self._entries[tx_hash]
+
+        for waiter in resolved:
+            try:
+                waiter.on_reorg(tx_hash, receipt)
+            except Exception as e:
+                print(f"Error in reorg callback for {tx_hash}: {str(e)}")
+        for waiter in ready:
+            if not waiter.future.done():
+                waiter.future.set_result(receipt)
+                self.resolved += 1
+
+    def _drop(self, tx_hash: str):
+        with self._lock:
+            entry = self._entries.get(tx_hash)
+            if entry is None or entry.receipt is not None:
+                return
+            del self._entries[tx_hash]
+            self.dropped += 1
+        for waiter in entry.waiters:
+            if not waiter.future.done():
+                waiter.future.set_exception(TransactionDroppedError(f"Transaction {tx_hash} was dropped"))
+
+    def _expire(self):
+        now = time.monotonic()
+        expired = []
+        with self._lock:
+            for tx_hash, entry in list(self._entries.items()):
+                for waiter in entry.waiters:
+                    if not waiter.future.done() and waiter.deadline is not None and now >= waiter.deadline:
+                        expired.append((tx_hash, waiter))
+                # Resolved waiters are kept only while they want reorg notifications
+                entry.waiters = [
+                    w for w in entry.waiters
+                    if not (w.deadline is not None and now >= w.deadline and not w.future.done())
+                    and (not w.future.done() or w.on_reorg is not None)
+                ]
+                if entry.receipt is None and not any(not w.future.done() for w in entry.waiters):
+                    del self._entries[tx_hash]
+        for tx_hash, waiter in expired:
+            self.timeouts += 1
+            waiter.future.set_exception(
+                TimeExhausted(f"Transaction {tx_hash} is not in the chain after the timeout")
+            )
+
+    def stop(self):
+        self._stopping.set()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            watched = len(self._entries)
+        return {
+            "watched": watched,
+            "last_block": self._last_block,
+            "polls": self.polls,
+            "resolved": self.resolved,
+            "reorgs": self.reorgs,
+            "dropped": self.dropped,
+            "timeouts": self.timeouts,
+        }
@@ -0,0 +1,108 @@
+import asyncio
+import itertools
+import os
+import threading
+from typing import Any, List, Optional, Sequence, Tuple
+
+import httpx
+import requests
+
+# Keep batches under common provider limits; larger call lists are split into
+# several batches that are sent concurrently
+MAX_BATCH_SIZE = int(os.getenv("RPC_MAX_BATCH_SIZE", "100"))
+RPC_TIMEOUT = float(os.getenv("RPC_TIMEOUT", "30"))
+
+RpcCall = Tuple[str, Sequence[Any]]
+
+
+class JsonRpcError(Exception):
+    """Error object returned by a JSON-RPC endpoint for a single call"""
+
+    def __init__(self, error: dict):
+        self.code = error.get("code")
+        self.data = error.get("data")
+        super().__init__(error.get("message", str(error)))
+
+
+_ids = itertools.count(1)
+_async_client: Optional[httpx.AsyncClient] = None
+_sync_local = threading.local()
+
+
+def _payload(calls: Sequence[RpcCall]) -> List[dict]:
+    return [
+        {"jsonrpc": "2.0", "id": next(_ids), "method": method, "params": list(params)}
+        for method, params in calls
+    ]
+
+
+def _unpack(payload: List[dict], response: Any) -> List[Any]:
+    """Match responses to requests by id; each slot holds a result or a JsonRpcError"""
+    if isinstance(response, dict):
+        # Some providers answer a failed batch with a single error object
+        error = JsonRpcError(response.get("error", {"message": str(response)}))
+        return [error for _ in payload]
+    by_id = {item.get("id"): item for item in response}
+    results = []
+    for request in payload:
+        item = by_id.get(request["id"])
+        if item is None:
+            results.append(JsonRpcError({"message": "Missing response in batch"}))
+        elif "error" in item:
+            results.append(JsonRpcError(item["error"]))
+        else:
+            results.append(item.get("result"))
+    return results
+
+
+def _chunks(calls: Sequence[RpcCall]) -> List[Sequence[RpcCall]]:
+    return [calls[i:i + MAX_BATCH_SIZE] for i in range(0, len(calls), MAX_BATCH_SIZE)]
+
+
+def get_async_client() -> httpx.AsyncClient:
+    """Process-wide keep-alive client for JSON-RPC batches"""
+    global _async_client
+    if _async_client is None:
+        _async_client = httpx.AsyncClient(timeout=RPC_TIMEOUT)
+    return _async_client
+
+
+async def _post_batch(url: str, calls: Sequence[RpcCall]) -> List[Any]:
+    payload = _payload(calls)
+    response = await get_async_client().post(url, json=payload)
+    response.raise_for_status()
+    return _unpack(payload, response.json())
+
+
+async def batch_call(url: str, calls: Sequence[RpcCall]) -> List[Any]:
+    """Send calls as JSON-RPC batches and return results in call order"""
+    if not calls:
+        return []
+    chunks = await asyncio.gather(*(_post_batch(url, chunk) for chunk in _chunks(calls)))
+    return [result for chunk in chunks for result in chunk]
+
+
+def _session() -> requests.Session:
+    session = getattr(_sync_local, "session", None)
+    if session is None:
+        session = requests.Session()
+        _sync_local.session = session
+    return session
+
+
+def batch_call_sync(url: str, calls: Sequence[RpcCall]) -> List[Any]:
+    """Blocking variant of batch_call for code running on worker threads"""
+    results = []
+    for chunk in _chunks(calls):
+        payload = _payload(chunk)
+        response = _session().post(url, json=payload, timeout=RPC_TIMEOUT)
+        response.raise_for_status()
+        results.extend(_unpack(payload, response.json()))
+    return results
+
+
+async def close():
+    global _async_client
+    if _async_client is not None:
+        await _async_client.aclose()
+        _async_client = None
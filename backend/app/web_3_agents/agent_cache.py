@@ -0,0 +1,94 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, FrozenSet, Iterable, Optional, Tuple
+
+CacheKey = Tuple[str, FrozenSet[str]]
+
+
+class AgentCache:
+    """
+    Process-wide LRU cache of initialized OnChainAgents.
+
+    Entries are keyed by (wallet_id, frozenset(functions)) and hold a fully
+    built agent (imported wallet, tool closures and phi Agent). An agent is
+    checked out for the duration of a run so two concurrent runs never share
+    the same phi Agent; the second one simply misses and builds its own.
+    """
+
+    def __init__(self, max_size: int = 256, ttl: float = 900.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[CacheKey, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def key(wallet_id: str, functions: Iterable[str]) -> CacheKey:
+        return (wallet_id, frozenset(functions))
+
+    def checkout(self, key: CacheKey) -> Optional[Any]:
+        """Take a ready agent out of the cache, or None on a miss"""
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None and time.monotonic() - entry[0] > self.ttl:
+                self.evictions += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return entry[1]
+
+    def checkin(self, key: CacheKey, agent: Any, built_at: Optional[float] = None):
+        """Return an agent to the cache after a run"""
+        # Start the next run from a clean conversation, like a freshly built agent
+        phi_agent = getattr(agent, "agent", None)
+        if phi_agent is not None and getattr(phi_agent, "memory", None) is not None:
+            phi_agent.memory.clear()
+
+        built_at = built_at if built_at is not None else getattr(agent, "built_at", time.monotonic())
+        if time.monotonic() - built_at > self.ttl:
+            return
+        with self._lock:
+            if key in self._entries:
+                # Another run already returned an agent for this key
+                return
+            self._entries[key] = (built_at, agent)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, wallet_id: Optional[str] = None) -> int:
+        """Drop cached agents for a wallet, or everything when wallet_id is None"""
+        with self._lock:
+            if wallet_id is None:
+                removed = len(self._entries)
+                self._entries.clear()
+                return removed
+            keys = [key for key in self._entries if key[0] == wallet_id]
+            for key in keys:
+                del self._entries[key]
+            return len(keys)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+agent_cache = AgentCache(
+    max_size=int(os.getenv("AGENT_CACHE_SIZE", "256")),
+    ttl=float(os.getenv("AGENT_CACHE_TTL", "900")),
+)
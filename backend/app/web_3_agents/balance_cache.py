@@ -0,0 +1,61 @@
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Tuple
+
+
+class BalanceCache:
+    """
+    Short-TTL cache of wallet balances keyed by (wallet_id, asset_id).
+
+    Tools that move funds call invalidate_wallet() once their transaction
+    succeeds, so a balance read after a transfer is always fresh.
+    """
+
+    def __init__(self, ttl: float = 15.0):
+        self.ttl = ttl
+        self._balances: Dict[str, Dict[str, Tuple[float, Any]]] = {}
+        # Bumped on invalidation so a fetch that raced with it is not cached
+        self._generation: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get_or_load(self, wallet_id: str, asset_id: str, load: Callable[[], Any]) -> Any:
+        """Return the cached balance, or call load() and cache its result"""
+        asset_id = asset_id.lower()
+        with self._lock:
+            entry = self._balances.get(wallet_id, {}).get(asset_id)
+            if entry is not None and time.monotonic() - entry[0] <= self.ttl:
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            generation = self._generation.get(wallet_id, 0)
+
+        balance = load()
+        with self._lock:
+            if self._generation.get(wallet_id, 0) == generation:
+                self._balances.setdefault(wallet_id, {})[asset_id] = (time.monotonic(), balance)
+        return balance
+
+    def invalidate_wallet(self, wallet_id: str):
+        with self._lock:
+            self._balances.pop(wallet_id, None)
+            self._generation[wallet_id] = self._generation.get(wallet_id, 0) + 1
+            self.invalidations += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "ttl_seconds": self.ttl,
+                "wallets": len(self._balances),
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+balance_cache = BalanceCache(ttl=float(os.getenv("BALANCE_CACHE_TTL", "15")))
@@ -8,6 +8,8 @@ from cdp import *
 from cdp.errors import UnsupportedAssetError
 from decimal import Decimal
 from web3 import Web3
+import time
+from .plan_cache import plan_cache
 
 
 load_dotenv()
@@ -128,8 +130,9 @@ class Web3Converter:
             # "create_register_contract_method_args": "Create registration arguments for Basenames.",
             # "register_basename": "Register a basename for the agent's wallet."
         }
+        self.model_id = 'gemini-2.0-flash-exp'
         self.converter = Agent(
-            model=Gemini(model='gemini-2.0-flash-exp', api_key=os.getenv("GEMINI_API_KEY")),
+            model=Gemini(model=self.model_id, api_key=os.getenv("GEMINI_API_KEY")),
             description=(
                 "You are a highly skilled web3 developer with expertise in transitioning web2 applications to web3."
                 "Your role is to critically assess the web2 application and recommend essential web3 functionalities only when they are truly needed."
@@ -148,10 +151,11 @@ class Web3Converter:
         )
 
 
-    def run(self, user_prompt):
-        run: RunResponse = self.converter.run(user_prompt)
-        self.functions = []
-        for funcs in run.content.functions:
+    def run(self, user_prompt) -> List[List[str]]:
+        """Ask the model for a plan and return the function list of each task"""
+        plan = self._plan(user_prompt)
+        functions = []
+        for funcs in plan.functions:
             tool = []
             for func in funcs.function:
                 tool.append(func)
@@ -159,7 +163,22 @@ class Web3Converter:
         #             tool.append(self.toolkit[func])
         #         else:
         #             print(f"Warning: Function '{func}' not found in toolkit.")
-            self.functions.append(tool)
+            functions.append(tool)
+        return functions
+
+    def _plan(self, user_prompt) -> Functions:
+        """Get the plan from the plan cache, falling back to the model on a miss"""
+        key = plan_cache.key(user_prompt, self.model_id, self.functions)
+        cached = plan_cache.get(key)
+        if cached is not None:
+            return Functions.model_validate_json(cached)
+
+        started = time.monotonic()
+        run: RunResponse = self.converter.run(user_prompt)
+        if not isinstance(run.content, Functions):
+            raise ValueError(f"Converter did not return a plan: {run.content}")
+        plan_cache.put(key, run.content.model_dump_json(), time.monotonic() - started)
+        return run.content
 
 # if __name__ == "__main__":
 #     web3_converter = Web3Converter()
@@ -1,11 +1,26 @@
 from .converter_agent import Web3Converter
-from .onchain_agent import OnChainAgents, load_agent, ask_agent
-from typing import List, Optional
+from .onchain_agent import OnChainAgents, load_agent, ask_agent, stream_agent, invoke_tool
+from .agent_cache import agent_cache
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, List, NamedTuple, Optional
+import os
+
+# Shared by every create-agents call so the total number of concurrent
+# CDP wallet creations stays bounded
+_provision_pool = ThreadPoolExecutor(
+    max_workers=int(os.getenv("AGENT_PROVISION_PARALLELISM", "8")),
+    thread_name_prefix="agent-provision"
+)
+
+class AgentCreationResult(NamedTuple):
+    """Outcome of provisioning one task of the plan"""
+    functions: List[str]
+    agent: Optional[OnChainAgents] = None
+    error: Optional[str] = None
 
 class Web3AgentManager:
     def __init__(self, user_id: str):
         self.user_id = user_id
-        self.web3_converter = Web3Converter()
         self.agents: List[OnChainAgents] = []
         self._instance_id = id(self)
         print(f"Initialized Web3AgentManager with ID: {self._instance_id}")
@@ -24,48 +39,69 @@ class Web3AgentManager:
 
         return agent
 
-    def create_agents(self, prompt: str) -> List[OnChainAgents]:
-        """Create agents based on the prompt"""
+    def _provision_agent(self, func_list: List[str]) -> AgentCreationResult:
+        try:
+            agent = self.initialize_agents(function_names=func_list)
+            # Ready to serve the first run-agent call for this wallet
+            agent_cache.checkin(agent_cache.key(agent.wallet_id, func_list), agent)
+            return AgentCreationResult(functions=func_list, agent=agent)
+        except Exception as e:
+            print(f"Error creating agent: {str(e)}")
+            return AgentCreationResult(functions=func_list, error=str(e))
+
+    def create_agents(self, prompt: str) -> List[AgentCreationResult]:
+        """Create agents based on the prompt, one per task, in plan order"""
         try:
             print(f"Creating agents with manager {self._instance_id}")
-            self.web3_converter.run(prompt)
-            agent_counter = 1
+            # A converter per call: the phi Agent keeps run state and is not
+            # safe to share between concurrent requests
+            web3_converter = Web3Converter()
+            functions = web3_converter.run(prompt)
             
-            functions = self.web3_converter.functions
             print(f"\nAvailable functions for manager {self._instance_id}:", functions)
             
-            # Clear existing agents
-            self.agents = []
-            
-            # Create a list to store all created agents
-            created_agents = []
-            
-            for func_list in functions:
-                try:
-                    if isinstance(func_list, list):
-                        agent_name = f"agent{agent_counter}"
-                        # Create a new agent and append it to the list
-                        agent = self.initialize_agents(function_names=func_list)
-                        created_agents.append(agent)
-                        agent_counter += 1
-                except Exception as e:
-                    print(f"Error creating agent: {str(e)}")
-                    continue
+            # Wallet creation dominates, so provision every task concurrently;
+            # map() keeps the results in plan order
+            func_lists = [func_list for func_list in functions if isinstance(func_list, list)]
+            results = list(_provision_pool.map(self._provision_agent, func_lists))
             
             # Update the class's agents list with all created agents
-            self.agents = created_agents
+            self.agents = [result.agent for result in results if result.agent is not None]
             
-            print(f"\nManager {self._instance_id} created {len(self.agents)} agents")
-            return self.agents
+            print(f"\nManager {self._instance_id} created {len(self.agents)} of {len(results)} agents")
+            return results
             
         except Exception as e:
             print(f"Error in create_agents: {str(e)}")
             raise
     
+    def _with_agent(self, functions: List[str], wallet_id: str, run: Callable[[OnChainAgents], Any]) -> Any:
+        """Check an agent out of the cache (or build it), run it, and return it to the cache"""
+        key = agent_cache.key(wallet_id, functions)
+        agent = agent_cache.checkout(key)
+        if agent is None:
+            agent = self.initialize_agents(function_names=functions, wallet_id=wallet_id)
+        try:
+            return run(agent)
+        finally:
+            # Only cache agents that really hold the requested wallet; a missing
+            # wallet makes load_agent fall back to creating a new one
+            if agent.wallet.id == wallet_id:
+                agent_cache.checkin(key, agent)
+
     def run_agent(self, functions:List[str], wallet_id: str, agent_index: int, prompt: str) -> str:
         """Run a specific agent with the given prompt"""
-        agent = self.initialize_agents(function_names=functions, wallet_id=wallet_id)            
-        return ask_agent(agent, prompt)
+        return self._with_agent(functions, wallet_id, lambda agent: ask_agent(agent, prompt))
+
+    def run_agent_stream(self, functions: List[str], wallet_id: str, prompt: str,
+                         emit: Callable[[dict], None]) -> str:
+        """Run a specific agent, emitting tokens and tool events as they happen"""
+        return self._with_agent(functions, wallet_id, lambda agent: stream_agent(agent, prompt, emit))
+
+    def invoke_tool(self, wallet_id: str, tool: str, arguments: dict,
+                    emit: Optional[Callable[[dict], None]] = None) -> str:
+        """Call a single tool on the wallet's agent without a model round trip"""
+        return self._with_agent([tool], wallet_id, lambda agent: invoke_tool(agent, tool, arguments, emit))
     
     def get_agents(self) -> List[OnChainAgents]:
         """Get all created agents"""
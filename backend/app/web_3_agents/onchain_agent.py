@@ -5,9 +5,15 @@ import json
 from phi.model.google import Gemini
 from phi.agent import Agent, RunResponse
 from cdp.errors import UnsupportedAssetError
-from typing import Optional, List, Union
+from typing import Any, Optional, List, Union, Callable
 from decimal import Decimal
 from pydantic import BaseModel
+import time
+import contextvars
+import functools
+from .wallet_store import wallet_store, read_legacy_wallet, export_encrypted_seed
+from .wallet_pool import wallet_pool
+from .balance_cache import balance_cache
 
 load_dotenv()
 
@@ -49,6 +55,61 @@ def configure_cdp():
 
 cdp_configured = configure_cdp()    
 
+# Tools that submit a transaction and wait for it to be mined
+ONCHAIN_TOOLS = {
+    'transfer_asset', 'request_eth_from_faucet', 'deploy_nft', 'mint_nft', 'swap_assets', 'create_token'
+}
+
+# Receives tool progress events for the run executing in the current context
+_tool_event_sink: contextvars.ContextVar[Optional[Callable[[dict], None]]] = contextvars.ContextVar(
+    "tool_event_sink", default=None
+)
+
+def _traced(tool: Callable) -> Callable:
+    """Wrap a tool so it reports start/finish events and durations to the active sink"""
+    @functools.wraps(tool)
+    def wrapper(*args, **kwargs):
+        emit = _tool_event_sink.get()
+        if emit is None:
+            return tool(*args, **kwargs)
+        name = tool.__name__
+        onchain = name in ONCHAIN_TOOLS
+        started = time.monotonic()
+        emit({
+            "event": "tool_started",
+            "tool": name,
+            "onchain": onchain,
+            "arguments": kwargs,
+            "message": f"{name} started"
+        })
+        try:
+            result = tool(*args, **kwargs)
+        except Exception as e:
+            duration_ms = round((time.monotonic() - started) * 1000, 2)
+            emit({"event": "tool_failed", "tool": name, "onchain": onchain, "duration_ms": duration_ms, "error": str(e)})
+            raise
+        duration_ms = round((time.monotonic() - started) * 1000, 2)
+        emit({
+            "event": "tool_finished",
+            "tool": name,
+            "onchain": onchain,
+            "duration_ms": duration_ms,
+            "result": result,
+            "message": f"{name} {'mined' if onchain else 'finished'} in {duration_ms} ms"
+        })
+        return result
+    return wrapper
+
+def _report_submitted(tool_name: str, operation: Any):
+    """Tell the active sink the transaction hash of a CDP operation before waiting for it"""
+    emit = _tool_event_sink.get()
+    if emit is None:
+        return
+    tx_hash = getattr(operation, "transaction_hash", None)
+    if tx_hash is None:
+        tx_hash = getattr(getattr(operation, "transaction", None), "transaction_hash", None)
+    emit({"event": "tx_submitted", "tool": tool_name, "onchain": True, "tx_hash": tx_hash})
+
 class OnChainAgents:
     def __init__(self, wallet_id: Optional[str] = None):
         """
@@ -66,10 +127,11 @@ class OnChainAgents:
         
         # Initialize wallet
         self.wallet_id = wallet_id
+        self._created = False
         self.wallet = self._initialize_wallet(wallet_id)
         
-        # Save wallet data after initialization
-        if self.wallet:
+        # Persist newly created wallets; loaded ones are already in the store
+        if self.wallet and self._created:
             wallet_data = self.wallet.export_data()
             self._save_wallet(wallet_data)
     
@@ -90,11 +152,30 @@ class OnChainAgents:
                 except Exception as e:
                     print(f"Error importing wallet data: {str(e)}")
         
+        # Take a pre-provisioned wallet if the warm pool has one
+        claimed = wallet_pool.claim()
+        if claimed:
+            try:
+                pooled_id, wallet = claimed
+                if wallet is None:
+                    # Provisioned by another worker process
+                    wallet_data = self._load_wallet(pooled_id)
+                    wallet = Wallet.import_data(WalletData(
+                        wallet_id=wallet_data['wallet_id'],
+                        seed=wallet_data['seed']
+                    ))
+                self.wallet_id = pooled_id
+                print(f"Claimed pooled wallet: {self.wallet_id}")
+                return wallet
+            except Exception as e:
+                print(f"Error importing pooled wallet: {str(e)}")
+
         # Create new wallet if no wallet_id or wallet not found
         try:
             wallet = Wallet.create()
             wallet_data = wallet.export_data()
             self.wallet_id = wallet_data.wallet_id
+            self._created = True
             print(f"Created new wallet: {self.wallet_id}")
             return wallet
         except Exception as e:
@@ -102,59 +183,46 @@ class OnChainAgents:
             raise
 
     def _load_wallet(self, wallet_id: str) -> Optional[dict]:
-        """Load wallet data from storage"""
-        file_path = os.path.join(self.WalletStorage, f"{wallet_id}.json")
+        """Load wallet data from the wallet store"""
         try:
-            if os.path.exists(file_path):
-                with open(file_path, 'r') as file:
-                    data = json.load(file)
-                    print(f"Loaded wallet data for {wallet_id}")
-                    return data
-            else:
-                print(f"No wallet data found for ID: {wallet_id}")
+            data = wallet_store.load(wallet_id)
+            if data is None:
+                data = self._import_legacy_wallet(wallet_id)
+            if data is not None:
+                print(f"Loaded wallet data for {wallet_id}")
+                return data
+            print(f"No wallet data found for ID: {wallet_id}")
         except Exception as e:
             print(f"Error loading wallet data: {str(e)}")
         return None
+
+    def _import_legacy_wallet(self, wallet_id: str) -> Optional[dict]:
+        """Move a wallet saved by the old flat-file layout into the wallet store"""
+        legacy = read_legacy_wallet(self.WalletStorage, wallet_id)
+        if legacy is None:
+            return None
+        data, encrypted_seed = legacy
+        wallet_store.save(wallet_id, data, encrypted_seed)
+        print(f"Imported legacy wallet file for {wallet_id}")
+        return data
     
     def _get_wallet_address(self):
         return self.wallet.default_address.address_id
     
     def _save_wallet(self, wallet_data: WalletData):
-        """Save wallet data and update registry"""
+        """Save wallet data and its encrypted seed to the wallet store"""
         try:
-            # Save wallet data
-            file_path = os.path.join(self.WalletStorage, f"{wallet_data.wallet_id}.json")
-            with open(file_path, 'w') as file:
-                json.dump(wallet_data.to_dict(), file)
-            
-            # Save encrypted seed
-            seed_file = os.path.join(self.WalletStorage, f"{wallet_data.wallet_id}_seed.json")
-            self.wallet.save_seed(seed_file, encrypt=True)
-            
-            # Update registry
-            self._update_wallet_registry(wallet_data.wallet_id)
+            wallet_store.save(
+                wallet_data.wallet_id,
+                wallet_data.to_dict(),
+                export_encrypted_seed(self.wallet)
+            )
             print(f"Wallet {wallet_data.wallet_id} saved successfully")
             
         except Exception as e:
             print(f"Error saving wallet data: {str(e)}")
             raise
 
-    def _update_wallet_registry(self, wallet_id: str):
-        """Update the registry of wallet IDs"""
-        registry_file = os.path.join(self.WalletStorage, "wallet_registry.txt")
-        try:
-            existing_ids = set()
-            if os.path.exists(registry_file):
-                with open(registry_file, 'r') as file:
-                    existing_ids = set(file.read().splitlines())
-            
-            if wallet_id not in existing_ids:
-                with open(registry_file, 'a') as file:
-                    file.write(f"{wallet_id}\n")
-                print(f"Added {wallet_id} to registry")
-        except Exception as e:
-            print(f"Error updating registry: {str(e)}")
-
 def load_agent(wallet_id: Optional[str] = None, functions: Optional[List[str]] = None) -> OnChainAgents:
     """
     Load or create an OnChainAgent and equip it with specified functions.
@@ -169,6 +237,13 @@ def load_agent(wallet_id: Optional[str] = None, functions: Optional[List[str]] =
     try:
         # Create/load the agent
         agent = OnChainAgents(wallet_id=wallet_id)
+        agent.built_at = time.monotonic()
+
+        def cached_balance(asset_id):
+            """Wallet balance through the short-TTL balance cache"""
+            return balance_cache.get_or_load(
+                agent.wallet.id, asset_id, lambda: agent.wallet.balance(asset_id)
+            )
 
         # Function to create a new ERC-20 token
         def create_token(name, symbol, initial_supply):
@@ -187,7 +262,14 @@ def load_agent(wallet_id: Optional[str] = None, functions: Optional[List[str]] =
             initial_supply = int(initial_supply)
             print(type(initial_supply))
             deployed_contract = agent.wallet.deploy_token(name, symbol, initial_supply)
+            _report_submitted("create_token", deployed_contract)
             deployed_contract.wait()
+            balance_cache.invalidate_wallet(agent.wallet.id)
+            try:
+                # Lets the balances endpoint include tokens the user's agents deployed
+                wallet_store.add_token(agent.wallet.id, deployed_contract.contract_address, symbol)
+            except Exception as e:
+                print(f"Error recording deployed token: {str(e)}")
             return f"Token {name} ({symbol}) created with initial supply of {initial_supply} and contract address {deployed_contract.contract_address}"
 
 
@@ -216,13 +298,15 @@ def load_agent(wallet_id: Optional[str] = None, functions: Optional[List[str]] =
                                                     asset_id,
                                                     destination_address,
                                                     gasless=gasless)
+                    _report_submitted("transfer_asset", transfer)
                     transfer.wait()
+                    balance_cache.invalidate_wallet(agent.wallet.id)
                     gasless_msg = " (gasless)" if gasless else ""
                     return f"Transferred {amount} {asset_id}{gasless_msg} to {destination_address}"
 
                 # For other assets, check balance first
                 try:
-                    balance = agent.wallet.balance(asset_id)
+                    balance = cached_balance(asset_id)
                 except UnsupportedAssetError:
                     return f"Error: The asset {asset_id} is not supported on this network. It may have been recently deployed. Please try again in about 30 minutes."
 
@@ -230,7 +314,9 @@ def load_agent(wallet_id: Optional[str] = None, functions: Optional[List[str]] =
                     return f"Insufficient balance. You have {balance} {asset_id}, but tried to transfer {amount}."
 
                 transfer = agent.wallet.transfer(amount, asset_id, destination_address)
+                _report_submitted("transfer_asset", transfer)
                 transfer.wait()
+                balance_cache.invalidate_wallet(agent.wallet.id)
                 return f"Transferred {amount} {asset_id} to {destination_address}"
             except Exception as e:
                 return f"Error transferring asset: {str(e)}. If this is a custom token, it may have been recently deployed. Please try again in about 30 minutes, as it needs to be indexed by CDP first."
@@ -247,7 +333,7 @@ def load_agent(wallet_id: Optional[str] = None, functions: Optional[List[str]] =
             Returns:
             str: A message showing the current balance of the specified asset.
             """
-            balance = agent.wallet.balance(asset_id)
+            balance = cached_balance(asset_id)
             return f"Current balance of {asset_id}: {balance}"
 
         # Function to request ETH from the faucet (testnet only)
@@ -262,6 +348,10 @@ def load_agent(wallet_id: Optional[str] = None, functions: Optional[List[str]] =
                 return "Error: The faucet is only available on Base Sepolia testnet."
 
             faucet_tx = agent.wallet.faucet()
+            _report_submitted("request_eth_from_faucet", faucet_tx)
+            # Invalidating before the funds land would let the old balance be cached again
+            faucet_tx.wait()
+            balance_cache.invalidate_wallet(agent.wallet.id)
             return f"Requested ETH from faucet. Transaction: {faucet_tx}"
 
 
@@ -308,7 +398,10 @@ def load_agent(wallet_id: Optional[str] = None, functions: Optional[List[str]] =
             """
             try:
                 deployed_nft = agent.wallet.deploy_nft(name, symbol, base_uri)
+                _report_submitted("deploy_nft", deployed_nft)
                 deployed_nft.wait()
+                # Deployment gas changes the ETH balance too
+                balance_cache.invalidate_wallet(agent.wallet.id)
                 contract_address = deployed_nft.contract_address
 
                 return f"Successfully deployed NFT contract '{name}' ({symbol}) at address {contract_address} with base URI: {base_uri}"
@@ -334,7 +427,9 @@ def load_agent(wallet_id: Optional[str] = None, functions: Optional[List[str]] =
 
                 mint_invocation = agent.wallet.invoke_contract(
                     contract_address=contract_address, method="mint", args=mint_args)
+                _report_submitted("mint_nft", mint_invocation)
                 mint_invocation.wait()
+                balance_cache.invalidate_wallet(agent.wallet.id)
 
                 return f"Successfully minted NFT to {mint_to}"
 
@@ -362,7 +457,9 @@ def load_agent(wallet_id: Optional[str] = None, functions: Optional[List[str]] =
 
             try:
                 trade = agent.wallet.trade(amount, from_asset_id, to_asset_id)
+                _report_submitted("swap_assets", trade)
                 trade.wait()
+                balance_cache.invalidate_wallet(agent.wallet.id)
                 return f"Successfully swapped {amount} {from_asset_id} for {to_asset_id}"
             except Exception as e:
                 return f"Error swapping assets: {str(e)}"
@@ -381,10 +478,10 @@ def load_agent(wallet_id: Optional[str] = None, functions: Optional[List[str]] =
         
         # Get the requested functions
         if functions:
-            tool_list = []
+            agent.tools = {}
             for func_name in functions:
                 if func_name in available_tools:
-                    tool_list.append(available_tools[func_name])
+                    agent.tools[func_name] = _traced(available_tools[func_name])
                 else:
                     print(f"Warning: Function {func_name} not found")
             
@@ -395,7 +492,7 @@ def load_agent(wallet_id: Optional[str] = None, functions: Optional[List[str]] =
                     model="gemini-2.0-flash-exp",
                     api_key=os.environ.get("GEMINI_API_KEY")
                 ),
-                tools=tool_list
+                tools=list(agent.tools.values())
             )
             print(f"Agent equipped with functions: {functions}")
         
@@ -423,6 +520,53 @@ def ask_agent(agent: OnChainAgents, prompt: str) -> str:
         return response.content
     except Exception as e:
         return f"Error running agent: {str(e)}"
+
+def invoke_tool(agent: OnChainAgents, tool_name: str, arguments: dict,
+                emit: Optional[Callable[[dict], None]] = None) -> str:
+    """
+    Call one of the agent's tools directly, without going through the model
+    
+    Args:
+        agent: The OnChainAgent whose tool to call
+        tool_name: Name of a tool the agent was equipped with
+        arguments: Keyword arguments for the tool
+        emit: Optional receiver of the tool's progress events
+    
+    Returns:
+        str: The tool's result message
+    """
+    if tool_name not in getattr(agent, 'tools', {}):
+        raise ValueError(f"Agent has no tool named {tool_name}")
+    token = _tool_event_sink.set(emit)
+    try:
+        return agent.tools[tool_name](**arguments)
+    finally:
+        _tool_event_sink.reset(token)
+
+def stream_agent(agent: OnChainAgents, prompt: str, emit: Callable[[dict], None]) -> str:
+    """
+    Run an agent with a prompt, emitting events as the run progresses
+    
+    Args:
+        agent: The OnChainAgent to run
+        prompt: The prompt to run the agent with
+        emit: Called with each token and tool progress event
+    
+    Returns:
+        str: The agent's full response
+    """
+    if not hasattr(agent, 'agent'):
+        raise ValueError("Agent not initialized with functions")
+    token = _tool_event_sink.set(emit)
+    try:
+        content = []
+        for chunk in agent.agent.run(prompt, stream=True):
+            if isinstance(chunk.content, str) and chunk.content:
+                content.append(chunk.content)
+                emit({"event": "token", "content": chunk.content})
+        return "".join(content)
+    finally:
+        _tool_event_sink.reset(token)
     
 # agent = load_agent(functions=["get_balance"])
 # print(run_agent(agent, "What is the balance of eth in my wallet?"))
\ No newline at end of file
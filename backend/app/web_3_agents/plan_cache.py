@@ -0,0 +1,124 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from typing import Any, Dict, Optional
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Collapse whitespace and case so trivially different submissions share a key"""
+    return " ".join(unicodedata.normalize("NFC", prompt).split()).casefold()
+
+
+class PlanCache:
+    """
+    Content-addressed on-disk cache of converter plans.
+
+    Keys hash the normalized prompt together with the model id and the
+    function catalog, so changing either one never serves a stale plan.
+    The SQLite file is shared by every worker process; entries expire after
+    ttl seconds and the least recently used ones are evicted past max_entries.
+    """
+
+    def __init__(self, db_path: str, ttl: float = 7 * 24 * 3600, max_entries: int = 10000):
+        self.db_path = db_path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.latency_saved = 0.0
+        with self._connect() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS plans (
+                    key TEXT PRIMARY KEY,
+                    plan TEXT NOT NULL,
+                    latency REAL NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_used REAL NOT NULL
+                ) WITHOUT ROWID
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS plans_last_used ON plans (last_used)")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def key(prompt: str, model_id: str, catalog: Any) -> str:
+        material = json.dumps(
+            {"prompt": normalize_prompt(prompt), "model": model_id, "catalog": catalog},
+            sort_keys=True,
+        )
+        return hashlib.sha256(material.encode()).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached plan JSON, or None on a miss"""
+        now = time.time()
+        conn = self._connect()
+        row = conn.execute(
+            "SELECT plan, latency, created_at FROM plans WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None or now - row[2] > self.ttl:
+            with self._lock:
+                self.misses += 1
+            return None
+        with conn:
+            conn.execute("UPDATE plans SET last_used = ? WHERE key = ?", (now, key))
+        with self._lock:
+            self.hits += 1
+            self.latency_saved += row[1]
+        return row[0]
+
+    def put(self, key: str, plan: str, latency: float):
+        """Store a plan with the model latency it took to produce"""
+        now = time.time()
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                """
+                INSERT INTO plans (key, plan, latency, created_at, last_used) VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(key) DO UPDATE SET
+                    plan = excluded.plan, latency = excluded.latency,
+                    created_at = excluded.created_at, last_used = excluded.last_used
+                """,
+                (key, plan, latency, now, now),
+            )
+            conn.execute("DELETE FROM plans WHERE created_at < ?", (now - self.ttl,))
+            conn.execute(
+                """
+                DELETE FROM plans WHERE key IN (
+                    SELECT key FROM plans ORDER BY last_used DESC LIMIT -1 OFFSET ?
+                )
+                """,
+                (self.max_entries,),
+            )
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "latency_saved_seconds": round(self.latency_saved, 3),
+            }
+
+
+plan_cache = PlanCache(
+    os.getenv("PLAN_CACHE_PATH", os.path.join("cache", "plans.db")),
+    ttl=float(os.getenv("PLAN_CACHE_TTL", str(7 * 24 * 3600))),
+    max_entries=int(os.getenv("PLAN_CACHE_MAX_ENTRIES", "10000")),
+)
@@ -0,0 +1,145 @@
+import os
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+from cdp import Wallet
+from .wallet_store import wallet_store, export_encrypted_seed
+
+
+class WalletPool:
+    """
+    Background pool of wallets that are already created, exported and
+    persisted, so new agents do not wait on Wallet.create().
+
+    The claimable set lives in the wallet store, which hands each wallet out
+    exactly once across threads and worker processes. Wallets created by this
+    process are also kept in memory so claiming them skips Wallet.import_data.
+    """
+
+    def __init__(self, size: int = 5, low_water: Optional[int] = None, poll_interval: float = 30.0):
+        self.size = size
+        self.low_water = low_water if low_water is not None else max(size // 2, 1)
+        self.poll_interval = poll_interval
+        self._wallets: Dict[str, Wallet] = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+
+        # Metrics
+        self.claims = 0
+        self.empty_claims = 0
+        self.created = 0
+        self.create_failures = 0
+        self._create_total = 0.0
+        self._below_since: Optional[float] = None
+        self.last_refill_lag: Optional[float] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.size > 0
+
+    def start(self):
+        """Start the refill thread"""
+        if not self.enabled or self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._refill_loop, name="wallet-pool", daemon=True)
+        self._thread.start()
+        print(f"Wallet pool started with size {self.size}, low-water mark {self.low_water}")
+
+    def stop(self):
+        self._stopping = True
+        self._wakeup.set()
+
+    def claim(self) -> Optional[Tuple[str, Optional[Wallet]]]:
+        """
+        Take a pooled wallet in constant time.
+
+        Returns (wallet_id, wallet) where wallet is None if it was provisioned
+        by another process and still has to be imported, or None if the pool
+        is empty.
+        """
+        if not self.enabled:
+            return None
+        wallet_id = wallet_store.claim_pooled()
+        with self._lock:
+            if wallet_id is None:
+                self.empty_claims += 1
+            else:
+                self.claims += 1
+            wallet = self._wallets.pop(wallet_id, None) if wallet_id else None
+        # Let the refill thread check the low-water mark
+        self._wakeup.set()
+        return (wallet_id, wallet) if wallet_id else None
+
+    def _create_wallet(self):
+        started = time.monotonic()
+        wallet = Wallet.create()
+        wallet_data = wallet.export_data()
+        wallet_store.save(wallet_data.wallet_id, wallet_data.to_dict(), export_encrypted_seed(wallet))
+        with self._lock:
+            self._wallets[wallet_data.wallet_id] = wallet
+            self.created += 1
+            self._create_total += time.monotonic() - started
+        wallet_store.add_to_pool(wallet_data.wallet_id)
+        print(f"Added wallet {wallet_data.wallet_id} to the pool")
+
+    def _refill(self):
+        available = wallet_store.pool_size()
+        if available >= self.low_water:
+            return
+        self._below_since = self._below_since or time.monotonic()
+        while not self._stopping and available < self.size:
+            try:
+                self._create_wallet()
+            except Exception as e:
+                self.create_failures += 1
+                print(f"Error provisioning pooled wallet: {str(e)}")
+                return
+            available = wallet_store.pool_size()
+        self.last_refill_lag = time.monotonic() - self._below_since
+        self._below_since = None
+        self._prune()
+
+    def _prune(self):
+        """Forget in-memory wallets that another process has claimed"""
+        with self._lock:
+            wallet_ids = list(self._wallets)
+        for wallet_id in wallet_ids:
+            if not wallet_store.is_pooled(wallet_id):
+                with self._lock:
+                    self._wallets.pop(wallet_id, None)
+
+    def _refill_loop(self):
+        while not self._stopping:
+            self._wakeup.clear()
+            try:
+                self._refill()
+            except Exception as e:
+                print(f"Error refilling wallet pool: {str(e)}")
+            self._wakeup.wait(self.poll_interval)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "size": self.size,
+                "low_water": self.low_water,
+                "available": wallet_store.pool_size() if self.enabled else 0,
+                "claims": self.claims,
+                "empty_claims": self.empty_claims,
+                "created": self.created,
+                "create_failures": self.create_failures,
+                "avg_create_ms": round(self._create_total / self.created * 1000, 2) if self.created else 0.0,
+                "refilling_for_ms": round((time.monotonic() - self._below_since) * 1000, 2)
+                if self._below_since else 0.0,
+                "last_refill_lag_ms": round(self.last_refill_lag * 1000, 2)
+                if self.last_refill_lag is not None else None,
+            }
+
+
+wallet_pool = WalletPool(
+    size=int(os.getenv("WALLET_POOL_SIZE", "5")),
+    low_water=int(os.environ["WALLET_POOL_LOW_WATER"]) if os.getenv("WALLET_POOL_LOW_WATER") else None,
+    poll_interval=float(os.getenv("WALLET_POOL_POLL_INTERVAL", "30")),
+)
@@ -0,0 +1,295 @@
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple, Type
+
+
+class WalletStore(ABC):
+    """Interface for wallet persistence backends"""
+
+    @abstractmethod
+    def load(self, wallet_id: str) -> Optional[dict]:
+        """Return the exported wallet data for wallet_id, or None"""
+
+    @abstractmethod
+    def save(self, wallet_id: str, data: dict, encrypted_seed: Optional[dict] = None):
+        """Insert or update a wallet atomically"""
+
+    @abstractmethod
+    def exists(self, wallet_id: str) -> bool:
+        ...
+
+    @abstractmethod
+    def wallet_ids(self) -> List[str]:
+        ...
+
+    @abstractmethod
+    def import_directory(self, directory: str) -> int:
+        """Bulk import a legacy wallet_storage directory, returns the number of wallets imported"""
+
+    @abstractmethod
+    def add_to_pool(self, wallet_id: str):
+        """Mark a stored wallet as pre-provisioned and free to claim"""
+
+    @abstractmethod
+    def claim_pooled(self) -> Optional[str]:
+        """Atomically take one pooled wallet, None when the pool is empty"""
+
+    @abstractmethod
+    def is_pooled(self, wallet_id: str) -> bool:
+        ...
+
+    @abstractmethod
+    def pool_size(self) -> int:
+        ...
+
+    @abstractmethod
+    def add_token(self, wallet_id: str, contract_address: str, symbol: str):
+        """Record an ERC-20 token deployed by a wallet"""
+
+    @abstractmethod
+    def tokens_for_wallets(self, wallet_ids: List[str]) -> List[dict]:
+        """Tokens deployed by any of the given wallets"""
+
+
+def export_encrypted_seed(wallet) -> Optional[dict]:
+    """Encrypt a wallet seed with the CDP key, as save_seed(encrypt=True) would"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        seed_file = os.path.join(tmp_dir, "seed.json")
+        wallet.save_seed_to_file(seed_file, encrypt=True)
+        with open(seed_file, 'r') as file:
+            return json.load(file).get(wallet.id)
+
+
+def read_legacy_wallet(directory: str, wallet_id: str) -> Optional[Tuple[dict, Optional[dict]]]:
+    """Read {wallet_id}.json and {wallet_id}_seed.json from a legacy wallet_storage directory"""
+    file_path = os.path.join(directory, f"{wallet_id}.json")
+    if not os.path.exists(file_path):
+        return None
+    with open(file_path, 'r') as file:
+        data = json.load(file)
+
+    encrypted_seed = None
+    seed_file = os.path.join(directory, f"{wallet_id}_seed.json")
+    if os.path.exists(seed_file):
+        with open(seed_file, 'r') as file:
+            encrypted_seed = json.load(file).get(wallet_id)
+    return data, encrypted_seed
+
+
+def _iter_legacy_wallets(directory: str) -> Iterator[Tuple[str, dict, Optional[dict]]]:
+    for path in Path(directory).glob("*.json"):
+        if path.stem.endswith("_seed"):
+            continue
+        try:
+            legacy = read_legacy_wallet(directory, path.stem)
+        except (OSError, ValueError) as e:
+            print(f"Skipping wallet file {path.name}: {str(e)}")
+            continue
+        if legacy:
+            yield path.stem, legacy[0], legacy[1]
+
+
+class SQLiteWalletStore(WalletStore):
+    """Wallet store backed by an embedded SQLite database, indexed on wallet_id"""
+
+    BATCH_SIZE = 1000
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS wallets (
+                    wallet_id TEXT PRIMARY KEY,
+                    data TEXT NOT NULL,
+                    encrypted_seed TEXT,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                ) WITHOUT ROWID
+                """
+            )
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS wallet_pool (
+                    wallet_id TEXT PRIMARY KEY,
+                    added_at REAL NOT NULL
+                ) WITHOUT ROWID
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS wallet_pool_added_at ON wallet_pool (added_at)")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS wallet_tokens (
+                    wallet_id TEXT NOT NULL,
+                    contract_address TEXT NOT NULL,
+                    symbol TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    PRIMARY KEY (wallet_id, contract_address)
+                ) WITHOUT ROWID
+                """
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        """One connection per thread; WAL lets readers run alongside a writer"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def load(self, wallet_id: str) -> Optional[dict]:
+        row = self._connect().execute(
+            "SELECT data FROM wallets WHERE wallet_id = ?", (wallet_id,)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def load_encrypted_seed(self, wallet_id: str) -> Optional[dict]:
+        row = self._connect().execute(
+            "SELECT encrypted_seed FROM wallets WHERE wallet_id = ?", (wallet_id,)
+        ).fetchone()
+        return json.loads(row[0]) if row and row[0] else None
+
+    def save(self, wallet_id: str, data: dict, encrypted_seed: Optional[dict] = None):
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                """
+                INSERT INTO wallets (wallet_id, data, encrypted_seed, created_at, updated_at)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(wallet_id) DO UPDATE SET
+                    data = excluded.data,
+                    encrypted_seed = COALESCE(excluded.encrypted_seed, wallets.encrypted_seed),
+                    updated_at = excluded.updated_at
+                """,
+                (wallet_id, json.dumps(data), json.dumps(encrypted_seed) if encrypted_seed else None, now, now),
+            )
+
+    def exists(self, wallet_id: str) -> bool:
+        row = self._connect().execute(
+            "SELECT 1 FROM wallets WHERE wallet_id = ?", (wallet_id,)
+        ).fetchone()
+        return row is not None
+
+    def wallet_ids(self) -> List[str]:
+        return [row[0] for row in self._connect().execute("SELECT wallet_id FROM wallets")]
+
+    def import_directory(self, directory: str) -> int:
+        imported = 0
+        batch = []
+        now = time.time()
+        conn = self._connect()
+        for wallet_id, data, encrypted_seed in _iter_legacy_wallets(directory):
+            batch.append((
+                wallet_id, json.dumps(data), json.dumps(encrypted_seed) if encrypted_seed else None, now, now
+            ))
+            if len(batch) >= self.BATCH_SIZE:
+                imported += self._insert_batch(conn, batch)
+                batch = []
+        if batch:
+            imported += self._insert_batch(conn, batch)
+        print(f"Imported {imported} wallets from {directory}")
+        return imported
+
+    def add_to_pool(self, wallet_id: str):
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR IGNORE INTO wallet_pool (wallet_id, added_at) VALUES (?, ?)",
+                (wallet_id, time.time()),
+            )
+
+    def claim_pooled(self) -> Optional[str]:
+        # A single DELETE ... RETURNING is atomic, so no two threads or
+        # processes can ever receive the same wallet
+        with self._connect() as conn:
+            rows = conn.execute(
+                """
+                DELETE FROM wallet_pool WHERE wallet_id = (
+                    SELECT wallet_id FROM wallet_pool ORDER BY added_at LIMIT 1
+                ) RETURNING wallet_id
+                """
+            ).fetchall()
+        return rows[0][0] if rows else None
+
+    def is_pooled(self, wallet_id: str) -> bool:
+        row = self._connect().execute(
+            "SELECT 1 FROM wallet_pool WHERE wallet_id = ?", (wallet_id,)
+        ).fetchone()
+        return row is not None
+
+    def pool_size(self) -> int:
+        return self._connect().execute("SELECT COUNT(*) FROM wallet_pool").fetchone()[0]
+
+    def add_token(self, wallet_id: str, contract_address: str, symbol: str):
+        with self._connect() as conn:
+            conn.execute(
+                """
+                INSERT OR IGNORE INTO wallet_tokens (wallet_id, contract_address, symbol, created_at)
+                VALUES (?, ?, ?, ?)
+                """,
+                (wallet_id, contract_address, symbol, time.time()),
+            )
+
+    def tokens_for_wallets(self, wallet_ids: List[str]) -> List[dict]:
+        if not wallet_ids:
+            return []
+        placeholders = ", ".join("?" for _ in wallet_ids)
+        rows = self._connect().execute(
+            f"""
+            SELECT wallet_id, contract_address, symbol FROM wallet_tokens
+            WHERE wallet_id IN ({placeholders}) ORDER BY created_at
+            """,
+            list(wallet_ids),
+        ).fetchall()
+        return [
+            {"wallet_id": wallet_id, "contract_address": contract_address, "symbol": symbol}
+            for wallet_id, contract_address, symbol in rows
+        ]
+
+    @staticmethod
+    def _insert_batch(conn: sqlite3.Connection, batch: list) -> int:
+        # Existing rows win: the database is the source of truth once a wallet is in it
+        with conn:
+            cursor = conn.executemany(
+                """
+                INSERT INTO wallets (wallet_id, data, encrypted_seed, created_at, updated_at)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(wallet_id) DO NOTHING
+                """,
+                batch,
+            )
+        return cursor.rowcount
+
+
+WALLET_STORE_BACKENDS: Dict[str, Type[WalletStore]] = {
+    "sqlite": SQLiteWalletStore,
+}
+
+
+def create_wallet_store(backend: str, location: str) -> WalletStore:
+    """Instantiate a wallet store backend by name"""
+    if backend not in WALLET_STORE_BACKENDS:
+        raise ValueError(f"Unknown wallet store backend: {backend}")
+    return WALLET_STORE_BACKENDS[backend](location)
+
+
+wallet_store = create_wallet_store(
+    os.getenv("WALLET_STORE_BACKEND", "sqlite"),
+    os.getenv("WALLET_STORE_PATH", os.path.join("wallet_storage", "wallets.db")),
+)
+
+
+if __name__ == "__main__":
+    # python -m app.web_3_agents.wallet_store [wallet_storage]
+    import sys
+
+    wallet_store.import_directory(sys.argv[1] if len(sys.argv) > 1 else "wallet_storage")
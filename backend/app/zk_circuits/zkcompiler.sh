@@ -22,15 +22,42 @@ for circuit in circuits/*.circom; do
     base=$(basename "$circuit" .circom)
     echo "Compiling $base..."
     
-    mkdir -p build/$base
+    # Build in a staging directory and move finished files into place, so the
+    # server never reads an artifact that is still being written
+    staging=build/.staging/$base
+    rm -rf "$staging"
+    mkdir -p "$staging" build/$base
+
     # 1. Compile circuit
-    circom "$circuit" --wasm --r1cs --sym -o build/$base
+    circom "$circuit" --wasm --r1cs --sym -o "$staging"
     
     # 2. Perform trusted setup
-    snarkjs groth16 setup "build/$base/$base.r1cs" powersOfTau.ptau "build/$base/$base.zkey"
+    snarkjs groth16 setup "$staging/$base.r1cs" powersOfTau.ptau "$staging/$base.zkey"
     
     # 3. Export verification key
-    snarkjs zkey export verificationkey "build/$base/$base.zkey" "build/$base/verification_key_$base.json"
+    snarkjs zkey export verificationkey "$staging/$base.zkey" "$staging/verification_key_$base.json"
+
+    # 4. Precompress artifacts for the /zkproof file routes
+    for artifact in "$staging/${base}_js/$base.wasm" "$staging/$base.zkey" "$staging/verification_key_$base.json"; do
+        gzip -9 -k -f "$artifact"
+        if command -v brotli &> /dev/null; then
+            brotli -q 11 -k -f "$artifact"
+        fi
+    done
+
+    # 5. Publish: each mv is an atomic rename, compressed variants last so
+    # they are never older than their artifact
+    mkdir -p "build/$base/${base}_js"
+    for file in "$staging/${base}_js"/*; do
+        case "$file" in *.gz|*.br) ;; *) mv -f "$file" "build/$base/${base}_js/" ;; esac
+    done
+    for file in "$staging"/*; do
+        case "$file" in *.gz|*.br|"$staging/${base}_js") ;; *) mv -f "$file" "build/$base/" ;; esac
+    done
+    for file in "$staging"/*.gz "$staging"/*.br "$staging/${base}_js"/*.gz "$staging/${base}_js"/*.br; do
+        [ -e "$file" ] && mv -f "$file" "$(dirname "${file/#$staging/build/$base}")/"
+    done
+    rm -rf "$staging"
 done
 
 echo "All circuits compiled to build/"
\ No newline at end of file
@@ -2,6 +2,76 @@ import { groth16 } from 'snarkjs';
 
 const API_BASE_URL = 'http://localhost:8000'; // Update with your backend URL
 
+// Content-hash-versioned URLs are cached by the browser for good, so
+// repeat proofs don't download the circuit artifacts again
+let circuitUrls = null;
+const circuitBundles = new Map();
+
+const getCircuitUrls = async () => {
+  if (!circuitUrls) {
+    circuitUrls = fetch(`${API_BASE_URL}/zkproof/circuits`)
+      .then((response) => response.json())
+      .then(({ circuits }) => Object.fromEntries(circuits.map((c) => [c.name, c.urls])))
+      .catch(() => {
+        circuitUrls = null;
+        return {};
+      });
+  }
+  return circuitUrls;
+};
+
+// Files of an uncompressed (ustar/pax) tar, keyed by base name
+const readTar = (buffer) => {
+  const bytes = new Uint8Array(buffer);
+  const decoder = new TextDecoder();
+  const files = {};
+  let offset = 0;
+  while (offset + 512 <= bytes.length && bytes[offset] !== 0) {
+    const field = (start, length) => decoder.decode(bytes.subarray(offset + start, offset + start + length)).replace(/\0.*$/s, '');
+    const name = field(0, 100);
+    const size = parseInt(field(124, 12).trim(), 8) || 0;
+    const type = field(156, 1);
+    if (type === '0' || type === '') {
+      files[name.split('/').pop()] = bytes.slice(offset + 512, offset + 512 + size);
+    }
+    offset += 512 + Math.ceil(size / 512) * 512;
+  }
+  return files;
+};
+
+// wasm, zkey and vkey of a circuit, fetched in one request
+const loadCircuit = (circuitName) => {
+  if (!circuitBundles.has(circuitName)) {
+    const bundle = (async () => {
+      const fetchBundle = async () => {
+        const urls = (await getCircuitUrls())[circuitName];
+        return urls?.bundle ? fetch(`${API_BASE_URL}${urls.bundle}`) : null;
+      };
+      let response = await fetchBundle();
+      if (response && !response.ok) {
+        // The circuit was rebuilt since /circuits was read: refresh the versions once
+        circuitUrls = null;
+        response = await fetchBundle();
+      }
+      if (!response || !response.ok) {
+        response = await fetch(`${API_BASE_URL}/zkproof/circuit/${circuitName}/bundle`);
+      }
+      if (!response.ok) {
+        throw new Error(`Failed to load circuit ${circuitName}: ${response.status}`);
+      }
+      const files = readTar(await response.arrayBuffer());
+      return {
+        wasm: { type: 'mem', data: files[`${circuitName}.wasm`] },
+        zkey: { type: 'mem', data: files[`${circuitName}.zkey`] },
+        vkey: JSON.parse(new TextDecoder().decode(files[`verification_key_${circuitName}.json`])),
+      };
+    })();
+    bundle.catch(() => circuitBundles.delete(circuitName));
+    circuitBundles.set(circuitName, bundle);
+  }
+  return circuitBundles.get(circuitName);
+};
+
 export const generateAndVerifyProof = async (circuitName, inputs) => {
   try {
     console.log("Inputs received:", inputs);
@@ -14,20 +84,16 @@ export const generateAndVerifyProof = async (circuitName, inputs) => {
     console.log("Formatted inputs:", formattedInputs);
     console.log("API base URL:", API_BASE_URL);
 
-    const wasmPath = `${API_BASE_URL}/zkproof/circuit/${circuitName}/wasm`;
-    const zkeyPath = `${API_BASE_URL}/zkproof/circuit/${circuitName}/zkey`;
-    const vkeyPath = `${API_BASE_URL}/zkproof/circuit/${circuitName}/vkey`;
+    const { wasm, zkey, vkey } = await loadCircuit(circuitName);
 
     // Generate and verify proof
     try {
       const { proof, publicSignals } = await groth16.fullProve(
         formattedInputs,
-        wasmPath,
-        zkeyPath
+        wasm,
+        zkey
       );
 
-      const vkeyResponse = await fetch(vkeyPath);
-      const vkey = await vkeyResponse.json();
       const isValid = await groth16.verify(vkey, publicSignals, proof);
 
       return {